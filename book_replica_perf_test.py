@@ -0,0 +1,92 @@
+from decimal import Decimal
+import random
+import time
+from typing import List, Tuple
+from helper import string_helper
+from matching_engine_core.market_data.book_replica import BookReplica
+from matching_engine_core.market_data.l2_publisher import L2Publisher
+from matching_engine_core.market_data.l3_publisher import L3Publisher
+from matching_engine_core.market_data.messages import L2Delta, L3Message
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.side import Side
+from matching_engine_core.orderbook import Orderbook
+
+# Rebuilding a book from the market data feeds with BookReplica against replaying the same commands into an Orderbook.
+# Submits, cancels and replaces are mixed so that levels appear, change and disappear.
+
+COMMAND_COUNT = 200000
+PRICE_RANGE = 100
+QTY_MIN = 1
+QTY_MAX = 100
+
+
+def initialize_commands(count: int) -> List[Tuple]:
+    commands: List[Tuple] = []
+    orders: List[Order] = []
+    for i in range(count):
+        roll = random.randint(1, 10)
+        if roll <= 2 and orders:
+            commands.append(("cancel", random.choice(orders)))
+        elif roll <= 4 and orders:
+            commands.append(("replace", random.choice(orders), Decimal(random.randint(1, PRICE_RANGE))))
+        else:
+            order = Order(cl_ord_id=string_helper.generate_uuid(),
+                          order_id=string_helper.generate_uuid(),
+                          side=Side(random.randint(0, 1)),
+                          qty=Decimal(random.randint(QTY_MIN, QTY_MAX)),
+                          price=Decimal(random.randint(1, PRICE_RANGE)),
+                          symbol="A")
+            orders.append(order)
+            commands.append(("submit", order))
+    return commands
+
+
+def run_commands(ob: Orderbook, commands: List[Tuple]):
+    for command in commands:
+        if command[0] == "submit":
+            ob.submit_order(command[1])
+        elif command[0] == "cancel":
+            ob.cancel_order(command[1])
+        else:
+            ob.replace_order(command[1], command[2], None)
+
+
+def copy_commands(commands: List[Tuple]) -> List[Tuple]:
+    # orders are mutated by the orderbook, every run needs fresh ones
+    copies = dict()
+    result = []
+    for command in commands:
+        order = command[1]
+        if order.order_id not in copies:
+            copies[order.order_id] = Order(cl_ord_id=order.cl_ord_id, order_id=order.order_id, side=order.side,
+                                           qty=order.qty, price=order.price, symbol=order.symbol)
+        result.append((command[0], copies[order.order_id]) + command[2:])
+    return result
+
+
+if __name__ == "__main__":
+    commands = initialize_commands(COMMAND_COUNT)
+    l2: List[L2Delta] = []
+    l3: List[L3Message] = []
+    ob = Orderbook("A")
+    L2Publisher(ob, l2.extend)
+    L3Publisher(ob, l3.extend)
+    run_commands(ob, copy_commands(commands))
+
+    start = time.time()
+    run_commands(Orderbook("A"), copy_commands(commands))
+    orderbook_duration = time.time() - start
+    print(f"Orderbook replayed {COMMAND_COUNT} commands in {orderbook_duration:.3f} seconds")
+
+    replica = BookReplica("A")
+    start = time.time()
+    replica.apply_l2(l2)
+    duration = time.time() - start
+    print(f"BookReplica applied {len(l2)} L2 deltas in {duration:.3f} seconds, {orderbook_duration / duration:.1f}x faster")
+
+    replica = BookReplica("A")
+    start = time.time()
+    replica.apply_l3(l3)
+    duration = time.time() - start
+    print(f"BookReplica applied {len(l3)} L3 messages in {duration:.3f} seconds, {orderbook_duration / duration:.1f}x faster")
+    assert replica.top_levels(Side.Buy, 10) == ob.top_levels(Side.Buy, 10)
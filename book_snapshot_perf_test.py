@@ -0,0 +1,49 @@
+from decimal import Decimal
+import time
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.side import Side
+from matching_engine_core.orderbook import Orderbook
+
+# Cost of Orderbook.snapshot on books of growing depth: the first snapshot copies every order, a snapshot after a
+# command that changed a single level copies the orders of that level only but still walks every level to build the
+# level tuples, and a snapshot of an unchanged book is the cached one.
+
+LEVEL_COUNTS = [100, 1000, 10000]
+ORDERS_PER_LEVEL = 10
+REPEAT = 1000
+
+
+def create_book(level_count: int) -> Orderbook:
+    ob = Orderbook("A")
+    for price in range(1, level_count + 1):
+        for i in range(ORDERS_PER_LEVEL):
+            # bids and asks do not cross
+            side = Side.Buy if price <= level_count // 2 else Side.Sell
+            ob.submit_order(Order(cl_ord_id=f"{price}-{i}", order_id=f"{price}-{i}", side=side, qty=Decimal(10),
+                                  price=Decimal(price), symbol="A"))
+    return ob
+
+
+if __name__ == "__main__":
+    for level_count in LEVEL_COUNTS:
+        ob = create_book(level_count)
+        start = time.time()
+        ob.snapshot()
+        full_duration = time.time() - start
+
+        # every command changes the qty of the same resting order, i.e. one level
+        order = ob.get_order("1-0")
+        duration = 0.0
+        for i in range(REPEAT):
+            ob.replace_order(order, None, Decimal(10 + i % 2))
+            start = time.time()
+            ob.snapshot()
+            duration += time.time() - start
+
+        start = time.time()
+        for i in range(REPEAT):
+            ob.snapshot()
+        cached_duration = time.time() - start
+
+        print(f"{level_count} levels, {level_count * ORDERS_PER_LEVEL} orders: first snapshot {full_duration * 1e3:.3f} ms, "
+              f"after a one level change {duration / REPEAT * 1e3:.3f} ms, unchanged {cached_duration / REPEAT * 1e6:.3f} us")
@@ -0,0 +1,57 @@
+import bisect
+import hashlib
+from typing import Dict, Generic, Iterable, List, TypeVar
+
+NodeT = TypeVar("NodeT")
+
+
+def _hash(key: str) -> int:
+    # stable across processes and runs, unlike the builtin hash of str
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "little")
+
+
+class ConsistentHashRing(Generic[NodeT]):
+    """
+    Maps keys to nodes so that adding or removing a node only moves the keys of that node.
+
+    Every node is placed on the ring at replicas virtual points, a key belongs to the first point clockwise of its hash.
+    """
+
+    def __init__(self, nodes: Iterable[NodeT] = (), replicas: int = 64):
+        if replicas <= 0:
+            raise ValueError("Replicas must be positive")
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._point_nodes: Dict[int, NodeT] = dict()
+        self._nodes: List[NodeT] = []
+        for node in nodes:
+            self.add_node(node)
+
+    @property
+    def nodes(self) -> List[NodeT]:
+        return list(self._nodes)
+
+    def add_node(self, node: NodeT):
+        if node in self._nodes:
+            raise ValueError(f"Node {node} is already on the ring")
+        self._nodes.append(node)
+        for i in range(self.replicas):
+            point = _hash(f"{node}#{i}")
+            # a collision keeps the node that was added first so the mapping does not depend on the add order of later nodes
+            if point in self._point_nodes:
+                continue
+            self._point_nodes[point] = node
+            bisect.insort(self._points, point)
+
+    def remove_node(self, node: NodeT):
+        self._nodes.remove(node)
+        self._points = [point for point in self._points if self._point_nodes[point] != node]
+        self._point_nodes = {point: self._point_nodes[point] for point in self._points}
+
+    def get_node(self, key: str) -> NodeT:
+        if not self._points:
+            raise KeyError("The ring has no nodes")
+        index = bisect.bisect(self._points, _hash(key))
+        if index == len(self._points):
+            index = 0
+        return self._point_nodes[self._points[index]]
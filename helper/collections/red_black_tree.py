@@ -9,7 +9,7 @@ The code was implemented with assistance from GitHub Copilot.
 """
 
 from enum import Enum
-from typing import Generator, Generic, Optional, Tuple, TypeVar
+from typing import Generator, Generic, Iterable, List, Optional, Tuple, TypeVar
 
 
 KeyT = TypeVar("KeyT")
@@ -28,6 +28,8 @@ class RBNode(Generic[KeyT, ValueT]):
         self.right = right
         self.color = color
         self.value = value
+        # number of nodes in the subtree rooted at this node, maintained for order statistics
+        self.size = 1
 
     def __repr__(self):
         summary = f"Node({self.key}, color={self.color})"
@@ -47,6 +49,7 @@ class Nil(RBNode):
 
     def __init__(self):
         super().__init__(key="Nil", parent=None, left=None, right=None, color=_RBColor.Black)
+        self.size = 0
 
     @staticmethod
     def __bool__():
@@ -62,6 +65,48 @@ class RedBlackTree(Generic[KeyT, ValueT]):
         self._minimum_node: RBNode = self.nil
         self._maximum_node: RBNode = self.nil
         
+    @classmethod
+    def from_sorted(cls, items: Iterable[Tuple[KeyT, ValueT]]) -> "RedBlackTree[KeyT, ValueT]":
+        """Build a balanced tree from items sorted by strictly increasing keys in linear time.
+
+        The middle item of every range becomes the root of its subtree, so every level except the deepest one is full.
+        Coloring the nodes of the deepest level red and every other node black satisfies the red-black properties
+        without any rotation.
+
+        Args:
+            items: key value pairs in strictly increasing order of keys.
+
+        Returns:
+            A new tree holding the given items.
+        """
+        tree = cls()
+        items = list(items)
+        for i in range(1, len(items)):
+            if not items[i - 1][0] < items[i][0]:
+                raise ValueError(f"Keys must be strictly increasing, {items[i - 1][0]} is followed by {items[i][0]}")
+        if len(items) == 0:
+            return tree
+        nodes: List[RBNode] = [RBNode(key, left=tree.nil, right=tree.nil, color=_RBColor.Black, value=value) for key, value in items]
+        red_depth = len(items).bit_length() - 1
+
+        def build(lo: int, hi: int, depth: int, parent: Optional[RBNode]) -> RBNode:
+            if lo > hi:
+                return tree.nil
+            mid = (lo + hi) // 2
+            node = nodes[mid]
+            node.parent = parent
+            if depth == red_depth and depth > 0:
+                node.color = _RBColor.Red
+            node.left = build(lo, mid - 1, depth + 1, node)
+            node.right = build(mid + 1, hi, depth + 1, node)
+            node.size = hi - lo + 1
+            return node
+
+        tree.root = build(0, len(nodes) - 1, 0, None)
+        tree._minimum_node = nodes[0]
+        tree._maximum_node = nodes[-1]
+        return tree
+        
     @property
     def minimum(self) -> Optional[KeyT]:
         if self._minimum_node is self.nil:
@@ -74,9 +119,25 @@ class RedBlackTree(Generic[KeyT, ValueT]):
             return None
         return self._maximum_node.key
 
+    @property
+    def minimum_item(self) -> Optional[Tuple[KeyT, ValueT]]:
+        # (key, value) of the minimum in O(1), the extreme nodes are cached
+        if self._minimum_node is self.nil:
+            return None
+        return self._minimum_node.key, self._minimum_node.value
+
+    @property
+    def maximum_item(self) -> Optional[Tuple[KeyT, ValueT]]:
+        if self._maximum_node is self.nil:
+            return None
+        return self._maximum_node.key, self._maximum_node.value
+
     def __repr__(self):
         return f"RedBlackTree({self.root})"
 
+    def __len__(self) -> int:
+        return self.root.size
+
     def __search(self, key) -> RBNode:
         """Search for a node with a given key in the subtree of the given node.
 
@@ -117,34 +178,124 @@ class RedBlackTree(Generic[KeyT, ValueT]):
             node = node.right
         return node
 
-    def __inorder(self, node: RBNode) -> Generator[Tuple[KeyT, ValueT], None, None]:
-        """Perform an inorder traversal of the tree.
+    def _successor(self, node: RBNode) -> RBNode:
+        """Find the node with the smallest key greater than node's key.
 
         Args:
-            node: Node - the root of the tree to traverse.
+            node: the node to start from.
+
+        Returns:
+            The successor node or nil if node holds the maximum key.
         """
-        if node is not self.nil:
-            for item in self.__inorder(node.left):
-                yield item
-            yield node.key, node.value
-            for item in self.__inorder(node.right):
-                yield item
+        if node.right is not self.nil:
+            return self._minimum(node.right)
+        parent = node.parent
+        while parent and node is parent.right:
+            node = parent
+            parent = parent.parent
+        return parent if parent else self.nil
+
+    def _predecessor(self, node: RBNode) -> RBNode:
+        """Find the node with the greatest key less than node's key.
+
+        Args:
+            node: the node to start from.
+
+        Returns:
+            The predecessor node or nil if node holds the minimum key.
+        """
+        if node.left is not self.nil:
+            return self._maximum(node.left)
+        parent = node.parent
+        while parent and node is parent.left:
+            node = parent
+            parent = parent.parent
+        return parent if parent else self.nil
+
+    def __ceiling_node(self, key) -> RBNode:
+        """Find the node with the smallest key greater than or equal to key, nil if there is none."""
+        node = self.root
+        candidate = self.nil
+        while node is not self.nil:
+            if key < node.key:
+                candidate = node
+                node = node.left
+            elif key > node.key:
+                node = node.right
+            else:
+                return node
+        return candidate
+
+    def __floor_node(self, key) -> RBNode:
+        """Find the node with the greatest key less than or equal to key, nil if there is none."""
+        node = self.root
+        candidate = self.nil
+        while node is not self.nil:
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                candidate = node
+                node = node.right
+            else:
+                return node
+        return candidate
+
+    def ceiling(self, key) -> Optional[Tuple[KeyT, ValueT]]:
+        """Find the item with the smallest key greater than or equal to key.
+
+        Args:
+            key: the key to search for, it does not have to exist in the tree.
+
+        Returns:
+            The key value pair or None if every key is less than key.
+        """
+        node = self.__ceiling_node(key)
+        if node is self.nil:
+            return None
+        return node.key, node.value
+
+    def floor(self, key) -> Optional[Tuple[KeyT, ValueT]]:
+        """Find the item with the greatest key less than or equal to key.
+
+        Args:
+            key: the key to search for, it does not have to exist in the tree.
+
+        Returns:
+            The key value pair or None if every key is greater than key.
+        """
+        node = self.__floor_node(key)
+        if node is self.nil:
+            return None
+        return node.key, node.value
+
+    def irange(self, lo=None, hi=None, reverse: bool = False) -> Generator[Tuple[KeyT, ValueT], None, None]:
+        """Iterate the items whose keys are in the closed interval [lo, hi].
+
+        The first item is found with a single descent from the root, the rest are streamed by following successors
+        (or predecessors when reverse is True), so only the visited part of the tree is touched.
+        The tree must not be modified while the iteration is in progress.
+
+        Args:
+            lo: the lower bound of the interval, None for unbounded.
+            hi: the upper bound of the interval, None for unbounded.
+            reverse: iterate in descending order of keys when True.
+        """
+        if reverse:
+            node = self._maximum_node if hi is None else self.__floor_node(hi)
+            while node is not self.nil and (lo is None or node.key >= lo):
+                yield node.key, node.value
+                node = self._predecessor(node)
+        else:
+            node = self._minimum_node if lo is None else self.__ceiling_node(lo)
+            while node is not self.nil and (hi is None or node.key <= hi):
+                yield node.key, node.value
+                node = self._successor(node)
             
     def in_order(self) -> Generator[Tuple[KeyT, ValueT], None, None]:
-        for item in self.__inorder(self.root):
-            yield item
-            
-    def __reverse_order(self, node: RBNode) -> Generator[Tuple[KeyT, ValueT], None, None]:
-        if node is not self.nil:
-            for item in self.__reverse_order(node.right):
-                yield item
-            yield node.key, node.value
-            for item in self.__reverse_order(node.left):
-                yield item
+        return self.irange()
                 
     def reverse_order(self) -> Generator[Tuple[KeyT, ValueT], None, None]:
-        for item in self.__reverse_order(self.root):
-            yield item
+        return self.irange(reverse=True)
 
     def __preorder(self, node: RBNode) -> Generator[ValueT, None, None]:
         """Perform a preorder traversal of the tree rooted at node.
@@ -188,6 +339,8 @@ class RedBlackTree(Generic[KeyT, ValueT]):
         else:
             u.parent.right = v
         v.left, u.parent = u, v
+        v.size = u.size
+        u.size = u.left.size + u.right.size + 1
 
     def __rotate_right(self, v: RBNode):
         """Rotate the subtree rooted at v to the right."""
@@ -203,6 +356,8 @@ class RedBlackTree(Generic[KeyT, ValueT]):
         else:
             v.parent.left = u
         u.right, v.parent = v, u
+        u.size = v.size
+        v.size = v.left.size + v.right.size + 1
 
     def __insert(self, new_node: RBNode):
         """Insert a new node into the tree.
@@ -240,6 +395,8 @@ class RedBlackTree(Generic[KeyT, ValueT]):
         new_node.left = self.nil
         new_node.right = self.nil
         new_node.color = _RBColor.Red
+        new_node.size = 1
+        self.__update_sizes_to_root(parent, 1)
 
         self.__fix_insert_violations(new_node)
 
@@ -295,6 +452,17 @@ class RedBlackTree(Generic[KeyT, ValueT]):
             old_node.parent.right = new_node
         new_node.parent = old_node.parent
 
+    def __update_sizes_to_root(self, node: Optional[RBNode], diff: int):
+        """Add diff to the subtree sizes of node and all of its ancestors.
+
+        Args:
+            node: the deepest node whose subtree size changed.
+            diff: the change in subtree size.
+        """
+        while node:
+            node.size += diff
+            node = node.parent
+
     def __delete(self, node: RBNode):
         """Delete a node from the Red-Black Tree.
 
@@ -303,13 +471,18 @@ class RedBlackTree(Generic[KeyT, ValueT]):
         """ 
         original_color = node.color
         if node.left == self.nil:
+            self.__update_sizes_to_root(node.parent, -1)
             x = node.right
             self.__shift_nodes(node, x)
         elif node.right == self.nil:
+            self.__update_sizes_to_root(node.parent, -1)
             x = node.left
             self.__shift_nodes(node, x)
         else:
             v = self._minimum(node.right)
+            # v is spliced out of its position and takes node's place, whose subtree loses one node
+            self.__update_sizes_to_root(v.parent, -1)
+            v.size = node.size
             original_color = v.color
             x = v.right
             if v.parent == node:
@@ -434,6 +607,70 @@ class RedBlackTree(Generic[KeyT, ValueT]):
             return None
         return node.value
     
+    def __count_less(self, key, inclusive: bool) -> int:
+        """Count the keys less than (or equal to if inclusive) the given key.
+
+        Args:
+            key: the key to compare against, it does not have to exist in the tree.
+        """
+        count = 0
+        node = self.root
+        while node is not self.nil:
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                count += node.left.size + 1
+                node = node.right
+            else:
+                return count + node.left.size + (1 if inclusive else 0)
+        return count
+
+    def rank(self, key) -> int:
+        """Find the zero based position the given key has (or would have) in the sorted order of keys.
+
+        Args:
+            key: the key to find the rank of.
+
+        Returns:
+            The number of keys in the tree that are less than key.
+        """
+        return self.__count_less(key, inclusive=False)
+
+    def select(self, k: int) -> Tuple[KeyT, ValueT]:
+        """Find the k-th smallest item of the tree.
+
+        Args:
+            k: zero based position in the sorted order of keys, negative values count from the end.
+
+        Returns:
+            The key value pair at position k.
+        """
+        if k < 0:
+            k += self.root.size
+        if k < 0 or k >= self.root.size:
+            raise IndexError(f"Index {k} is out of range for tree of size {self.root.size}")
+        node = self.root
+        while True:
+            left_size = node.left.size
+            if k < left_size:
+                node = node.left
+            elif k > left_size:
+                k -= left_size + 1
+                node = node.right
+            else:
+                return node.key, node.value
+
+    def count_range(self, lo, hi) -> int:
+        """Count the keys in the closed interval [lo, hi].
+
+        Args:
+            lo: the lower bound of the interval.
+            hi: the upper bound of the interval.
+        """
+        if hi < lo:
+            return 0
+        return self.__count_less(hi, inclusive=True) - self.__count_less(lo, inclusive=False)
+    
     def insert_or_get(self, key: KeyT, value: ValueT) -> ValueT:
         node = self.__search(key)
         if node is not self.nil:
@@ -0,0 +1,106 @@
+import time
+from typing import Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class RingBufferOverrunError(Exception):
+    pass
+
+
+class RingBufferGatingTimeoutError(Exception):
+    pass
+
+
+class RingBuffer(Generic[T]):
+    """
+    Fixed capacity ring buffer with a single writer and any number of readers, each reader keeps its own cursor.
+
+    Items are numbered with consecutive sequences starting at 1. Gating readers hold the writer back, publish waits
+    until the slowest gating reader has consumed the slot it is about to overwrite. Other readers never slow the writer
+    down and get RingBufferOverrunError when they fall more than capacity items behind.
+
+    A gating reader must be polled by another thread than the writer, a writer waiting for a reader it drives itself
+    never returns. publish raises RingBufferGatingTimeoutError after waiting gating_timeout seconds (None waits
+    forever), a gating reader that stops polling has to be detached with remove_reader.
+    """
+
+    def __init__(self, capacity: int, gating_timeout: Optional[float] = 5.0):
+        if capacity <= 0 or capacity & (capacity - 1) != 0:
+            raise ValueError("Capacity must be a power of two")
+        self.capacity = capacity
+        self._mask = capacity - 1
+        self._items: List[Optional[T]] = [None] * capacity
+        # sequence of the last published item
+        self.sequence = 0
+        self._gating_readers: List["RingBufferReader[T]"] = []
+        self.gating_timeout = gating_timeout
+
+    def reader(self, gating: bool = False, from_sequence: Optional[int] = None) -> "RingBufferReader[T]":
+        """
+        Create a reader that starts after the last published item, or at from_sequence if it is still in the buffer.
+        """
+        next_sequence = self.sequence + 1 if from_sequence is None else from_sequence
+        if next_sequence <= self.sequence - self.capacity:
+            raise RingBufferOverrunError(f"Sequence {next_sequence} is no longer in the buffer")
+        reader = RingBufferReader(self, next_sequence)
+        if gating:
+            self._gating_readers.append(reader)
+        return reader
+
+    def remove_reader(self, reader: "RingBufferReader[T]"):
+        if reader in self._gating_readers:
+            self._gating_readers.remove(reader)
+
+    def _wait_for_gating_readers(self, sequence: int):
+        deadline = None if self.gating_timeout is None else time.monotonic() + self.gating_timeout
+        while self._gating_readers:
+            slowest = min(reader.next_sequence for reader in self._gating_readers)
+            if sequence - slowest < self.capacity:
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                raise RingBufferGatingTimeoutError(f"Gating readers did not consume sequence {slowest} in {self.gating_timeout} seconds")
+            time.sleep(0)
+
+    def publish(self, item: T) -> int:
+        sequence = self.sequence + 1
+        if self._gating_readers:
+            self._wait_for_gating_readers(sequence)
+        self._items[sequence & self._mask] = item
+        # the item is stored before the sequence that makes it visible to readers
+        self.sequence = sequence
+        return sequence
+
+    def get(self, sequence: int) -> T:
+        if sequence > self.sequence or sequence <= self.sequence - self.capacity or sequence <= 0:
+            raise RingBufferOverrunError(f"Sequence {sequence} is not in the buffer")
+        return self._items[sequence & self._mask]
+
+
+class RingBufferReader(Generic[T]):
+    def __init__(self, ring_buffer: RingBuffer[T], next_sequence: int):
+        self._ring_buffer = ring_buffer
+        self.next_sequence = next_sequence
+
+    @property
+    def available(self) -> int:
+        return self._ring_buffer.sequence - self.next_sequence + 1
+
+    def poll(self, max_items: int = 1024) -> List[T]:
+        """
+        Return up to max_items items that are published but not read yet by this reader, in sequence order.
+        """
+        ring_buffer = self._ring_buffer
+        start = self.next_sequence
+        last_sequence = ring_buffer.sequence
+        if last_sequence >= start + ring_buffer.capacity:
+            raise RingBufferOverrunError(f"Reader fell behind, sequence {start} was overwritten")
+        end = min(last_sequence, start + max_items - 1)
+        items = ring_buffer._items
+        mask = ring_buffer._mask
+        result = [items[sequence & mask] for sequence in range(start, end + 1)]
+        # the writer may have lapped the reader while the items were copied
+        if ring_buffer.sequence >= start + ring_buffer.capacity:
+            raise RingBufferOverrunError(f"Reader fell behind, sequence {start} was overwritten")
+        self.next_sequence = end + 1
+        return result
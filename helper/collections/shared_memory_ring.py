@@ -0,0 +1,201 @@
+import os
+import struct
+import time
+from enum import Enum
+from multiprocessing import shared_memory
+from typing import Optional
+
+CACHE_LINE = 64
+_COUNTER = struct.Struct("<Q")
+_SLOT_HEADER = struct.Struct("<I")
+# every counter and flag of the header sits on its own cache line so the producer and the consumer never share one
+_HEAD_OFFSET = 0
+_TAIL_OFFSET = CACHE_LINE
+_CONSUMER_WAITING_OFFSET = 2 * CACHE_LINE
+_PRODUCER_WAITING_OFFSET = 3 * CACHE_LINE
+_SLOTS_OFFSET = 4 * CACHE_LINE
+# upper bound of a single sleep of the blocking strategy, a missed wake up costs at most this much
+_BLOCKING_TIMEOUT = 0.01
+
+
+class WaitStrategy(Enum):
+    # lowest latency, burns a whole core while waiting
+    BusySpin = 0
+    # gives the core away between checks, latency depends on the scheduler
+    Yield = 1
+    # sleeps on a semaphore until the other side signals, lowest cpu usage and highest latency
+    Blocking = 2
+
+
+def _yield():
+    if hasattr(os, "sched_yield"):
+        os.sched_yield()
+    else:
+        time.sleep(0)
+
+
+def pause(wait_strategy: WaitStrategy):
+    """
+    Wait once between two checks of something that has no semaphore, e.g. when several rings are read in turns.
+    """
+    if wait_strategy == WaitStrategy.Yield:
+        _yield()
+    elif wait_strategy == WaitStrategy.Blocking:
+        time.sleep(0.0001)
+
+
+class SharedMemoryRing:
+    """
+    Fixed slot single producer single consumer ring buffer in shared memory for passing messages between processes.
+
+    head is the sequence of the next slot to read and is only written by the consumer, tail is the sequence of the next
+    slot to write and is only written by the producer. A message is copied into its slot before tail is advanced, so the
+    consumer never sees a partially written message. The counters are aligned 64 bit values, their loads and stores are
+    not torn on the platforms CPython runs on.
+
+    The ring is created by the parent process and handed to the child process as a Process argument, the child attaches
+    to the same shared memory block. The creator has to unlink the block when both sides are done.
+    """
+
+    def __init__(self, slot_count: int = 1024, slot_size: int = 65536, wait_strategy: WaitStrategy = WaitStrategy.Yield,
+                 context=None):
+        if slot_count <= 0 or slot_count & (slot_count - 1) != 0:
+            raise ValueError("Slot count must be a power of two")
+        if slot_size <= _SLOT_HEADER.size or slot_size % CACHE_LINE != 0:
+            raise ValueError(f"Slot size must be a multiple of {CACHE_LINE}")
+        self.slot_count = slot_count
+        self.slot_size = slot_size
+        self.wait_strategy = wait_strategy
+        self._mask = slot_count - 1
+        self._shm = shared_memory.SharedMemory(create=True, size=_SLOTS_OFFSET + slot_count * slot_size)
+        # with fork the child gets this very object instead of attaching, so the creator is told apart by pid
+        self._owner_pid = os.getpid()
+        self._buffer = self._shm.buf
+        self._buffer[:_SLOTS_OFFSET] = bytes(_SLOTS_OFFSET)
+        if wait_strategy == WaitStrategy.Blocking:
+            if context is None:
+                import multiprocessing
+                context = multiprocessing.get_context()
+            self._readable = context.Semaphore(0)
+            self._writable = context.Semaphore(0)
+        else:
+            self._readable = None
+            self._writable = None
+
+    def __getstate__(self):
+        return {"name": self._shm.name, "slot_count": self.slot_count, "slot_size": self.slot_size,
+                "wait_strategy": self.wait_strategy, "readable": self._readable, "writable": self._writable}
+
+    def __setstate__(self, state):
+        self.slot_count = state["slot_count"]
+        self.slot_size = state["slot_size"]
+        self.wait_strategy = state["wait_strategy"]
+        self._mask = self.slot_count - 1
+        self._shm = attach_shared_memory(state["name"])
+        self._owner_pid = None
+        self._buffer = self._shm.buf
+        self._readable = state["readable"]
+        self._writable = state["writable"]
+
+    @property
+    def max_message_size(self) -> int:
+        return self.slot_size - _SLOT_HEADER.size
+
+    @property
+    def _head(self) -> int:
+        return _COUNTER.unpack_from(self._buffer, _HEAD_OFFSET)[0]
+
+    @property
+    def _tail(self) -> int:
+        return _COUNTER.unpack_from(self._buffer, _TAIL_OFFSET)[0]
+
+    def __len__(self) -> int:
+        return self._tail - self._head
+
+    def try_write(self, message) -> bool:
+        """
+        Copy message into the next free slot, returns False without waiting when the ring is full.
+        """
+        size = len(message)
+        if size > self.slot_size - _SLOT_HEADER.size:
+            raise ValueError(f"Message of {size} bytes does not fit into a slot")
+        buffer = self._buffer
+        tail = _COUNTER.unpack_from(buffer, _TAIL_OFFSET)[0]
+        if tail - _COUNTER.unpack_from(buffer, _HEAD_OFFSET)[0] >= self.slot_count:
+            return False
+        offset = _SLOTS_OFFSET + (tail & self._mask) * self.slot_size
+        _SLOT_HEADER.pack_into(buffer, offset, size)
+        buffer[offset + _SLOT_HEADER.size:offset + _SLOT_HEADER.size + size] = message
+        _COUNTER.pack_into(buffer, _TAIL_OFFSET, tail + 1)
+        if self._readable is not None and buffer[_CONSUMER_WAITING_OFFSET]:
+            buffer[_CONSUMER_WAITING_OFFSET] = 0
+            self._readable.release()
+        return True
+
+    def try_read(self) -> Optional[bytes]:
+        """
+        Copy the oldest message out of the ring and free its slot, returns None without waiting when the ring is empty.
+        """
+        buffer = self._buffer
+        head = _COUNTER.unpack_from(buffer, _HEAD_OFFSET)[0]
+        if head == _COUNTER.unpack_from(buffer, _TAIL_OFFSET)[0]:
+            return None
+        offset = _SLOTS_OFFSET + (head & self._mask) * self.slot_size
+        size = _SLOT_HEADER.unpack_from(buffer, offset)[0]
+        message = bytes(buffer[offset + _SLOT_HEADER.size:offset + _SLOT_HEADER.size + size])
+        _COUNTER.pack_into(buffer, _HEAD_OFFSET, head + 1)
+        if self._writable is not None and buffer[_PRODUCER_WAITING_OFFSET]:
+            buffer[_PRODUCER_WAITING_OFFSET] = 0
+            self._writable.release()
+        return message
+
+    def _wait(self, semaphore, waiting_offset: int, deadline: Optional[float], ready):
+        if self.wait_strategy == WaitStrategy.BusySpin:
+            return
+        if self.wait_strategy == WaitStrategy.Yield:
+            _yield()
+            return
+        timeout = _BLOCKING_TIMEOUT if deadline is None else max(0.0, min(_BLOCKING_TIMEOUT, deadline - time.monotonic()))
+        # the flag is set before the ring is checked again, so the other side either sees the flag or its progress is seen here
+        self._buffer[waiting_offset] = 1
+        if not ready():
+            semaphore.acquire(timeout=timeout)
+
+    def write(self, message, timeout: Optional[float] = None) -> bool:
+        """
+        Copy message into the ring, waiting with the wait strategy while it is full. Returns False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.try_write(message):
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            self._wait(self._writable, _PRODUCER_WAITING_OFFSET, deadline, lambda: len(self) < self.slot_count)
+        return True
+
+    def read(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """
+        Take the oldest message out of the ring, waiting with the wait strategy while it is empty. Returns None on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            message = self.try_read()
+            if message is not None:
+                return message
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            self._wait(self._readable, _CONSUMER_WAITING_OFFSET, deadline, lambda: len(self) > 0)
+
+    def close(self):
+        self._buffer = None
+        self._shm.close()
+        if self._owner_pid == os.getpid():
+            self._shm.unlink()
+
+
+def attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    # only the creator tracks the block. Before python 3.13 attaching always registers the block, which is harmless for
+    # multiprocessing children since they share the resource tracker of the creator and registering is idempotent.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
@@ -0,0 +1,94 @@
+"""Pinning processes to cores and reading the scheduler statistics of a process on Linux.
+
+Affinity needs os.sched_setaffinity and real time scheduling needs os.sched_setscheduler (Linux only), real time
+scheduling also needs CAP_SYS_NICE or an RLIMIT_RTPRIO limit. Whatever is not available is skipped and reported in
+the returned PlacementResult instead of failing, so the same configuration can run on a development machine.
+"""
+import os
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+
+@dataclass(frozen=True)
+class CpuPlacement:
+    # cores the process may run on, None leaves the affinity unchanged
+    cpus: Optional[Sequence[int]] = None
+    # SCHED_FIFO priority (1-99), None keeps the default scheduling policy
+    realtime_priority: Optional[int] = None
+
+
+@dataclass
+class PlacementResult:
+    cpus: List[int] = field(default_factory=list)
+    affinity_applied: bool = False
+    realtime_applied: bool = False
+    errors: List[str] = field(default_factory=list)
+
+
+@dataclass
+class SchedulerStats:
+    # times the scheduler moved the process to another core
+    migrations: Optional[int] = None
+    # time spent runnable but waiting on a run queue for a core
+    run_queue_wait_seconds: Optional[float] = None
+    cpu_seconds: Optional[float] = None
+    timeslices: Optional[int] = None
+
+
+def current_cpus() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def apply_placement(placement: CpuPlacement) -> PlacementResult:
+    """
+    Apply placement to the calling process (the calling thread and the threads it starts afterwards).
+    """
+    result = PlacementResult()
+    if placement.cpus is not None:
+        if hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(0, placement.cpus)
+                result.affinity_applied = True
+            except OSError as e:
+                result.errors.append(f"Affinity {list(placement.cpus)} not applied: {e}")
+        else:
+            result.errors.append("Affinity is not supported on this platform")
+    if placement.realtime_priority is not None:
+        if hasattr(os, "sched_setscheduler"):
+            try:
+                os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(placement.realtime_priority))
+                result.realtime_applied = True
+            except OSError as e:
+                result.errors.append(f"SCHED_FIFO priority {placement.realtime_priority} not applied: {e}")
+        else:
+            result.errors.append("Real time scheduling is not supported on this platform")
+    result.cpus = current_cpus()
+    return result
+
+
+def read_scheduler_stats(pid: Optional[int] = None) -> SchedulerStats:
+    """
+    Scheduler statistics of the main thread of pid (the calling process by default) from /proc/<pid>/sched and
+    /proc/<pid>/schedstat, fields that can not be read are None.
+    """
+    proc = f"/proc/{'self' if pid is None else pid}"
+    stats = SchedulerStats()
+    try:
+        with open(f"{proc}/sched") as f:
+            for line in f:
+                if line.startswith("se.nr_migrations"):
+                    stats.migrations = int(line.split(":")[1])
+                    break
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        with open(f"{proc}/schedstat") as f:
+            cpu_ns, wait_ns, timeslices = f.read().split()[:3]
+        stats.cpu_seconds = int(cpu_ns) / 1e9
+        stats.run_queue_wait_seconds = int(wait_ns) / 1e9
+        stats.timeslices = int(timeslices)
+    except (OSError, ValueError):
+        pass
+    return stats
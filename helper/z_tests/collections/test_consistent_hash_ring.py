@@ -0,0 +1,35 @@
+import pytest
+
+from helper.collections.consistent_hash_ring import ConsistentHashRing
+
+
+def test_keys_are_spread_over_nodes():
+    ring = ConsistentHashRing(range(4))
+    keys = [f"SYM{i}" for i in range(4000)]
+    counts = {node: 0 for node in range(4)}
+    for key in keys:
+        counts[ring.get_node(key)] += 1
+    for count in counts.values():
+        assert 500 < count < 1500
+    # the mapping is stable across instances
+    other = ConsistentHashRing(range(4))
+    assert all(ring.get_node(key) == other.get_node(key) for key in keys)
+
+
+def test_only_keys_of_changed_node_move():
+    ring = ConsistentHashRing(range(4))
+    keys = [f"SYM{i}" for i in range(2000)]
+    before = {key: ring.get_node(key) for key in keys}
+    ring.add_node(4)
+    after = {key: ring.get_node(key) for key in keys}
+    assert all(after[key] == before[key] for key in keys if after[key] != 4)
+    ring.remove_node(4)
+    assert {key: ring.get_node(key) for key in keys} == before
+
+
+def test_empty_ring():
+    ring: ConsistentHashRing[int] = ConsistentHashRing()
+    with pytest.raises(KeyError):
+        ring.get_node("A")
+    with pytest.raises(ValueError):
+        ConsistentHashRing(replicas=0)
@@ -4,7 +4,7 @@ from decimal import Decimal
 import math
 import random
 from typing import Optional
-from helper.collections.red_black_tree import RBNode, RedBlackTree
+from helper.collections.red_black_tree import RBNode, RedBlackTree, _RBColor
 
 
 def test_height():
@@ -42,5 +42,99 @@ def test_insert():
             
     assert len(list(rb.in_order())) == len(set(random_nums))
             
-        
-    
\ No newline at end of file
+
+def assert_subtree_sizes(rb: RedBlackTree, node: RBNode) -> int:
+    if node is rb.nil:
+        assert node.size == 0
+        return 0
+    size = assert_subtree_sizes(rb, node.left) + assert_subtree_sizes(rb, node.right) + 1
+    assert node.size == size
+    return size
+
+
+def test_order_statistics():
+    rb = RedBlackTree()
+    keys = set()
+    for i in range(2000):
+        key = random.randint(1, 300)
+        if key in keys and random.randint(1, 2) == 1:
+            del rb[key]
+            keys.remove(key)
+        else:
+            rb[key] = f"val{key}"
+            keys.add(key)
+        if i % 50 == 0:
+            assert_subtree_sizes(rb, rb.root)
+    assert_subtree_sizes(rb, rb.root)
+    sorted_keys = sorted(keys)
+    assert len(rb) == len(sorted_keys)
+    for index, key in enumerate(sorted_keys):
+        assert rb.select(index) == (key, f"val{key}")
+        assert rb.rank(key) == index
+    assert rb.select(-1)[0] == sorted_keys[-1]
+    assert rb.rank(0) == 0
+    assert rb.rank(301) == len(sorted_keys)
+    for lo, hi in [(1, 300), (50, 60), (100, 99), (0, 0), (150, 150)]:
+        assert rb.count_range(lo, hi) == len([k for k in sorted_keys if lo <= k <= hi])
+    try:
+        rb.select(len(sorted_keys))
+        assert False
+    except IndexError:
+        pass
+    for key in sorted_keys:
+        del rb[key]
+    assert len(rb) == 0
+
+
+def test_floor_ceiling_irange():
+    rb = RedBlackTree()
+    keys = random.sample(range(0, 1000, 2), 200)
+    for key in keys:
+        rb[key] = key * 10
+    sorted_keys = sorted(keys)
+    assert list(rb.in_order()) == [(k, k * 10) for k in sorted_keys]
+    assert list(rb.reverse_order()) == [(k, k * 10) for k in reversed(sorted_keys)]
+    for probe in range(-1, 1001):
+        smaller = [k for k in sorted_keys if k <= probe]
+        greater = [k for k in sorted_keys if k >= probe]
+        assert rb.floor(probe) == ((smaller[-1], smaller[-1] * 10) if smaller else None)
+        assert rb.ceiling(probe) == ((greater[0], greater[0] * 10) if greater else None)
+    for lo, hi in [(None, None), (101, 499), (100, 100), (None, 250), (751, None), (500, 400)]:
+        expected = [k for k in sorted_keys if (lo is None or k >= lo) and (hi is None or k <= hi)]
+        assert [k for k, v in rb.irange(lo, hi)] == expected
+        assert [k for k, v in rb.irange(lo, hi, reverse=True)] == expected[::-1]
+
+
+def black_height(rb: RedBlackTree, node: RBNode) -> int:
+    if node is rb.nil:
+        return 1
+    if node.color == _RBColor.Red:
+        assert node.left.color == _RBColor.Black and node.right.color == _RBColor.Black
+    left_height = black_height(rb, node.left)
+    assert left_height == black_height(rb, node.right)
+    return left_height + (1 if node.color == _RBColor.Black else 0)
+
+
+def test_from_sorted():
+    for count in [0, 1, 2, 3, 4, 7, 8, 100, 1023, 1024, 1025]:
+        rb = RedBlackTree.from_sorted((i, f"val{i}") for i in range(count))
+        assert rb.root.color == _RBColor.Black
+        black_height(rb, rb.root)
+        assert_subtree_sizes(rb, rb.root)
+        assert len(rb) == count
+        assert list(rb.in_order()) == [(i, f"val{i}") for i in range(count)]
+        assert rb.minimum == (0 if count else None)
+        assert rb.maximum == (count - 1 if count else None)
+        # the tree stays valid under further modifications
+        for i in range(count, count + 50):
+            rb[i] = i
+        for i in range(0, count + 50, 3):
+            del rb[i]
+        black_height(rb, rb.root)
+        assert_subtree_sizes(rb, rb.root)
+        assert [k for k, v in rb.in_order()] == [i for i in range(count + 50) if i % 3 != 0]
+    try:
+        RedBlackTree.from_sorted([(1, 1), (1, 2)])
+        assert False
+    except ValueError:
+        pass
@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+
+from helper.collections.ring_buffer import RingBuffer, RingBufferGatingTimeoutError, RingBufferOverrunError
+
+
+def test_capacity_must_be_power_of_two():
+    with pytest.raises(ValueError):
+        RingBuffer(6)
+
+
+def test_readers_have_independent_cursors():
+    ring_buffer: RingBuffer[int] = RingBuffer(8)
+    first = ring_buffer.reader()
+    for i in range(5):
+        assert ring_buffer.publish(i) == i + 1
+    second = ring_buffer.reader(from_sequence=3)
+    assert first.available == 5
+    assert first.poll(2) == [0, 1]
+    assert first.poll() == [2, 3, 4]
+    assert first.poll() == []
+    assert second.poll() == [2, 3, 4]
+    assert ring_buffer.get(4) == 3
+
+
+def test_non_gating_reader_overrun():
+    ring_buffer: RingBuffer[int] = RingBuffer(4)
+    reader = ring_buffer.reader()
+    for i in range(5):
+        ring_buffer.publish(i)
+    with pytest.raises(RingBufferOverrunError):
+        reader.poll()
+    with pytest.raises(RingBufferOverrunError):
+        ring_buffer.get(1)
+    with pytest.raises(RingBufferOverrunError):
+        ring_buffer.reader(from_sequence=1)
+
+
+def test_gating_reader_holds_writer_back():
+    ring_buffer: RingBuffer[int] = RingBuffer(4)
+    reader = ring_buffer.reader(gating=True)
+    count = 10000
+    received = []
+
+    def consume():
+        while len(received) < count:
+            received.extend(reader.poll())
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    for i in range(count):
+        ring_buffer.publish(i)
+    consumer.join(timeout=30)
+    assert received == list(range(count))
+
+
+def test_stalled_gating_reader_times_out():
+    ring_buffer: RingBuffer[int] = RingBuffer(4, gating_timeout=0.05)
+    reader = ring_buffer.reader(gating=True)
+    for i in range(4):
+        ring_buffer.publish(i)
+    with pytest.raises(RingBufferGatingTimeoutError):
+        ring_buffer.publish(4)
+    ring_buffer.remove_reader(reader)
+    assert ring_buffer.publish(4) == 5
@@ -0,0 +1,65 @@
+import multiprocessing
+
+import pytest
+
+from helper.collections.shared_memory_ring import SharedMemoryRing, WaitStrategy
+
+
+def echo(requests: SharedMemoryRing, responses: SharedMemoryRing):
+    while True:
+        message = requests.read()
+        responses.write(message)
+        if not message:
+            return
+
+
+def test_single_process_fifo_and_capacity():
+    ring = SharedMemoryRing(slot_count=4, slot_size=64)
+    try:
+        assert ring.try_read() is None
+        for i in range(4):
+            assert ring.try_write(bytes([i]) * (i + 1))
+        assert not ring.try_write(b"x")
+        assert len(ring) == 4
+        assert ring.try_read() == b"\x00"
+        assert ring.try_write(b"x")
+        assert [ring.read() for i in range(4)] == [b"\x01" * 2, b"\x02" * 3, b"\x03" * 4, b"x"]
+        assert ring.read(timeout=0.01) is None
+        with pytest.raises(ValueError):
+            ring.try_write(bytes(ring.max_message_size + 1))
+    finally:
+        ring.close()
+
+
+def test_invalid_geometry():
+    with pytest.raises(ValueError):
+        SharedMemoryRing(slot_count=3)
+    with pytest.raises(ValueError):
+        SharedMemoryRing(slot_size=100)
+
+
+@pytest.mark.parametrize("wait_strategy", list(WaitStrategy))
+def test_round_trip_between_processes(wait_strategy: WaitStrategy):
+    requests = SharedMemoryRing(slot_count=8, slot_size=128, wait_strategy=wait_strategy)
+    responses = SharedMemoryRing(slot_count=8, slot_size=128, wait_strategy=wait_strategy)
+    process = multiprocessing.Process(target=echo, args=(requests, responses), daemon=True)
+    process.start()
+    try:
+        messages = [str(i).encode() for i in range(1, 200)]
+        received = []
+        for message in messages:
+            requests.write(message)
+            # keep a few messages in flight so the rings wrap and both sides wait
+            if len(requests) > 4:
+                received.append(responses.read(timeout=10))
+        requests.write(b"")
+        while True:
+            message = responses.read(timeout=10)
+            if not message:
+                break
+            received.append(message)
+        assert received == messages
+        process.join(timeout=10)
+    finally:
+        requests.close()
+        responses.close()
@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+from helper import cpu_affinity
+from helper.cpu_affinity import CpuPlacement
+
+
+def test_empty_placement_changes_nothing():
+    before = cpu_affinity.current_cpus()
+    result = cpu_affinity.apply_placement(CpuPlacement())
+    assert result.cpus == before
+    assert not result.affinity_applied and not result.realtime_applied and not result.errors
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_setaffinity"), reason="affinity is linux only")
+def test_affinity_is_applied():
+    before = cpu_affinity.current_cpus()
+    try:
+        result = cpu_affinity.apply_placement(CpuPlacement(cpus=[before[0]]))
+        assert result.affinity_applied
+        assert result.cpus == [before[0]]
+    finally:
+        os.sched_setaffinity(0, before)
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_setscheduler"), reason="real time scheduling is linux only")
+def test_realtime_failure_is_reported_not_raised():
+    policy = os.sched_getscheduler(0)
+    param = os.sched_getparam(0)
+    try:
+        # an out of range priority fails even with the capability
+        result = cpu_affinity.apply_placement(CpuPlacement(realtime_priority=1000))
+        assert not result.realtime_applied
+        assert len(result.errors) == 1
+    finally:
+        os.sched_setscheduler(0, policy, param)
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/schedstat"), reason="needs procfs scheduler statistics")
+def test_read_scheduler_stats():
+    stats = cpu_affinity.read_scheduler_stats()
+    assert stats.migrations is not None and stats.migrations >= 0
+    assert stats.run_queue_wait_seconds is not None and stats.run_queue_wait_seconds >= 0
+    assert stats.cpu_seconds > 0
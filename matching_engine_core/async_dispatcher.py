@@ -0,0 +1,212 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, Hashable, List, Optional, Union
+
+from matching_engine_core.i_transaction_subscriber import ITransactionSubscriber
+from matching_engine_core.models.event_type import EventType
+from matching_engine_core.models.execution_report import ExecutionReport
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.reject_codes import RejectCode
+from matching_engine_core.models.sequenced_event import SequencedEvent
+from matching_engine_core.models.trade import Trade
+from matching_engine_core.orderbook import Orderbook
+from matching_engine_core.sequencer import OrderbookEventAdapter, Sequencer
+
+
+class OverflowPolicy(Enum):
+    # the matching thread waits until the subscriber makes room, nothing is lost
+    Block = 0
+    # the oldest queued event is dropped to make room
+    DropOldest = 1
+    # a queued update of an order is replaced by its newer update, events that can not be merged block when full
+    Conflate = 2
+
+
+@dataclass
+class SubscriberMetrics:
+    name: str
+    queued: int
+    delivered: int
+    dropped: int
+    conflated: int
+    errors: int
+    # events published by the dispatcher that the subscriber has not received yet (queued, dropped or merged)
+    lag: int
+
+
+class _SubscriberChannel:
+    # bounded queue of one subscriber and the thread that drains it
+
+    def __init__(self, subscriber: ITransactionSubscriber, capacity: int, overflow_policy: OverflowPolicy, name: str):
+        self.subscriber = subscriber
+        self.capacity = capacity
+        self.overflow_policy = overflow_policy
+        self.name = name
+        # keyed by sequence, or by order for the order updates of a conflating subscriber
+        self._events: "OrderedDict[Hashable, SequencedEvent]" = OrderedDict()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._busy = False
+        self.delivered_sequence = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.errors = 0
+        self.thread = threading.Thread(target=self._run, name=f"Subscriber-{name}", daemon=True)
+
+    def offer(self, event: SequencedEvent):
+        with self._condition:
+            events = self._events
+            key: Hashable = event.sequence
+            if self.overflow_policy == OverflowPolicy.Conflate and event.event_type == EventType.OrderUpdate:
+                key = (event.symbol, event.payload.order_id)
+                if key in events:
+                    # the newer state goes to the end so it is never delivered before the events that preceded it
+                    del events[key]
+                    events[key] = event
+                    self.conflated += 1
+                    return
+            while len(events) >= self.capacity:
+                if self.overflow_policy == OverflowPolicy.DropOldest:
+                    events.popitem(last=False)
+                    self.dropped += 1
+                else:
+                    self._condition.wait()
+            events[key] = event
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._events and not self._closed:
+                    self._condition.wait()
+                if not self._events:
+                    return
+                batch = list(self._events.values())
+                self._events.clear()
+                self._busy = True
+                # publishers blocked on a full queue can continue
+                self._condition.notify_all()
+            for event in batch:
+                self._deliver(event)
+            with self._condition:
+                self._busy = False
+                self._condition.notify_all()
+
+    def _deliver(self, event: SequencedEvent):
+        subscriber = self.subscriber
+        try:
+            if event.event_type == EventType.Trade:
+                subscriber.on_trade(event.payload)
+            elif event.event_type == EventType.OrderUpdate:
+                subscriber.on_order_update(event.payload)
+            elif event.event_type == EventType.CancelReject:
+                subscriber.on_cancel_reject(event.payload, event.reject_code)
+            else:
+                subscriber.on_replace_reject(event.payload, event.reject_code)
+        except Exception:
+            # a failing subscriber must not stop its own delivery thread
+            self.errors += 1
+        self.delivered += 1
+        self.delivered_sequence = event.sequence
+
+    def wait_idle(self, deadline: Optional[float]) -> bool:
+        with self._condition:
+            while self._events or self._busy:
+                timeout = None if deadline is None else deadline - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    return False
+                self._condition.wait(timeout)
+        return True
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self.thread.join()
+
+    @property
+    def queued(self) -> int:
+        return len(self._events)
+
+
+class AsyncDispatcher:
+    """
+    Decouples slow subscribers (GUI, database writers, ...) from matching.
+
+    Attached orderbooks publish every event as an immutable SequencedEvent (order updates are execution reports,
+    rejected orders are copied at the time of the event) into a bounded queue per subscriber, each queue is drained by
+    its own thread which calls the subscriber. A subscriber therefore only delays itself, unless its overflow policy is
+    Block and its queue is full.
+    Events of all attached orderbooks get consecutive sequences, the lag of a subscriber is the number of published
+    events it has not received yet.
+    Given a sequencer, the dispatcher reads the sequencer's events instead of attaching to orderbooks itself (attach is
+    then not allowed): the events and their sequences are those of the sequencer and the orderbooks fan out only once.
+    """
+
+    def __init__(self, sequencer: Optional[Sequencer] = None):
+        self.sequencer = sequencer
+        self.sequence = 0 if sequencer is None else sequencer.sequence
+        self._channels: List[_SubscriberChannel] = []
+        self._adapters: Dict[str, OrderbookEventAdapter] = dict()
+        if sequencer is not None:
+            sequencer.add_consumer(self._offer)
+
+    def attach(self, orderbook: Orderbook):
+        if self.sequencer is not None:
+            raise ValueError("The dispatcher reads the events of its sequencer, attach the orderbook to the sequencer")
+        if orderbook.symbol in self._adapters:
+            raise ValueError(f"Orderbook {orderbook.symbol} is already attached")
+        adapter = OrderbookEventAdapter(orderbook, self._publish)
+        self._adapters[orderbook.symbol] = adapter
+        orderbook.subscribe(adapter)
+
+    def subscribe(self, subscriber: ITransactionSubscriber, capacity: int = 1024,
+                  overflow_policy: OverflowPolicy = OverflowPolicy.Block, name: Optional[str] = None):
+        if capacity <= 0:
+            raise ValueError("Capacity must be positive")
+        channel = _SubscriberChannel(subscriber, capacity, overflow_policy,
+                                     type(subscriber).__name__ if name is None else name)
+        # the subscriber is not lagging behind events that were published before it subscribed
+        channel.delivered_sequence = self.sequence
+        self._channels.append(channel)
+        channel.thread.start()
+
+    def _publish(self, orderbook: Orderbook, event_type: EventType, payload: Union[Trade, ExecutionReport, Order],
+                 reject_code: Optional[RejectCode], book_sequence: int, last_in_command: bool):
+        self.sequence += 1
+        event = SequencedEvent(self.sequence, orderbook.symbol, book_sequence, event_type, payload, reject_code,
+                               last_in_command)
+        for channel in self._channels:
+            channel.offer(event)
+
+    def _offer(self, command: List[SequencedEvent]):
+        # events of one command read from the sequencer
+        self.sequence = command[-1].sequence
+        for channel in self._channels:
+            for event in command:
+                channel.offer(event)
+
+    def metrics(self) -> List[SubscriberMetrics]:
+        return [SubscriberMetrics(name=channel.name,
+                                  queued=channel.queued,
+                                  delivered=channel.delivered,
+                                  dropped=channel.dropped,
+                                  conflated=channel.conflated,
+                                  errors=channel.errors,
+                                  lag=self.sequence - channel.delivered_sequence)
+                for channel in self._channels]
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        # waits until every subscriber has received everything queued for it, returns False on timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        return all(channel.wait_idle(deadline) for channel in self._channels)
+
+    def close(self):
+        # delivers what is queued and stops the subscriber threads
+        for channel in self._channels:
+            channel.close()
+        self._channels.clear()
@@ -0,0 +1,32 @@
+from typing import Dict, FrozenSet, List, Optional, Sequence
+
+from matching_engine_core.i_transaction_subscriber import ITransactionSubscriber
+
+_NO_SUBSCRIBERS: Sequence[ITransactionSubscriber] = ()
+
+
+class DispatchList:
+    """
+    Subscribers of one event type of an orderbook, built at subscribe time so publishing never visits subscribers
+    that are not interested. Subscribers without an order id filter get every event, filtered subscribers are indexed
+    by the order ids they asked for.
+    """
+
+    __slots__ = ("subs", "keyed")
+
+    def __init__(self):
+        self.subs: List[ITransactionSubscriber] = []
+        self.keyed: Dict[str, List[ITransactionSubscriber]] = dict()
+
+    def add(self, sub: ITransactionSubscriber, order_ids: Optional[FrozenSet[str]]):
+        if order_ids is None:
+            self.subs.append(sub)
+            return
+        for order_id in order_ids:
+            self.keyed.setdefault(order_id, []).append(sub)
+
+    def of_order(self, order_id: str) -> Sequence[ITransactionSubscriber]:
+        # filtered subscribers of order_id, the unfiltered ones are in subs
+        if not self.keyed:
+            return _NO_SUBSCRIBERS
+        return self.keyed.get(order_id, _NO_SUBSCRIBERS)
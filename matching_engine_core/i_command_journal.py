@@ -0,0 +1,25 @@
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from typing import Optional
+
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.side import Side
+
+
+class ICommandJournal(ABC):
+    # accepted commands are appended before the orderbook applies them, returned value is the sequence of the command
+    @abstractmethod
+    def append_submit(self, order: Order) -> int:
+        pass
+    
+    @abstractmethod
+    def append_cancel(self, order: Order) -> int:
+        pass
+    
+    @abstractmethod
+    def append_replace(self, order: Order, new_price: Optional[Decimal], new_qty: Optional[Decimal]) -> int:
+        pass
+    
+    @abstractmethod
+    def append_mass_cancel(self, symbol: str, side: Side, lo: Optional[Decimal], hi: Optional[Decimal]) -> int:
+        pass
@@ -1,9 +1,13 @@
 from abc import ABC, abstractmethod
+from typing import List, Union
 
+from matching_engine_core.models.execution_report import ExecutionReport
 from matching_engine_core.models.order import Order
 from matching_engine_core.models.reject_codes import RejectCode
 from matching_engine_core.models.trade import Trade
 
+BookEvent = Union[Trade, ExecutionReport]
+
 
 class ITransactionSubscriber(ABC):
     @abstractmethod
@@ -11,7 +15,7 @@ class ITransactionSubscriber(ABC):
         pass
     
     @abstractmethod
-    def on_order_update(self, order: Order):
+    def on_order_update(self, report: ExecutionReport):
         pass
     
     @abstractmethod
@@ -20,4 +24,15 @@ class ITransactionSubscriber(ABC):
     
     @abstractmethod
     def on_replace_reject(self, order: Order, reject_code: RejectCode):
-        pass
\ No newline at end of file
+        pass
+    
+    def on_events(self, events: List[BookEvent]):
+        # trades and execution reports of one command in publish order, their book sequences are consecutive and the last
+        # one is the sequence of the orderbook. Orderbooks call it once per command instead of on_trade and on_order_update
+        # for subscribers that override it, rejects are still delivered one by one (a rejected command has no other events).
+        # A subscriber with filters only gets the events it is interested in, so its sequences may have gaps
+        for event in events:
+            if isinstance(event, Trade):
+                self.on_trade(event)
+            else:
+                self.on_order_update(event)
@@ -0,0 +1,13 @@
+class IdGenerator:
+    """
+    Sequential id generator, ids are deterministic so that replaying the same commands produces the same ids.
+    The counter is part of the snapshots of the orderbook.
+    """
+    def __init__(self, prefix: str = "", value: int = 0):
+        self.prefix = prefix
+        # last generated counter value
+        self.value = value
+        
+    def next_id(self) -> str:
+        self.value += 1
+        return f"{self.prefix}{self.value}"
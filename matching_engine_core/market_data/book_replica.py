@@ -0,0 +1,193 @@
+from bisect import bisect_left
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from matching_engine_core.market_data.l3_action import L3Action
+from matching_engine_core.market_data.messages import L2Delta, L2Snapshot, L3Message, L3Snapshot
+from matching_engine_core.models.side import Side
+
+Snapshot = Union[L2Snapshot, L3Snapshot]
+
+
+class SequenceGapError(Exception):
+    pass
+
+
+class _DepthSide:
+    # levels of one side as parallel lists sorted by ascending price, a level is found with bisect
+
+    __slots__ = ("prices", "qtys", "counts")
+
+    def __init__(self):
+        self.prices: List[Decimal] = []
+        self.qtys: List[Decimal] = []
+        self.counts: List[int] = []
+
+    def clear(self):
+        self.prices.clear()
+        self.qtys.clear()
+        self.counts.clear()
+
+    def set(self, price: Decimal, qty: Decimal, count: int):
+        # count zero removes the level
+        prices = self.prices
+        i = bisect_left(prices, price)
+        if i < len(prices) and prices[i] == price:
+            if count == 0:
+                del prices[i]
+                del self.qtys[i]
+                del self.counts[i]
+            else:
+                self.qtys[i] = qty
+                self.counts[i] = count
+        elif count != 0:
+            prices.insert(i, price)
+            self.qtys.insert(i, qty)
+            self.counts.insert(i, count)
+
+    def change(self, price: Decimal, qty: Decimal, count: int):
+        # adds qty and count to the level, the level is removed when its count reaches zero
+        prices = self.prices
+        i = bisect_left(prices, price)
+        if i < len(prices) and prices[i] == price:
+            new_count = self.counts[i] + count
+            if new_count == 0:
+                del prices[i]
+                del self.qtys[i]
+                del self.counts[i]
+            else:
+                self.qtys[i] += qty
+                self.counts[i] = new_count
+        else:
+            prices.insert(i, price)
+            self.qtys.insert(i, qty)
+            self.counts.insert(i, count)
+
+
+class BookReplica:
+    """
+    Read only copy of the depth of one symbol built from an L2 or an L3 feed, without any matching logic.
+
+    Levels are kept in sorted arrays per side, so applying a delta is a binary search and a store (or a list insert or
+    delete when a level appears or disappears) and the best levels are at the ends of the arrays. Messages that are
+    older than the replica are skipped, a gap in feed_seq loads a new snapshot from request_snapshot (or raises
+    SequenceGapError without one) and the messages after the snapshot are applied.
+    """
+
+    def __init__(self, symbol: str, request_snapshot: Optional[Callable[[], Snapshot]] = None):
+        self.symbol = symbol
+        self.feed_seq = 0
+        self.book_seq = 0
+        self.gap_count = 0
+        self._request_snapshot = request_snapshot
+        self._bids = _DepthSide()
+        self._asks = _DepthSide()
+        # (side, price, qty) of the resting orders of an L3 feed
+        self._orders: Dict[str, Tuple[Side, Decimal, Decimal]] = dict()
+
+    def load_snapshot(self, snapshot: Snapshot):
+        if snapshot.symbol != self.symbol:
+            raise ValueError(f"Snapshot of {snapshot.symbol} can not be loaded into the replica of {self.symbol}")
+        self._bids.clear()
+        self._asks.clear()
+        self._orders.clear()
+        if isinstance(snapshot, L2Snapshot):
+            for depth, levels in ((self._bids, snapshot.bids), (self._asks, snapshot.asks)):
+                for price, qty, count in levels:
+                    depth.set(price, qty, count)
+        else:
+            for side, depth, orders in ((Side.Buy, self._bids, snapshot.bids), (Side.Sell, self._asks, snapshot.asks)):
+                for order in orders:
+                    depth.change(order.price, order.qty, 1)
+                    self._orders[order.order_id] = (side, order.price, order.qty)
+        self.feed_seq = snapshot.feed_seq
+        self.book_seq = snapshot.book_seq
+
+    def _is_next(self, feed_seq: int) -> bool:
+        # False for messages the replica already contains, a gap is filled from a snapshot first
+        if feed_seq <= self.feed_seq:
+            return False
+        if feed_seq == self.feed_seq + 1:
+            return True
+        self.gap_count += 1
+        if self._request_snapshot is None:
+            raise SequenceGapError(f"{self.symbol} expected feed sequence {self.feed_seq + 1}, got {feed_seq}")
+        self.load_snapshot(self._request_snapshot())
+        if feed_seq > self.feed_seq + 1:
+            raise SequenceGapError(f"{self.symbol} got feed sequence {feed_seq}, the snapshot ends at {self.feed_seq}")
+        return feed_seq == self.feed_seq + 1
+
+    def apply_l2(self, deltas: List[L2Delta]):
+        for delta in deltas:
+            if not self._is_next(delta.feed_seq):
+                continue
+            (self._bids if delta.side == Side.Buy else self._asks).set(delta.price, delta.qty, delta.count)
+            self.feed_seq = delta.feed_seq
+            self.book_seq = delta.book_seq
+
+    def apply_l3(self, messages: List[L3Message]):
+        orders = self._orders
+        for message in messages:
+            if not self._is_next(message.feed_seq):
+                continue
+            depth = self._bids if message.side == Side.Buy else self._asks
+            action = message.action
+            if action == L3Action.Add:
+                depth.change(message.price, message.qty, 1)
+                orders[message.order_id] = (message.side, message.price, message.qty)
+            elif action == L3Action.Execute:
+                side, price, qty = orders[message.order_id]
+                if message.qty == 0:
+                    depth.change(price, -qty, -1)
+                    del orders[message.order_id]
+                else:
+                    depth.change(price, message.qty - qty, 0)
+                    orders[message.order_id] = (side, price, message.qty)
+            else:
+                side, price, qty = orders.pop(message.order_id)
+                depth.change(price, -qty, -1)
+                if action == L3Action.Modify:
+                    depth.change(message.price, message.qty, 1)
+                    orders[message.order_id] = (message.side, message.price, message.qty)
+            self.feed_seq = message.feed_seq
+            self.book_seq = message.book_seq
+
+    @property
+    def best_bid(self) -> Optional[Decimal]:
+        prices = self._bids.prices
+        return prices[-1] if prices else None
+
+    @property
+    def best_ask(self) -> Optional[Decimal]:
+        prices = self._asks.prices
+        return prices[0] if prices else None
+
+    def bbo(self) -> Tuple[Optional[Tuple[Decimal, Decimal]], Optional[Tuple[Decimal, Decimal]]]:
+        # ((price, qty) of the best bid, (price, qty) of the best ask), None for an empty side
+        bids = self._bids
+        asks = self._asks
+        return ((bids.prices[-1], bids.qtys[-1]) if bids.prices else None,
+                (asks.prices[0], asks.qtys[0]) if asks.prices else None)
+
+    def top_levels(self, side: Side, depth: int) -> List[Tuple[Decimal, Decimal]]:
+        # (price, total open qty) of the best depth levels of a side in priority order, like Orderbook.top_levels
+        prices, qtys, _ = self.depth(side, depth)
+        return list(zip(prices, qtys))
+
+    def depth(self, side: Side, depth: Optional[int] = None) -> Tuple[List[Decimal], List[Decimal], List[int]]:
+        # prices, qtys and order counts of the best depth levels (all levels for None) of a side in priority order
+        if side == Side.Buy:
+            # the best bids are at the end of the arrays
+            levels = self._bids
+            start = 0 if depth is None else max(0, len(levels.prices) - depth)
+            return levels.prices[start:][::-1], levels.qtys[start:][::-1], levels.counts[start:][::-1]
+        levels = self._asks
+        return levels.prices[:depth], levels.qtys[:depth], levels.counts[:depth]
+
+    def level_aggregate(self, side: Side, price: Decimal) -> Tuple[Decimal, int]:
+        # (total open qty, order count) of a single level, (0, 0) if there is no level at price
+        levels = self._bids if side == Side.Buy else self._asks
+        i = bisect_left(levels.prices, price)
+        if i < len(levels.prices) and levels.prices[i] == price:
+            return levels.qtys[i], levels.counts[i]
+        return Decimal("0"), 0
@@ -0,0 +1,115 @@
+import time
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple, cast
+
+from matching_engine_core.i_transaction_subscriber import BookEvent, ITransactionSubscriber
+from matching_engine_core.market_data.messages import L2Delta, L2Snapshot
+from matching_engine_core.models.event_type import EventType
+from matching_engine_core.models.execution_report import ExecutionReport
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.reject_codes import RejectCode
+from matching_engine_core.models.side import Side
+from matching_engine_core.models.trade import Trade
+from matching_engine_core.orderbook import Orderbook
+from matching_engine_core.sequencer import Sequencer
+
+PublishL2 = Callable[[List[L2Delta]], None]
+
+
+class L2Publisher(ITransactionSubscriber):
+    """
+    Price level (L2) market data of one orderbook as deltas carrying the new qty and order count of a changed level.
+
+    Execution reports only mark the levels they touch as dirty, the levels are read from the orderbook when the dirty
+    set is flushed and only levels that differ from what was last published become deltas. Within the conflation
+    interval repeated changes of a level therefore cost a dict store each and produce a single delta with the latest
+    state, so the work of a flush is bounded by the number of distinct levels instead of the number of events.
+    With a zero interval the deltas of every command are published at the end of the command, otherwise at the end of
+    the first command after the interval has passed; flush can also be called from a timer so a quiet book does not
+    hold back its last changes. Must be called from the thread that drives the orderbook.
+    Given the sequencer the orderbook is attached to, the publisher reads the sequencer's events instead of subscribing
+    to the orderbook.
+    """
+
+    def __init__(self, orderbook: Orderbook, publish: PublishL2, conflation_interval: float = 0.0,
+                 clock: Callable[[], float] = time.monotonic, sequencer: Optional[Sequencer] = None):
+        self.orderbook = orderbook
+        self.conflation_interval = conflation_interval
+        self.feed_seq = 0
+        self._publish = publish
+        self._clock = clock
+        # last published (qty, count) of every level
+        self._levels: Dict[Tuple[Side, Decimal], Tuple[Decimal, int]] = dict()
+        # price of every resting order, a replace also changes the level the order leaves
+        self._order_prices: Dict[str, Decimal] = dict()
+        # levels changed since the last flush, a dict keeps them in the order they changed
+        self._dirty: Dict[Tuple[Side, Decimal], None] = dict()
+        for side in Side:
+            for price, qty, count in orderbook.levels(side):
+                self._levels[(side, price)] = (qty, count)
+        for orders in (orderbook.in_order_buy_orders(), orderbook.in_order_sell_orders()):
+            for order in orders:
+                self._order_prices[order.order_id] = order.price
+        self._last_flush = clock()
+        if sequencer is None:
+            orderbook.subscribe(self, event_types=[EventType.OrderUpdate])
+        else:
+            sequencer.subscribe(self, event_types=[EventType.OrderUpdate], symbols=[orderbook.symbol])
+
+    def on_trade(self, trade: Trade):
+        pass
+
+    def on_order_update(self, report: ExecutionReport):
+        self.on_events([report])
+
+    def on_cancel_reject(self, order: Order, reject_code: RejectCode):
+        pass
+
+    def on_replace_reject(self, order: Order, reject_code: RejectCode):
+        pass
+
+    def on_events(self, events: List[BookEvent]):
+        dirty = self._dirty
+        order_prices = self._order_prices
+        # only order updates are subscribed
+        for report in cast(List[ExecutionReport], events):
+            dirty[(report.side, report.price)] = None
+            previous_price = order_prices.get(report.order_id)
+            if previous_price is not None and previous_price != report.price:
+                dirty[(report.side, previous_price)] = None
+            if report.is_open:
+                order_prices[report.order_id] = report.price
+            elif previous_price is not None:
+                del order_prices[report.order_id]
+        if self.conflation_interval <= 0 or self._clock() - self._last_flush >= self.conflation_interval:
+            self.flush()
+
+    def flush(self):
+        # publishes the levels that changed since the last flush
+        self._last_flush = self._clock()
+        if not self._dirty:
+            return
+        orderbook = self.orderbook
+        levels = self._levels
+        deltas: List[L2Delta] = []
+        for key in self._dirty:
+            side, price = key
+            state = orderbook.level_aggregate(side, price)
+            if levels.get(key, (Decimal("0"), 0)) == state:
+                continue
+            if state[1] == 0:
+                del levels[key]
+            else:
+                levels[key] = state
+            self.feed_seq += 1
+            deltas.append(L2Delta(self.feed_seq, orderbook.sequence, orderbook.symbol, side, price, state[0], state[1]))
+        self._dirty.clear()
+        if deltas:
+            self._publish(deltas)
+
+    def snapshot(self) -> L2Snapshot:
+        # pending changes are published first, deltas after the snapshot have a greater feed_seq
+        self.flush()
+        orderbook = self.orderbook
+        return L2Snapshot(self.feed_seq, orderbook.sequence, orderbook.symbol,
+                          list(orderbook.levels(Side.Buy)), list(orderbook.levels(Side.Sell)))
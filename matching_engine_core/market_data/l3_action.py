@@ -0,0 +1,12 @@
+from enum import Enum
+
+
+class L3Action(Enum):
+    # order starts resting at the back of its level
+    Add = 0
+    # price or qty of a resting order changed, it lost its time priority and moves to the back of its (new) level
+    Modify = 1
+    # resting order left the book without trading
+    Delete = 2
+    # resting order traded, it leaves the book when its qty reaches zero
+    Execute = 3
@@ -0,0 +1,98 @@
+from decimal import Decimal
+from typing import Callable, List, Optional, Set, cast
+
+from matching_engine_core.i_transaction_subscriber import BookEvent, ITransactionSubscriber
+from matching_engine_core.market_data.l3_action import L3Action
+from matching_engine_core.market_data.messages import L3Message, L3Order, L3Snapshot
+from matching_engine_core.models.event_type import EventType
+from matching_engine_core.models.exec_type import ExecType
+from matching_engine_core.models.execution_report import ExecutionReport
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.reject_codes import RejectCode
+from matching_engine_core.models.trade import Trade
+from matching_engine_core.orderbook import Orderbook
+from matching_engine_core.sequencer import Sequencer
+
+PublishL3 = Callable[[List[L3Message]], None]
+
+
+class L3Publisher(ITransactionSubscriber):
+    """
+    Order by order (L3) market data of one orderbook as add, modify, delete and execute messages of resting orders.
+
+    The execution reports of a command arrive in one on_events call. Every command has at most one incoming order (a new
+    or replaced order), fills of resting orders become Execute messages, and the incoming order is only added (or
+    modified) at the end of the command if it still rests after matching. A replaced order loses its time priority, so
+    Modify moves it to the back of its level. Clients load a snapshot and apply the messages with a greater feed_seq.
+    Must be called from the thread that drives the orderbook, which has to deliver batches (Orderbook does). Given the
+    sequencer the orderbook is attached to, the publisher reads the sequencer's events instead (it delivers batches too).
+    """
+
+    def __init__(self, orderbook: Orderbook, publish: PublishL3, sequencer: Optional[Sequencer] = None):
+        self.orderbook = orderbook
+        self.feed_seq = 0
+        self._publish = publish
+        # orders resting on the book as far as the feed is concerned
+        self._resting: Set[str] = set()
+        for orders in (orderbook.in_order_buy_orders(), orderbook.in_order_sell_orders()):
+            for order in orders:
+                self._resting.add(order.order_id)
+        if sequencer is None:
+            orderbook.subscribe(self, event_types=[EventType.OrderUpdate])
+        else:
+            sequencer.subscribe(self, event_types=[EventType.OrderUpdate], symbols=[orderbook.symbol])
+
+    def on_trade(self, trade: Trade):
+        pass
+
+    def on_order_update(self, report: ExecutionReport):
+        self.on_events([report])
+
+    def on_cancel_reject(self, order: Order, reject_code: RejectCode):
+        pass
+
+    def on_replace_reject(self, order: Order, reject_code: RejectCode):
+        pass
+
+    def _message(self, messages: List[L3Message], action: L3Action, report: ExecutionReport, last_qty: Decimal = Decimal("0")):
+        self.feed_seq += 1
+        messages.append(L3Message(self.feed_seq, report.seq, report.symbol, action, report.order_id, report.side,
+                                  report.price, report.leaves_qty, last_qty))
+
+    def on_events(self, events: List[BookEvent]):
+        resting = self._resting
+        messages: List[L3Message] = []
+        # latest report of the incoming order of the command and whether it rested before (replace)
+        incoming: Optional[ExecutionReport] = None
+        was_resting = False
+        # only order updates are subscribed
+        for report in cast(List[ExecutionReport], events):
+            exec_type = report.exec_type
+            if exec_type == ExecType.New or exec_type == ExecType.Replaced:
+                incoming = report
+                was_resting = report.order_id in resting
+                resting.discard(report.order_id)
+            elif incoming is not None and report.order_id == incoming.order_id:
+                # fills, cancel of the unfilled part or reject of the incoming order
+                incoming = report
+            elif report.order_id in resting:
+                if exec_type == ExecType.Trade:
+                    self._message(messages, L3Action.Execute, report, report.last_qty)
+                else:
+                    self._message(messages, L3Action.Delete, report)
+                if not report.is_open:
+                    resting.discard(report.order_id)
+        if incoming is not None:
+            if incoming.is_open:
+                self._message(messages, L3Action.Modify if was_resting else L3Action.Add, incoming)
+                resting.add(incoming.order_id)
+            elif was_resting:
+                self._message(messages, L3Action.Delete, incoming)
+        if messages:
+            self._publish(messages)
+
+    def snapshot(self) -> L3Snapshot:
+        orderbook = self.orderbook
+        return L3Snapshot(self.feed_seq, orderbook.sequence, orderbook.symbol,
+                          [L3Order(o.order_id, o.price, o.open_qty) for o in orderbook.in_order_buy_orders()],
+                          [L3Order(o.order_id, o.price, o.open_qty) for o in orderbook.in_order_sell_orders()])
@@ -0,0 +1,59 @@
+from decimal import Decimal
+from typing import List, NamedTuple, Tuple
+
+from matching_engine_core.market_data.l3_action import L3Action
+from matching_engine_core.models.side import Side
+
+
+class L2Delta(NamedTuple):
+    # gapless sequence of the messages of the feed
+    feed_seq: int
+    # sequence of the last orderbook event reflected by the delta
+    book_seq: int
+    symbol: str
+    side: Side
+    price: Decimal
+    # new total open qty and order count of the level, both zero when the level is removed
+    qty: Decimal
+    count: int
+
+
+class L2Snapshot(NamedTuple):
+    # deltas with a greater feed_seq apply on top of the snapshot
+    feed_seq: int
+    book_seq: int
+    symbol: str
+    # (price, qty, count) of every level in priority order
+    bids: List[Tuple[Decimal, Decimal, int]]
+    asks: List[Tuple[Decimal, Decimal, int]]
+
+
+class L3Message(NamedTuple):
+    feed_seq: int
+    # sequence of the orderbook event the message comes from
+    book_seq: int
+    symbol: str
+    action: L3Action
+    order_id: str
+    side: Side
+    price: Decimal
+    # open qty resting on the book after the message
+    qty: Decimal
+    # qty traded by an Execute, zero for the other actions
+    last_qty: Decimal
+
+
+class L3Order(NamedTuple):
+    order_id: str
+    price: Decimal
+    qty: Decimal
+
+
+class L3Snapshot(NamedTuple):
+    # messages with a greater feed_seq apply on top of the snapshot
+    feed_seq: int
+    book_seq: int
+    symbol: str
+    # resting orders in priority order
+    bids: List[L3Order]
+    asks: List[L3Order]
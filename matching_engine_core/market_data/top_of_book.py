@@ -0,0 +1,206 @@
+"""Top of book of many symbols in shared memory, one seqlock guarded slot per symbol.
+
+    slot (128 bytes, two cache lines): seqlock counter (uint64), record, symbol length (uint8), symbol
+    record: book sequence (uint64), bid price, bid qty, ask price, ask qty, last trade price, last trade qty (each
+            decimal as int64 coefficient and int8 exponent), flags (uint8, has bid, has ask, has last trade)
+
+The single writer of a slot makes the counter odd, stores the record and makes the counter even again. Readers copy the
+record between two loads of the counter and retry while the counter is odd or has changed, so they never see a half
+written record and never make a syscall. This relies on the stores of the writer becoming visible in program order,
+which holds on x86, the counter is an aligned 64 bit value whose loads and stores are not torn.
+"""
+import os
+import struct
+from decimal import Decimal
+from multiprocessing import shared_memory
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from helper.collections.shared_memory_ring import attach_shared_memory
+from matching_engine_core.i_transaction_subscriber import BookEvent, ITransactionSubscriber
+from matching_engine_core.models.event_type import EventType
+from matching_engine_core.models.execution_report import ExecutionReport
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.reject_codes import RejectCode
+from matching_engine_core.models.trade import Trade
+from matching_engine_core.orderbook import Orderbook
+from matching_engine_core.persistence.records import decode_decimal, encode_decimal
+from matching_engine_core.sequencer import Sequencer
+
+SLOT_SIZE = 128
+_COUNTER = struct.Struct("<Q")
+_RECORD = struct.Struct("<QqbqbqbqbqbqbB")
+_SYMBOL_OFFSET = _COUNTER.size + _RECORD.size
+MAX_SYMBOL_LENGTH = SLOT_SIZE - _SYMBOL_OFFSET - 1
+_HAS_BID = 1
+_HAS_ASK = 2
+_HAS_LAST = 4
+_ZERO = (0, 0)
+
+Level = Tuple[Decimal, Decimal]
+
+
+class TopOfBook(NamedTuple):
+    symbol: str
+    # sequence of the last orderbook event reflected by the record, 0 before the first write
+    book_seq: int
+    # (price, qty) of the best bid, the best ask and the last trade, None when there is none
+    bid: Optional[Level]
+    ask: Optional[Level]
+    last_trade: Optional[Level]
+
+
+def _encode_level(level: Optional[Level]) -> Tuple[int, int, int, int]:
+    if level is None:
+        return _ZERO + _ZERO
+    return encode_decimal(level[0]) + encode_decimal(level[1])
+
+
+def _decode_level(flags: int, flag: int, values: Tuple) -> Optional[Level]:
+    if not flags & flag:
+        return None
+    return decode_decimal(values[0], values[1]), decode_decimal(values[2], values[3])
+
+
+class TopOfBookTable:
+    """
+    Shared memory table of the top of book of a fixed set of symbols.
+
+    The creator lists the symbols, other processes attach by name (or get the table as a Process argument) and read
+    with read, which takes no lock and makes no syscall. Every slot has a single writer, usually a TopOfBookPublisher
+    of the orderbook of the symbol. The creator has to close the table last, closing unlinks the block.
+    """
+
+    def __init__(self, symbols: Sequence[str]):
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, len(symbols)) * SLOT_SIZE)
+        self._owner_pid = os.getpid()
+        self._buffer = self._shm.buf
+        self._buffer[:] = bytes(len(self._buffer))
+        for slot, symbol in enumerate(symbols):
+            encoded = symbol.encode()
+            if len(encoded) > MAX_SYMBOL_LENGTH:
+                raise ValueError(f"Symbol {symbol} is longer than {MAX_SYMBOL_LENGTH} bytes")
+            offset = slot * SLOT_SIZE + _SYMBOL_OFFSET
+            self._buffer[offset] = len(encoded)
+            self._buffer[offset + 1:offset + 1 + len(encoded)] = encoded
+        self._slots = {symbol: slot for slot, symbol in enumerate(symbols)}
+        # counters of the slots written by this process
+        self._counters: Dict[int, int] = dict()
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @classmethod
+    def attach(cls, name: str) -> "TopOfBookTable":
+        table = cls.__new__(cls)
+        table._attach(attach_shared_memory(name))
+        return table
+
+    def _attach(self, shm: shared_memory.SharedMemory):
+        self._shm = shm
+        self._owner_pid = None
+        self._buffer = shm.buf
+        self._slots = dict()
+        self._counters = dict()
+        for slot in range(len(self._buffer) // SLOT_SIZE):
+            offset = slot * SLOT_SIZE + _SYMBOL_OFFSET
+            length = self._buffer[offset]
+            if length:
+                self._slots[str(self._buffer[offset + 1:offset + 1 + length], "utf-8")] = slot
+
+    def __getstate__(self):
+        return {"name": self._shm.name}
+
+    def __setstate__(self, state):
+        self._attach(attach_shared_memory(state["name"]))
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._slots.keys())
+
+    def slot_of(self, symbol: str) -> int:
+        slot = self._slots.get(symbol)
+        if slot is None:
+            raise KeyError(f"Symbol {symbol} has no slot in the top of book table")
+        return slot
+
+    def write(self, slot: int, book_seq: int, bid: Optional[Level], ask: Optional[Level], last_trade: Optional[Level]):
+        # only one writer per slot, its counter is kept locally so writing never reads shared memory
+        flags = (0 if bid is None else _HAS_BID) | (0 if ask is None else _HAS_ASK) | (0 if last_trade is None else _HAS_LAST)
+        values = _encode_level(bid) + _encode_level(ask) + _encode_level(last_trade)
+        offset = slot * SLOT_SIZE
+        buffer = self._buffer
+        counter = self._counters.get(slot)
+        if counter is None:
+            counter = _COUNTER.unpack_from(buffer, offset)[0]
+        _COUNTER.pack_into(buffer, offset, counter + 1)
+        _RECORD.pack_into(buffer, offset + _COUNTER.size, book_seq, *values, flags)
+        _COUNTER.pack_into(buffer, offset, counter + 2)
+        self._counters[slot] = counter + 2
+
+    def read(self, symbol: str) -> TopOfBook:
+        offset = self.slot_of(symbol) * SLOT_SIZE
+        buffer = self._buffer
+        while True:
+            before = _COUNTER.unpack_from(buffer, offset)[0]
+            if before & 1:
+                continue
+            values = _RECORD.unpack_from(buffer, offset + _COUNTER.size)
+            if _COUNTER.unpack_from(buffer, offset)[0] == before:
+                break
+        flags = values[13]
+        return TopOfBook(symbol, values[0], _decode_level(flags, _HAS_BID, values[1:5]),
+                         _decode_level(flags, _HAS_ASK, values[5:9]), _decode_level(flags, _HAS_LAST, values[9:13]))
+
+    def close(self):
+        self._buffer = None
+        self._shm.close()
+        if self._owner_pid == os.getpid():
+            self._shm.unlink()
+
+
+class TopOfBookPublisher(ITransactionSubscriber):
+    """
+    Writes the best bid and ask (with their level qty) and the last trade of an orderbook into its slot of a
+    TopOfBookTable at the end of every command that changed them. Best levels are read in O(1) from the cached extreme
+    nodes of the level trees, commands that leave the top of book unchanged write nothing. Given the sequencer the
+    orderbook is attached to, the publisher reads the sequencer's events instead of subscribing to the orderbook.
+    """
+
+    def __init__(self, orderbook: Orderbook, table: TopOfBookTable, sequencer: Optional[Sequencer] = None):
+        self.orderbook = orderbook
+        self._table = table
+        self._slot = table.slot_of(orderbook.symbol)
+        self._written: Tuple = (None, None, None)
+        self._last_trade: Optional[Level] = None
+        self._write()
+        if sequencer is None:
+            orderbook.subscribe(self, event_types=[EventType.Trade, EventType.OrderUpdate])
+        else:
+            sequencer.subscribe(self, event_types=[EventType.Trade, EventType.OrderUpdate], symbols=[orderbook.symbol])
+
+    def on_trade(self, trade: Trade):
+        self.on_events([trade])
+
+    def on_order_update(self, report: ExecutionReport):
+        self.on_events([report])
+
+    def on_cancel_reject(self, order: Order, reject_code: RejectCode):
+        pass
+
+    def on_replace_reject(self, order: Order, reject_code: RejectCode):
+        pass
+
+    def on_events(self, events: List[BookEvent]):
+        for event in reversed(events):
+            if isinstance(event, Trade):
+                self._last_trade = (event.price, event.qty)
+                break
+        self._write()
+
+    def _write(self):
+        orderbook = self.orderbook
+        top = (orderbook.best_bid_level, orderbook.best_ask_level, self._last_trade)
+        if top != self._written:
+            self._written = top
+            self._table.write(self._slot, orderbook.sequence, *top)
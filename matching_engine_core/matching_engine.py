@@ -0,0 +1,150 @@
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from matching_engine_core.async_dispatcher import AsyncDispatcher
+from matching_engine_core.i_command_journal import ICommandJournal
+from matching_engine_core.i_transaction_subscriber import ITransactionSubscriber
+from matching_engine_core.id_generator import IdGenerator
+from matching_engine_core.models.event_type import EventType
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.reject_codes import RejectCode
+from matching_engine_core.models.side import Side
+from matching_engine_core.orderbook import Orderbook
+from matching_engine_core.sequencer import Sequencer
+
+
+@dataclass
+class EngineMetrics:
+    book_count: int
+    resting_order_count: int
+    buy_level_count: int
+    sell_level_count: int
+    trade_count: int
+    submit_count: int
+    cancel_count: int
+    replace_count: int
+    mass_cancel_count: int
+
+
+class MatchingEngine:
+    """
+    Single entry point for every symbol, commands are routed to the orderbook of their symbol and orderbooks are created
+    the first time a symbol is seen.
+
+    The journal, the sequencer, the asynchronous dispatcher and the subscribers of the engine are shared by every
+    orderbook. Trade ids stay per symbol (prefixed with the symbol) since each orderbook snapshots and replays its own
+    counter; order ids for front ends that do not bring their own come from a single engine wide generator.
+    """
+
+    def __init__(self, journal: Optional[ICommandJournal] = None, sequencer: Optional[Sequencer] = None,
+                 order_id_generator: Optional[IdGenerator] = None, dispatcher: Optional[AsyncDispatcher] = None):
+        if dispatcher is not None and dispatcher.sequencer is not None and dispatcher.sequencer is not sequencer:
+            raise ValueError("The dispatcher reads a sequencer that is not the sequencer of the engine")
+        self._orderbooks: Dict[str, Orderbook] = dict()
+        self._journal = journal
+        self._sequencer = sequencer
+        self._dispatcher = dispatcher
+        # subscribers with their event type and order id filters
+        self._t_subs: List[Tuple[ITransactionSubscriber, Optional[List[EventType]], Optional[List[str]]]] = []
+        self.order_id_generator: IdGenerator = IdGenerator("O-") if order_id_generator is None else order_id_generator
+        self._submit_count = 0
+        self._cancel_count = 0
+        self._replace_count = 0
+        self._mass_cancel_count = 0
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._orderbooks.keys())
+
+    @property
+    def orderbooks(self) -> Dict[str, Orderbook]:
+        return self._orderbooks
+
+    def get_orderbook(self, symbol: str) -> Orderbook:
+        # lazily creates the orderbook of a symbol, also usable as the get_orderbook callback of journal replay
+        orderbook = self._orderbooks.get(symbol)
+        if orderbook is None:
+            orderbook = Orderbook(symbol, journal=self._journal)
+            self.add_orderbook(orderbook)
+        return orderbook
+
+    def find_orderbook(self, symbol: str) -> Optional[Orderbook]:
+        return self._orderbooks.get(symbol)
+
+    def add_orderbook(self, orderbook: Orderbook):
+        # registers an existing orderbook, e.g. one recovered from a snapshot
+        if orderbook.symbol in self._orderbooks:
+            raise ValueError(f"Orderbook {orderbook.symbol} already exists")
+        orderbook.journal = self._journal
+        if self._sequencer is not None:
+            self._sequencer.attach(orderbook)
+        if self._dispatcher is not None and self._dispatcher.sequencer is None:
+            self._dispatcher.attach(orderbook)
+        for sub, event_types, order_ids in self._t_subs:
+            orderbook.subscribe(sub, event_types, order_ids)
+        self._orderbooks[orderbook.symbol] = orderbook
+
+    def subscribe(self, sub: ITransactionSubscriber, event_types: Optional[Iterable[EventType]] = None,
+                  order_ids: Optional[Iterable[str]] = None):
+        # subscribes to the events of the existing and the future orderbooks, filters are those of Orderbook.subscribe
+        if any(sub is subscribed for subscribed, _, _ in self._t_subs):
+            return
+        types = None if event_types is None else list(event_types)
+        ids = None if order_ids is None else list(order_ids)
+        self._t_subs.append((sub, types, ids))
+        for orderbook in self._orderbooks.values():
+            orderbook.subscribe(sub, types, ids)
+
+    def next_order_id(self) -> str:
+        return self.order_id_generator.next_id()
+
+    def get_order(self, symbol: str, order_id: str) -> Optional[Order]:
+        orderbook = self._orderbooks.get(symbol)
+        return None if orderbook is None else orderbook.get_order(order_id)
+
+    def submit_order(self, order: Order):
+        self._submit_count += 1
+        self.get_orderbook(order.symbol).submit_order(order)
+
+    def _reject_subs(self, event_type: EventType, order: Order) -> List[ITransactionSubscriber]:
+        # engine subscribers whose filters let a reject of order through
+        return [sub for sub, event_types, order_ids in self._t_subs
+                if (event_types is None or event_type in event_types) and (order_ids is None or order.order_id in order_ids)]
+
+    def cancel_order(self, order: Order):
+        # cancels and replaces of an unknown symbol are rejected without creating its orderbook
+        self._cancel_count += 1
+        orderbook = self._orderbooks.get(order.symbol)
+        if orderbook is not None:
+            orderbook.cancel_order(order)
+            return
+        for sub in self._reject_subs(EventType.CancelReject, order):
+            sub.on_cancel_reject(order, RejectCode.OrderDoesNotExist)
+
+    def replace_order(self, order: Order, new_price: Optional[Decimal], new_qty: Optional[Decimal]):
+        self._replace_count += 1
+        orderbook = self._orderbooks.get(order.symbol)
+        if orderbook is not None:
+            orderbook.replace_order(order, new_price, new_qty)
+            return
+        for sub in self._reject_subs(EventType.ReplaceReject, order):
+            sub.on_replace_reject(order, RejectCode.OrderDoesNotExist)
+
+    def cancel_orders_in_range(self, symbol: str, side: Side, lo: Optional[Decimal] = None, hi: Optional[Decimal] = None) -> int:
+        self._mass_cancel_count += 1
+        orderbook = self._orderbooks.get(symbol)
+        return 0 if orderbook is None else orderbook.cancel_orders_in_range(side, lo, hi)
+
+    def metrics(self) -> EngineMetrics:
+        # aggregated on demand so that routing a command costs nothing more than a counter increment
+        orderbooks = self._orderbooks.values()
+        return EngineMetrics(book_count=len(self._orderbooks),
+                             resting_order_count=sum(o.resting_order_count for o in orderbooks),
+                             buy_level_count=sum(o.buy_level_count for o in orderbooks),
+                             sell_level_count=sum(o.sell_level_count for o in orderbooks),
+                             trade_count=sum(o.trade_id_generator.value for o in orderbooks),
+                             submit_count=self._submit_count,
+                             cancel_count=self._cancel_count,
+                             replace_count=self._replace_count,
+                             mass_cancel_count=self._mass_cancel_count)
@@ -0,0 +1,49 @@
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Generator, List, Optional, Tuple
+
+from matching_engine_core.models.level_snapshot import LevelSnapshot
+from matching_engine_core.models.resting_order import RestingOrder
+from matching_engine_core.models.side import Side
+
+
+@dataclass(frozen=True)
+class BookSnapshot:
+    """
+    Immutable view of an orderbook at a sequence, levels of each side in priority order (best first).
+
+    Nothing in it is shared with the live book, so it can be read from any thread and kept for as long as needed while
+    the book keeps matching.
+    """
+    symbol: str
+    # sequence of the last orderbook event reflected by the snapshot
+    sequence: int
+    bids: Tuple[LevelSnapshot, ...]
+    asks: Tuple[LevelSnapshot, ...]
+
+    @property
+    def best_bid(self) -> Optional[Decimal]:
+        return self.bids[0].price if self.bids else None
+
+    @property
+    def best_ask(self) -> Optional[Decimal]:
+        return self.asks[0].price if self.asks else None
+
+    @property
+    def resting_order_count(self) -> int:
+        return sum(level.order_count for level in self.bids) + sum(level.order_count for level in self.asks)
+
+    def side_levels(self, side: Side) -> Tuple[LevelSnapshot, ...]:
+        return self.bids if side == Side.Buy else self.asks
+
+    def top_levels(self, side: Side, depth: int) -> List[Tuple[Decimal, Decimal]]:
+        # (price, total open qty) of the best depth levels of a side in priority order, like Orderbook.top_levels
+        return [(level.price, level.total_qty) for level in self.side_levels(side)[:depth]]
+
+    def in_order_buy_orders(self) -> Generator[RestingOrder, None, None]:
+        for level in self.bids:
+            yield from level.orders
+
+    def in_order_sell_orders(self) -> Generator[RestingOrder, None, None]:
+        for level in self.asks:
+            yield from level.orders
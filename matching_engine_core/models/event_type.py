@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class EventType(Enum):
+    Trade = 0
+    OrderUpdate = 1
+    CancelReject = 2
+    ReplaceReject = 3
@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class ExecType(Enum):
+    New = 0
+    Trade = 1
+    Canceled = 2
+    Replaced = 3
+    Rejected = 4
@@ -0,0 +1,33 @@
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+from matching_engine_core.models.exec_type import ExecType
+from matching_engine_core.models.order_status import OPEN_STATES, OrderStatus
+from matching_engine_core.models.side import Side
+
+
+class ExecutionReport(NamedTuple):
+    # immutable state of an order right after an event, subscribers can keep it without copying
+    order_id: str
+    cl_ord_id: str
+    symbol: str
+    side: Side
+    price: Decimal
+    qty: Decimal
+    status: OrderStatus
+    exec_type: ExecType
+    # qty and price of the fill that caused the report, zero and None for other events
+    last_qty: Decimal
+    last_px: Optional[Decimal]
+    cum_qty: Decimal
+    leaves_qty: Decimal
+    # sequence of the event in its orderbook
+    seq: int
+
+    @property
+    def filled_qty(self) -> Decimal:
+        return self.cum_qty
+
+    @property
+    def is_open(self) -> bool:
+        return self.status in OPEN_STATES
@@ -0,0 +1,18 @@
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Optional
+
+from helper import bk_decimal
+
+
+@dataclass(frozen=True)
+class FillEstimate:
+    requested_qty: Decimal
+    filled_qty: Decimal
+    avg_price: Optional[Decimal]
+    worst_price: Optional[Decimal]
+    levels_consumed: int
+    
+    @property
+    def is_complete(self) -> bool:
+        return bk_decimal.epsilon_gte(self.filled_qty, self.requested_qty)
@@ -0,0 +1,15 @@
+from decimal import Decimal
+from typing import NamedTuple, Tuple
+
+from matching_engine_core.models.resting_order import RestingOrder
+
+
+class LevelSnapshot(NamedTuple):
+    # immutable state of a price level, orders in time priority
+    price: Decimal
+    total_qty: Decimal
+    orders: Tuple[RestingOrder, ...]
+
+    @property
+    def order_count(self) -> int:
+        return len(self.orders)
@@ -2,10 +2,10 @@ from dataclasses import dataclass, field
 from decimal import Decimal
 
 from helper import bk_decimal, bk_time
-from matching_engine_core.models.order_status import OrderStatus
+from matching_engine_core.models.order_status import OPEN_STATES, OrderStatus
 from matching_engine_core.models.side import Side
+from matching_engine_core.models.time_in_force import TimeInForce
 
-_OPEN_STATES = {OrderStatus.PendingNew, OrderStatus.Open, OrderStatus.PartiallyFilled}
 
 @dataclass
 class Order:
@@ -18,6 +18,7 @@ class Order:
     status: OrderStatus = OrderStatus.PendingNew
     filled_qty: Decimal = Decimal("0")
     timestamp: int = field(default_factory=bk_time.get_current_time_millis)
+    time_in_force: TimeInForce = TimeInForce.GoodTillCancel
     
     @property
     def open_qty(self) -> Decimal:
@@ -25,7 +26,7 @@ class Order:
     
     @property
     def is_open(self) -> bool:
-        return self.status in _OPEN_STATES
+        return self.status in OPEN_STATES
         
     def update_state_after_transaction(self):
         if bk_decimal.epsilon_equal(self.filled_qty, self.qty):
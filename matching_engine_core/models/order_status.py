@@ -7,4 +7,8 @@ class OrderStatus(Enum):
     Canceled = 2
     Rejected = 3
     PartiallyFilled = 4
-    Filled = 5
\ No newline at end of file
+    Filled = 5
+
+
+# statuses of orders that can still trade
+OPEN_STATES = frozenset({OrderStatus.PendingNew, OrderStatus.Open, OrderStatus.PartiallyFilled})
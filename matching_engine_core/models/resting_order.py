@@ -0,0 +1,34 @@
+from decimal import Decimal
+from typing import NamedTuple
+
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.order_status import OrderStatus
+from matching_engine_core.models.side import Side
+from matching_engine_core.models.time_in_force import TimeInForce
+
+
+class RestingOrder(NamedTuple):
+    # immutable copy of a resting order, the orderbook keeps updating the Order it was taken from
+    order_id: str
+    cl_ord_id: str
+    side: Side
+    price: Decimal
+    qty: Decimal
+    filled_qty: Decimal
+    status: OrderStatus
+    timestamp: int
+    time_in_force: TimeInForce
+
+    @classmethod
+    def of(cls, order: Order) -> "RestingOrder":
+        return cls(order.order_id, order.cl_ord_id, order.side, order.price, order.qty, order.filled_qty, order.status,
+                   order.timestamp, order.time_in_force)
+
+    @property
+    def open_qty(self) -> Decimal:
+        return self.qty - self.filled_qty
+
+    def to_order(self, symbol: str) -> Order:
+        return Order(cl_ord_id=self.cl_ord_id, order_id=self.order_id, side=self.side, qty=self.qty, price=self.price,
+                     symbol=symbol, status=self.status, filled_qty=self.filled_qty, timestamp=self.timestamp,
+                     time_in_force=self.time_in_force)
@@ -0,0 +1,23 @@
+from dataclasses import dataclass
+from typing import Optional, Union
+
+from matching_engine_core.models.event_type import EventType
+from matching_engine_core.models.execution_report import ExecutionReport
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.reject_codes import RejectCode
+from matching_engine_core.models.trade import Trade
+
+
+@dataclass(frozen=True)
+class SequencedEvent:
+    # gapless sequence across every orderbook attached to the sequencer
+    sequence: int
+    symbol: str
+    # gapless sequence of the events of the orderbook
+    book_sequence: int
+    event_type: EventType
+    # execution report of order updates, copy of the rejected order of rejects
+    payload: Union[Trade, ExecutionReport, Order]
+    reject_code: Optional[RejectCode] = None
+    # whether the event is the last one of its command, the events of a command are always consecutive
+    last_in_command: bool = True
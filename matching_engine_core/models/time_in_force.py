@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class TimeInForce(Enum):
+    GoodTillCancel = 0
+    ImmediateOrCancel = 1
+    FillOrKill = 2
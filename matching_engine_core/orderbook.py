@@ -1,24 +1,60 @@
 from decimal import Decimal
-from typing import Generator, List, Optional, cast
+from typing import Dict, FrozenSet, Generator, Iterable, List, Optional, Tuple, cast
 from helper import bk_decimal
-from helper.collections.mapped_doubly_queue import MappedDoublyQueue
 from helper.collections.red_black_tree import RedBlackTree
-from matching_engine_core.i_transaction_subscriber import ITransactionSubscriber
+from matching_engine_core.dispatch_list import DispatchList
+from matching_engine_core.i_command_journal import ICommandJournal
+from matching_engine_core.i_transaction_subscriber import BookEvent, ITransactionSubscriber
+from matching_engine_core.id_generator import IdGenerator
+from matching_engine_core.models.book_snapshot import BookSnapshot
+from matching_engine_core.models.event_type import EventType
+from matching_engine_core.models.exec_type import ExecType
+from matching_engine_core.models.execution_report import ExecutionReport
+from matching_engine_core.models.fill_estimate import FillEstimate
 from matching_engine_core.models.order import Order
 from matching_engine_core.models.order_status import OrderStatus
 from matching_engine_core.models.reject_codes import RejectCode
 from matching_engine_core.models.side import Side
+from matching_engine_core.models.time_in_force import TimeInForce
 from matching_engine_core.models.trade import Trade
+from matching_engine_core.price_level import PriceLevel
+
+
+def _is_interesting(event: BookEvent, event_types: Optional[FrozenSet[EventType]], order_ids: Optional[FrozenSet[str]]) -> bool:
+    if isinstance(event, Trade):
+        return ((event_types is None or EventType.Trade in event_types) and
+                (order_ids is None or event.buy_order_id in order_ids or event.sell_order_id in order_ids))
+    return ((event_types is None or EventType.OrderUpdate in event_types) and
+            (order_ids is None or event.order_id in order_ids))
 
 
 class Orderbook:
-    def __init__(self, symbol: str):
+    def __init__(self, symbol: str, journal: Optional[ICommandJournal] = None, trade_id_generator: Optional[IdGenerator] = None):
         self.symbol = symbol
         # price levels should be n sorted order for fast inorder traversal, 
         # orders at a price level has priority based on time and should be removed in constant time with random access
-        self._buy_levels: RedBlackTree[Decimal, MappedDoublyQueue[str, Order]] = RedBlackTree()
-        self._sell_levels: RedBlackTree[Decimal, MappedDoublyQueue[str, Order]] = RedBlackTree()
+        self._buy_levels: RedBlackTree[Decimal, PriceLevel] = RedBlackTree()
+        self._sell_levels: RedBlackTree[Decimal, PriceLevel] = RedBlackTree()
         self._t_subs: List[ITransactionSubscriber] = []
+        # interested subscribers per event type, subscribers overriding on_events are not in the trade and order update
+        # lists, they get the trades and order updates of a command in a single call with their filters (None for all)
+        self._trade_subs = DispatchList()
+        self._order_update_subs = DispatchList()
+        self._cancel_reject_subs = DispatchList()
+        self._replace_reject_subs = DispatchList()
+        self._batch_subs: List[Tuple[ITransactionSubscriber, Optional[FrozenSet[EventType]], Optional[FrozenSet[str]]]] = []
+        # events of the command being applied, only collected while there are batch subscribers
+        self._events: List[BookEvent] = []
+        # resting orders by order id
+        self._orders: Dict[str, Order] = dict()
+        # accepted commands are journaled before they are applied
+        self._journal: Optional[ICommandJournal] = journal
+        # gapless sequence of the trades and order updates published by this orderbook, the event being published has the current value
+        # rejects leave the book unchanged and are never journaled, so they do not advance it
+        self.sequence = 0
+        self.trade_id_generator: IdGenerator = IdGenerator(f"{symbol}-") if trade_id_generator is None else trade_id_generator
+        # last snapshot taken, valid while sequence does not move
+        self._snapshot: Optional[BookSnapshot] = None
         
     @property
     def best_bid(self) -> Optional[Decimal]:
@@ -28,25 +64,202 @@ class Orderbook:
     def best_ask(self) -> Optional[Decimal]:
         return self._sell_levels.minimum
         
+    @property
+    def best_bid_level(self) -> Optional[Tuple[Decimal, Decimal]]:
+        # (price, total open qty) of the best bid in O(1)
+        item = self._buy_levels.maximum_item
+        return None if item is None else (item[0], item[1].total_qty)
+    
+    @property
+    def best_ask_level(self) -> Optional[Tuple[Decimal, Decimal]]:
+        item = self._sell_levels.minimum_item
+        return None if item is None else (item[0], item[1].total_qty)
+        
+    @property
+    def journal(self) -> Optional[ICommandJournal]:
+        return self._journal
+    
+    @journal.setter
+    def journal(self, value: Optional[ICommandJournal]):
+        # journal is attached after recovery so that replayed commands are not journaled again
+        self._journal = value
+        
+    def get_order(self, order_id: str) -> Optional[Order]:
+        return self._orders.get(order_id)
+        
+    @property
+    def resting_order_count(self) -> int:
+        return len(self._orders)
+    
+    @property
+    def buy_level_count(self) -> int:
+        return len(self._buy_levels)
+    
+    @property
+    def sell_level_count(self) -> int:
+        return len(self._sell_levels)
+    
+    def top_levels(self, side: Side, depth: int) -> List[Tuple[Decimal, Decimal]]:
+        # (price, total open qty) of the best depth levels of a side in priority order, a single walk from the best level
+        # that stops after depth levels
+        levels: List[Tuple[Decimal, Decimal]] = []
+        if depth <= 0:
+            return levels
+        for price, level in self._buy_levels.reverse_order() if side == Side.Buy else self._sell_levels.in_order():
+            levels.append((price, level.total_qty))
+            if len(levels) == depth:
+                break
+        return levels
+        
+    def level_aggregate(self, side: Side, price: Decimal) -> Tuple[Decimal, int]:
+        # (total open qty, order count) of a single level, (0, 0) if there is no level at price
+        level = (self._buy_levels if side == Side.Buy else self._sell_levels)[price]
+        if level is None:
+            return Decimal("0"), 0
+        return level.total_qty, level.order_count
+
+    def levels(self, side: Side) -> Generator[Tuple[Decimal, Decimal, int], None, None]:
+        # (price, total open qty, order count) of every level of a side in priority order
+        levels = self._buy_levels.reverse_order() if side == Side.Buy else self._sell_levels.in_order()
+        for price, level in levels:
+            yield price, level.total_qty, level.order_count
+
     def _publish_trade(self, trade: Trade):
-        for sub in self._t_subs:
+        self.sequence += 1
+        if self._batch_subs:
+            self._events.append(trade)
+        dispatch = self._trade_subs
+        for sub in dispatch.subs:
             sub.on_trade(trade)
+        if dispatch.keyed:
+            buy_subs = dispatch.of_order(trade.buy_order_id)
+            for sub in buy_subs:
+                sub.on_trade(trade)
+            for sub in dispatch.of_order(trade.sell_order_id):
+                # a subscriber of both orders gets the trade once
+                if sub not in buy_subs:
+                    sub.on_trade(trade)
             
-    def _publish_order_update(self, order: Order):
-        for sub in self._t_subs:
-            sub.on_order_update(order)
+    def _publish_order_update(self, order: Order, exec_type: ExecType, last_qty: Decimal = Decimal("0"), last_px: Optional[Decimal] = None):
+        # the event is counted even when nobody reads its report, snapshots are cached by sequence
+        self.sequence += 1
+        dispatch = self._order_update_subs
+        keyed_subs = dispatch.of_order(order.order_id)
+        if not self._batch_subs and not dispatch.subs and not keyed_subs:
+            return
+        report = ExecutionReport(order.order_id, order.cl_ord_id, order.symbol, order.side, order.price, order.qty,
+                                 order.status, exec_type, last_qty, last_px, order.filled_qty,
+                                 order.open_qty if order.is_open else Decimal("0"), self.sequence)
+        if self._batch_subs:
+            self._events.append(report)
+        for sub in dispatch.subs:
+            sub.on_order_update(report)
+        for sub in keyed_subs:
+            sub.on_order_update(report)
             
     def _publish_cancel_reject(self, order: Order, reject_code: RejectCode):
-        for sub in self._t_subs:
+        dispatch = self._cancel_reject_subs
+        for sub in dispatch.subs:
+            sub.on_cancel_reject(order, reject_code)
+        for sub in dispatch.of_order(order.order_id):
             sub.on_cancel_reject(order, reject_code)
             
     def _publish_replace_reject(self, order: Order, reject_code: RejectCode):
-        for sub in self._t_subs:
+        dispatch = self._replace_reject_subs
+        for sub in dispatch.subs:
             sub.on_replace_reject(order, reject_code)
+        for sub in dispatch.of_order(order.order_id):
+            sub.on_replace_reject(order, reject_code)
+            
+    def _flush_events(self):
+        # called at the end of every command, the buffer is swapped out before dispatching so a raising subscriber
+        # never gets the same events delivered again
+        events = self._events
+        if events:
+            self._events = []
+            for sub, event_types, order_ids in self._batch_subs:
+                if event_types is None and order_ids is None:
+                    sub.on_events(events)
+                    continue
+                interesting = [event for event in events if _is_interesting(event, event_types, order_ids)]
+                if interesting:
+                    sub.on_events(interesting)
             
-    def subscribe(self, sub: ITransactionSubscriber):
-        if sub not in self._t_subs:
-            self._t_subs.append(sub)
+    def subscribe(self, sub: ITransactionSubscriber, event_types: Optional[Iterable[EventType]] = None,
+                  order_ids: Optional[Iterable[str]] = None):
+        # sub only gets events of the given types and of the given orders (a trade if either of its orders is given),
+        # None means all of them
+        if sub in self._t_subs:
+            return
+        self._t_subs.append(sub)
+        types = None if event_types is None else frozenset(event_types)
+        ids = None if order_ids is None else frozenset(order_ids)
+        batched = getattr(type(sub), "on_events", ITransactionSubscriber.on_events) is not ITransactionSubscriber.on_events
+        if batched and (types is None or EventType.Trade in types or EventType.OrderUpdate in types):
+            self._batch_subs.append((sub, types, ids))
+        for event_type, dispatch in ((EventType.Trade, self._trade_subs),
+                                     (EventType.OrderUpdate, self._order_update_subs),
+                                     (EventType.CancelReject, self._cancel_reject_subs),
+                                     (EventType.ReplaceReject, self._replace_reject_subs)):
+            if types is not None and event_type not in types:
+                continue
+            if batched and event_type in (EventType.Trade, EventType.OrderUpdate):
+                continue
+            dispatch.add(sub, ids)
+            
+    def load_snapshot(self, orders: Iterable[Order]):
+        # bulk load resting orders into an empty book, orders of the same price must be given in their time priority.
+        # each side is built with a single linear pass instead of rebalancing the tree for every price level
+        if len(self._buy_levels) > 0 or len(self._sell_levels) > 0:
+            raise ValueError(f"Snapshot can only be loaded into an empty orderbook, {self.symbol} has resting orders")
+        resting = [order for order in orders if order.is_open and not bk_decimal.epsilon_zero(order.open_qty)]
+        # a crossed book would have matched, it is rejected before any order or the book is touched
+        best_bid = max((order.price for order in resting if order.side == Side.Buy), default=None)
+        best_ask = min((order.price for order in resting if order.side == Side.Sell), default=None)
+        if best_bid is not None and best_ask is not None and best_bid >= best_ask:
+            raise ValueError(f"Snapshot of {self.symbol} is crossed, best bid {best_bid} is not below best ask {best_ask}")
+        buy_levels: Dict[Decimal, PriceLevel] = dict()
+        sell_levels: Dict[Decimal, PriceLevel] = dict()
+        for order in resting:
+            if order.status == OrderStatus.PendingNew:
+                order.status = OrderStatus.Open
+            levels = buy_levels if order.side == Side.Buy else sell_levels
+            level = levels.get(order.price)
+            if level is None:
+                level = PriceLevel(order.price)
+                levels[order.price] = level
+            level.enqueue(order.order_id, order)
+            self._orders[order.order_id] = order
+        self._buy_levels = RedBlackTree.from_sorted(sorted(buy_levels.items()))
+        self._sell_levels = RedBlackTree.from_sorted(sorted(sell_levels.items()))
+        self._snapshot = None
+
+    def snapshot(self) -> BookSnapshot:
+        # immutable view of the book that can be iterated from any thread while matching goes on. It is taken on the
+        # matching thread (or under ThreadedMatchingEngine.locked_orderbook): O(1) if the book did not change since the
+        # previous snapshot, otherwise one pass over the levels in which only the levels changed since they were last
+        # copied copy their orders, the others share their copies with the previous snapshots
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.sequence != self.sequence:
+            snapshot = BookSnapshot(self.symbol, self.sequence,
+                                    tuple(level.snapshot() for _, level in self._buy_levels.reverse_order()),
+                                    tuple(level.snapshot() for _, level in self._sell_levels.in_order()))
+            self._snapshot = snapshot
+        return snapshot
+
+    @classmethod
+    def from_snapshot(cls, snapshot: BookSnapshot, journal: Optional[ICommandJournal] = None,
+                      trade_id_generator: Optional[IdGenerator] = None) -> "Orderbook":
+        # independent book with new Order objects in the state of snapshot, continuing its sequence
+        book = cls(snapshot.symbol, journal, trade_id_generator)
+        book.load_snapshot(order.to_order(snapshot.symbol) for levels in (snapshot.bids, snapshot.asks)
+                           for level in levels for order in level.orders)
+        book.sequence = snapshot.sequence
+        return book
+
+    def fork(self) -> "Orderbook":
+        # copy of the book for what-if simulations, commands sent to it do not affect this book or its subscribers
+        return Orderbook.from_snapshot(self.snapshot())
             
     def in_order_buy_orders(self) -> Generator[Order, None, None]:
         for price, orders in self._buy_levels.reverse_order():
@@ -58,118 +271,206 @@ class Orderbook:
             for order_id, order in orders.traverse():
                 yield order
         
+    def _is_fully_fillable(self, order: Order) -> bool:
+        # read only walk over the opposite side's level aggregates, stops as soon as limit price is crossed or open quantity is covered
+        available = Decimal("0")
+        for level in self._crossing_levels(order.side, order.price):
+            available += level.total_qty
+            if bk_decimal.epsilon_gte(available, order.open_qty):
+                return True
+        return False
+    
+    def _crossing_levels(self, side: Side, limit: Optional[Decimal]) -> Generator[PriceLevel, None, None]:
+        # opposite side levels in priority order which an order of given side and limit price would match against
+        if side == Side.Buy:
+            for price, level in self._sell_levels.irange(hi=limit):
+                yield level
+        else:
+            for price, level in self._buy_levels.irange(lo=limit, reverse=True):
+                yield level
+        
+    def estimate_fill(self, side: Side, qty: Decimal, limit: Optional[Decimal] = None) -> FillEstimate:
+        # what-if fill of an aggressive order with given side and quantity, the book is not mutated
+        filled_qty = Decimal("0")
+        notional = Decimal("0")
+        worst_price: Optional[Decimal] = None
+        levels_consumed = 0
+        for level in self._crossing_levels(side, limit):
+            remaining_qty = qty - filled_qty
+            if bk_decimal.epsilon_zero(remaining_qty):
+                break
+            level_qty = level.total_qty if level.total_qty < remaining_qty else remaining_qty
+            filled_qty += level_qty
+            notional += level_qty * level.price
+            worst_price = level.price
+            levels_consumed += 1
+        return FillEstimate(requested_qty=qty,
+                            filled_qty=filled_qty,
+                            avg_price=notional / filled_qty if levels_consumed > 0 else None,
+                            worst_price=worst_price,
+                            levels_consumed=levels_consumed)
+        
     def submit_order(self, order: Order):
+        if self._journal is not None:
+            self._journal.append_submit(order)
+        try:
+            self._submit(order)
+        finally:
+            # a raising subscriber must not leave the events of this command behind for the next one
+            self._flush_events()
+        
+    def _submit(self, order: Order, exec_type: ExecType = ExecType.New):
+        # fill or kill orders are rejected before touching the book if they can not be filled completely
+        if order.time_in_force == TimeInForce.FillOrKill and not self._is_fully_fillable(order):
+            order.status = OrderStatus.Rejected
+            self._publish_order_update(order, ExecType.Rejected)
+            return
         # when replacing order status may be equal to PartiallyFilled
         if order.status == OrderStatus.PendingNew:
             order.status = OrderStatus.Open
-        self._publish_order_update(order)
+        self._publish_order_update(order, exec_type)
         if order.side == Side.Buy:
             if self.best_ask is not None and order.price >= self.best_ask:
                 # do not delete levels inside for loop while iterating the collection in order to mitigate side effects
                 to_be_deleted_price_levels: List[Decimal] = []
-                # check active matches
-                for price, sell_orders in self._sell_levels.in_order():
+                # check active matches, only the levels crossing the order's limit price are visited
+                for price, sell_orders in self._sell_levels.irange(hi=order.price):
                     if order.status == OrderStatus.Filled:
                         break
-                    if price <= order.price:
-                        while not sell_orders.is_empty and not bk_decimal.epsilon_equal(order.open_qty, Decimal("0")):
-                            sell_order = cast(Order, sell_orders.peek())
-                            if sell_order.open_qty >= order.open_qty:
-                                trade_qty = order.open_qty
-                            else:
-                                trade_qty = sell_order.open_qty
-                            sell_order.filled_qty += trade_qty
-                            order.filled_qty += trade_qty
-                            trade = Trade(active_side=Side.Buy,
-                                          buy_order_id=order.order_id,
-                                          sell_order_id=sell_order.order_id,
-                                          qty=trade_qty,
-                                          price=sell_order.price)
-                            sell_order.update_state_after_transaction()
-                            order.update_state_after_transaction()
-                            self._publish_order_update(sell_order)
-                            self._publish_order_update(order)
-                            self._publish_trade(trade)
+                    while not sell_orders.is_empty and not bk_decimal.epsilon_equal(order.open_qty, Decimal("0")):
+                        sell_order = cast(Order, sell_orders.peek())
+                        if sell_order.open_qty >= order.open_qty:
+                            trade_qty = order.open_qty
+                        else:
+                            trade_qty = sell_order.open_qty
+                        sell_order.filled_qty += trade_qty
+                        sell_orders.reduce(trade_qty)
+                        order.filled_qty += trade_qty
+                        trade = Trade(active_side=Side.Buy,
+                                      buy_order_id=order.order_id,
+                                      sell_order_id=sell_order.order_id,
+                                      qty=trade_qty,
+                                      price=sell_order.price,
+                                      trade_id=self.trade_id_generator.next_id())
+                        sell_order.update_state_after_transaction()
+                        order.update_state_after_transaction()
+                        self._publish_order_update(sell_order, ExecType.Trade, trade_qty, trade.price)
+                        self._publish_order_update(order, ExecType.Trade, trade_qty, trade.price)
+                        self._publish_trade(trade)
                             
-                            if bk_decimal.epsilon_equal(sell_order.open_qty, Decimal("0")):
-                                sell_orders.dequeue()
-                                if sell_orders.is_empty:
-                                    to_be_deleted_price_levels.append(sell_order.price)
+                        if bk_decimal.epsilon_equal(sell_order.open_qty, Decimal("0")):
+                            sell_orders.dequeue()
+                            del self._orders[sell_order.order_id]
+                            if sell_orders.is_empty:
+                                to_be_deleted_price_levels.append(sell_order.price)
                 for price in to_be_deleted_price_levels:
                     del self._sell_levels[price]
             if not bk_decimal.epsilon_equal(order.open_qty, Decimal("0")):
+                if order.time_in_force != TimeInForce.GoodTillCancel:
+                    self._cancel_remaining(order)
+                    return
                 # place order into orderbook
                 orders = self._buy_levels[order.price]
                 if orders is None:
-                    orders = MappedDoublyQueue()
+                    orders = PriceLevel(order.price)
                     self._buy_levels[order.price] = orders
                 orders.enqueue(order.order_id, order)
+                self._orders[order.order_id] = order
                 
         else:
             if self.best_bid is not None and order.price <= self.best_bid:
                 to_be_deleted_price_levels: List[Decimal] = []
                 # check active matches
-                for price, buy_orders in self._buy_levels.reverse_order():
+                for price, buy_orders in self._buy_levels.irange(lo=order.price, reverse=True):
                     if order.status == OrderStatus.Filled:
                         break
-                    if price >= order.price:
-                        while not buy_orders.is_empty and not bk_decimal.epsilon_equal(order.open_qty, Decimal("0")):
-                            buy_order = cast(Order, buy_orders.peek())
-                            if buy_order.open_qty >= order.open_qty:
-                                trade_qty = order.open_qty
-                            else:
-                                trade_qty = buy_order.open_qty
-                            buy_order.filled_qty += trade_qty
-                            order.filled_qty += trade_qty
-                            trade = Trade(active_side=Side.Sell,
-                                          buy_order_id=buy_order.order_id,
-                                          sell_order_id=order.order_id,
-                                          qty=trade_qty,
-                                          price=buy_order.price)
-                            buy_order.update_state_after_transaction()
-                            order.update_state_after_transaction()
-                            self._publish_order_update(buy_order)
-                            self._publish_order_update(order)
-                            self._publish_trade(trade)
+                    while not buy_orders.is_empty and not bk_decimal.epsilon_equal(order.open_qty, Decimal("0")):
+                        buy_order = cast(Order, buy_orders.peek())
+                        if buy_order.open_qty >= order.open_qty:
+                            trade_qty = order.open_qty
+                        else:
+                            trade_qty = buy_order.open_qty
+                        buy_order.filled_qty += trade_qty
+                        buy_orders.reduce(trade_qty)
+                        order.filled_qty += trade_qty
+                        trade = Trade(active_side=Side.Sell,
+                                      buy_order_id=buy_order.order_id,
+                                      sell_order_id=order.order_id,
+                                      qty=trade_qty,
+                                      price=buy_order.price,
+                                      trade_id=self.trade_id_generator.next_id())
+                        buy_order.update_state_after_transaction()
+                        order.update_state_after_transaction()
+                        self._publish_order_update(buy_order, ExecType.Trade, trade_qty, trade.price)
+                        self._publish_order_update(order, ExecType.Trade, trade_qty, trade.price)
+                        self._publish_trade(trade)
                             
-                            if bk_decimal.epsilon_equal(buy_order.open_qty, Decimal("0")):
-                                buy_orders.dequeue()
-                                if buy_orders.is_empty:
-                                    to_be_deleted_price_levels.append(buy_order.price)
+                        if bk_decimal.epsilon_equal(buy_order.open_qty, Decimal("0")):
+                            buy_orders.dequeue()
+                            del self._orders[buy_order.order_id]
+                            if buy_orders.is_empty:
+                                to_be_deleted_price_levels.append(buy_order.price)
                 for price in to_be_deleted_price_levels:
                     del self._buy_levels[price]
             if not bk_decimal.epsilon_equal(order.open_qty, Decimal("0")):
+                if order.time_in_force != TimeInForce.GoodTillCancel:
+                    self._cancel_remaining(order)
+                    return
                 # place order into orderbook
                 orders = self._sell_levels[order.price]
                 if orders is None:
-                    orders = MappedDoublyQueue()
+                    orders = PriceLevel(order.price)
                     self._sell_levels[order.price] = orders
                     
                 orders.enqueue(order.order_id, order)
+                self._orders[order.order_id] = order
                 
-    def _cancel_without_publish(self, order: Order) -> Optional[RejectCode]:
-        orders = None
-        if order.side == Side.Buy:
-            orders = self._buy_levels[order.price]
-        else:
-            orders = self._sell_levels[order.price]
-            
-        if orders is None:
-            return RejectCode.OrderDoesNotExist
-        
-        delete_result = orders.delete(order.order_id)
-        if not delete_result:
-            return RejectCode.OrderDoesNotExist
-        
-        return None
+    def _cancel_remaining(self, order: Order):
+        # unfilled part of immediate or cancel orders is never placed into the book
+        order.status = OrderStatus.Canceled
+        self._publish_order_update(order, ExecType.Canceled)
+                
+    def _cancel_without_publish(self, order: Order):
+        # order must be resting on the book
+        resting_order = self._orders.pop(order.order_id)
+        levels = self._buy_levels if resting_order.side == Side.Buy else self._sell_levels
+        orders = cast(PriceLevel, levels[resting_order.price])
+        orders.delete(resting_order.order_id)
+        if orders.is_empty:
+            del levels[resting_order.price]
                 
     def cancel_order(self, order: Order):
-        result = self._cancel_without_publish(order)
-        if isinstance(result, RejectCode):
-            self._publish_cancel_reject(order, result)
-        else:
-            order.status = OrderStatus.Canceled
-            self._publish_order_update(order)
+        if order.order_id not in self._orders:
+            self._publish_cancel_reject(order, RejectCode.OrderDoesNotExist)
+            return
+        if self._journal is not None:
+            self._journal.append_cancel(order)
+        self._cancel_without_publish(order)
+        order.status = OrderStatus.Canceled
+        try:
+            self._publish_order_update(order, ExecType.Canceled)
+        finally:
+            self._flush_events()
+            
+    def cancel_orders_in_range(self, side: Side, lo: Optional[Decimal] = None, hi: Optional[Decimal] = None) -> int:
+        # mass cancel of every order of a side whose price is in [lo, hi], None bounds are open ended
+        if self._journal is not None:
+            self._journal.append_mass_cancel(self.symbol, side, lo, hi)
+        levels = self._buy_levels if side == Side.Buy else self._sell_levels
+        # levels are collected beforehand since the tree can not be modified while iterating
+        canceled_levels = list(levels.irange(lo, hi))
+        canceled_count = 0
+        try:
+            for price, orders in canceled_levels:
+                del levels[price]
+                for order_id, order in orders.traverse():
+                    del self._orders[order_id]
+                    order.status = OrderStatus.Canceled
+                    self._publish_order_update(order, ExecType.Canceled)
+                    canceled_count += 1
+        finally:
+            self._flush_events()
+        return canceled_count
             
     def replace_order(self, order: Order, new_price: Optional[Decimal], new_qty: Optional[Decimal]):
         if (new_price is None or bk_decimal.epsilon_equal(order.price, new_price)) and (new_qty is None or bk_decimal.epsilon_equal(order.qty, new_qty)):
@@ -178,15 +479,20 @@ class Orderbook:
         if new_qty is not None and bk_decimal.epsilon_lte(new_qty, order.filled_qty):
             self._publish_replace_reject(order, RejectCode.NewQtyCantBeLessThanOrEqualToFilledQty)
             return
-        result = self._cancel_without_publish(order)
-        if isinstance(result, RejectCode):
-            self._publish_replace_reject(order, result)
-        else:
-            if new_price is not None:
-                order.price = new_price
-            if new_qty is not None:
-                order.qty = new_qty
-            self.submit_order(order)
+        if order.order_id not in self._orders:
+            self._publish_replace_reject(order, RejectCode.OrderDoesNotExist)
+            return
+        if self._journal is not None:
+            self._journal.append_replace(order, new_price, new_qty)
+        self._cancel_without_publish(order)
+        if new_price is not None:
+            order.price = new_price
+        if new_qty is not None:
+            order.qty = new_qty
+        try:
+            self._submit(order, ExecType.Replaced)
+        finally:
+            self._flush_events()
             
         
             
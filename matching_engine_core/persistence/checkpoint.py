@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from matching_engine_core.orderbook import Orderbook
+from matching_engine_core.persistence import snapshot
+from matching_engine_core.persistence.journal_writer import JournalWriter
+
+# fork is only used where copy-on-write fork semantics are available
+FORK_SUPPORTED = hasattr(os, "fork") and os.name == "posix"
+
+
+@dataclass
+class CheckpointMetrics:
+    last_sequence: int
+    # time the matching thread was stopped for the checkpoint
+    pause_seconds: float
+    # time from the start of the checkpoint until the snapshot file was written, None while the child is still running
+    duration_seconds: Optional[float] = None
+    forked: bool = False
+    succeeded: Optional[bool] = None
+
+
+class Checkpointer:
+    """
+    Writes snapshots of orderbooks without serializing them on the matching thread.
+
+    checkpoint must be called on the matching thread between two commands. With fork the process is forked at that
+    consistent point, the child serializes its copy-on-write view of the orderbooks, writes the snapshot and exits,
+    while the parent returns right after fork and keeps matching. A reaper thread waits for the child and records
+    its duration. Where fork is not available (or use_fork is False) the snapshot is written synchronously.
+    Only one checkpoint runs at a time, a checkpoint requested while the previous child is running is skipped.
+
+    With the journal of the orderbooks the journal is flushed and synced before the snapshot is taken and the snapshot is
+    tagged with its durable sequence, so a snapshot never covers commands a crash could still lose from the journal.
+    The flush is part of the pause of the matching thread. A last_sequence above the durable sequence is rejected.
+    """
+
+    def __init__(self, directory: str, use_fork: bool = True, journal: Optional[JournalWriter] = None):
+        self.directory = directory
+        self.use_fork = use_fork and FORK_SUPPORTED
+        self.journal = journal
+        self.history: List[CheckpointMetrics] = []
+        self._child_pid: Optional[int] = None
+        self._reaper: Optional[threading.Thread] = None
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def in_progress(self) -> bool:
+        return self._child_pid is not None
+
+    def checkpoint(self, orderbooks: Iterable[Orderbook], last_sequence: Optional[int] = None) -> Optional[CheckpointMetrics]:
+        if self.in_progress:
+            return None
+        start = time.perf_counter()
+        if self.journal is not None:
+            self.journal.flush(force_sync=True)
+            durable_sequence = self.journal.durable_sequence
+            if last_sequence is None:
+                last_sequence = durable_sequence
+            elif last_sequence > durable_sequence:
+                raise ValueError(f"Sequence {last_sequence} is ahead of the durable journal sequence {durable_sequence}")
+        elif last_sequence is None:
+            raise ValueError("The sequence of the snapshot is required without a journal")
+        if not self.use_fork:
+            snapshot.write_snapshot(self.directory, orderbooks, last_sequence)
+            duration = time.perf_counter() - start
+            metrics = CheckpointMetrics(last_sequence, pause_seconds=duration, duration_seconds=duration, succeeded=True)
+            self.history.append(metrics)
+            return metrics
+        pid = os.fork()
+        if pid == 0:
+            # child: never returns into the caller's code
+            exit_code = 1
+            try:
+                snapshot.write_snapshot(self.directory, orderbooks, last_sequence)
+                exit_code = 0
+            finally:
+                os._exit(exit_code)
+        metrics = CheckpointMetrics(last_sequence, pause_seconds=time.perf_counter() - start, forked=True)
+        self.history.append(metrics)
+        self._child_pid = pid
+        self._reaper = threading.Thread(target=self._reap, args=(pid, start, metrics), name="CheckpointReaper", daemon=True)
+        self._reaper.start()
+        return metrics
+
+    def _reap(self, pid: int, start: float, metrics: CheckpointMetrics):
+        pid, status = os.waitpid(pid, 0)
+        metrics.duration_seconds = time.perf_counter() - start
+        metrics.succeeded = os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+        self._child_pid = None
+
+    def wait(self, timeout: Optional[float] = None):
+        """
+        Block until the running checkpoint child, if any, has exited.
+        """
+        reaper = self._reaper
+        if reaper is not None:
+            reaper.join(timeout)
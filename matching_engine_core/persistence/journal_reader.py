@@ -0,0 +1,141 @@
+import bisect
+import mmap
+import os
+from typing import Callable, Generator, List, Optional, Tuple
+
+from matching_engine_core.models.order import Order
+from matching_engine_core.orderbook import Orderbook
+from matching_engine_core.persistence import records
+from matching_engine_core.persistence.journal_writer import INDEX_ENTRY, SEGMENT_HEADER, SEGMENT_MAGIC, index_path, list_segments
+
+
+def apply_command(orderbook: Orderbook, command: records.Command):
+    """
+    Apply a journaled command to an orderbook the same way it was applied when it was journaled.
+    """
+    if isinstance(command, records.SubmitCommand):
+        orderbook.submit_order(Order(cl_ord_id=command.cl_ord_id,
+                                     order_id=command.order_id,
+                                     side=command.side,
+                                     qty=command.qty,
+                                     price=command.price,
+                                     symbol=command.symbol,
+                                     timestamp=command.timestamp,
+                                     time_in_force=command.time_in_force))
+    elif isinstance(command, records.CancelCommand):
+        order = orderbook.get_order(command.order_id)
+        if order is not None:
+            orderbook.cancel_order(order)
+    elif isinstance(command, records.ReplaceCommand):
+        order = orderbook.get_order(command.order_id)
+        if order is not None:
+            orderbook.replace_order(order, command.new_price, command.new_qty)
+    else:
+        orderbook.cancel_orders_in_range(command.side, command.lo, command.hi)
+
+
+class JournalReader:
+    """
+    Reads journal segments through read only memory maps, records are decoded in place from a memoryview over the map.
+    Seeking to a sequence uses the segment file names (first sequence of every segment) and the sparse index of the segment,
+    so only the records between the closest index entry and the requested sequence are scanned.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _segments(self) -> List[Tuple[int, str]]:
+        segments = []
+        for path in list_segments(self.directory):
+            first_sequence = int(os.path.basename(path).split(".")[0])
+            segments.append((first_sequence, path))
+        return segments
+
+    @staticmethod
+    def _seek_offset(path: str, sequence: int) -> int:
+        # offset of the closest indexed record at or before sequence, the start of the records if there is none
+        offset = SEGMENT_HEADER.size
+        try:
+            with open(index_path(path), "rb") as f:
+                index = f.read()
+        except FileNotFoundError:
+            return offset
+        entry_count = len(index) // INDEX_ENTRY.size
+        sequences = [INDEX_ENTRY.unpack_from(index, i * INDEX_ENTRY.size)[0] for i in range(entry_count)]
+        position = bisect.bisect_right(sequences, sequence) - 1
+        if position >= 0:
+            offset = INDEX_ENTRY.unpack_from(index, position * INDEX_ENTRY.size)[1]
+        return offset
+
+    def _scan(self, from_sequence: int) -> Generator[Tuple[memoryview, int, int, int], None, None]:
+        # (segment view, record offset, record end, sequence) of the complete records starting at from_sequence
+        segments = self._segments()
+        first_sequences = [first_sequence for first_sequence, path in segments]
+        start = max(bisect.bisect_right(first_sequences, from_sequence) - 1, 0)
+        for segment_index in range(start, len(segments)):
+            first_sequence, path = segments[segment_index]
+            is_last_segment = segment_index == len(segments) - 1
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size < SEGMENT_HEADER.size:
+                    continue
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(mapped)
+            try:
+                magic, header_sequence = SEGMENT_HEADER.unpack_from(view, 0)
+                if magic != SEGMENT_MAGIC:
+                    raise records.CorruptRecordError(f"{path} is not a journal segment")
+                offset = self._seek_offset(path, from_sequence) if from_sequence > first_sequence else SEGMENT_HEADER.size
+                while offset < size:
+                    try:
+                        end, sequence = records.verify_record(view, offset)
+                    except records.CorruptRecordError:
+                        if is_last_segment:
+                            return
+                        raise
+                    if sequence >= from_sequence:
+                        yield view, offset, end, sequence
+                    offset = end
+            finally:
+                view.release()
+                mapped.close()
+
+    def read(self, from_sequence: int = 1) -> Generator[records.Command, None, None]:
+        """
+        Stream the commands with sequence greater than or equal to from_sequence.
+        A torn record at the tail of the last segment ends the stream, corruption anywhere else raises CorruptRecordError.
+        """
+        for view, offset, end, sequence in self._scan(from_sequence):
+            yield records.decode_verified_record(view, offset)
+
+    def read_raw(self, from_sequence: int = 1) -> Generator[Tuple[int, bytes], None, None]:
+        """
+        Stream (sequence, encoded record) pairs without decoding, used to ship records as they are written.
+        """
+        for view, offset, end, sequence in self._scan(from_sequence):
+            yield sequence, bytes(view[offset:end])
+
+    def read_batches(self, from_sequence: int = 1, batch_size: int = 4096) -> Generator[List[records.Command], None, None]:
+        batch: List[records.Command] = []
+        for command in self.read(from_sequence):
+            batch.append(command)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if len(batch) > 0:
+            yield batch
+
+    def replay(self, get_orderbook: Callable[[str], Optional[Orderbook]], from_sequence: int = 1, batch_size: int = 4096) -> int:
+        """
+        Apply the commands starting at from_sequence to the orderbooks returned by get_orderbook for their symbols,
+        commands of symbols without an orderbook are skipped. The orderbooks must not journal while replaying.
+        Returns the sequence of the last applied command, from_sequence - 1 if there was none.
+        """
+        last_sequence = from_sequence - 1
+        for batch in self.read_batches(from_sequence, batch_size):
+            for command in batch:
+                orderbook = get_orderbook(command.symbol)
+                if orderbook is not None:
+                    apply_command(orderbook, command)
+            last_sequence = batch[-1].sequence
+        return last_sequence
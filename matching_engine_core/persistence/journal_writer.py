@@ -0,0 +1,274 @@
+import os
+import struct
+import threading
+import time
+from decimal import Decimal
+from enum import Enum
+from typing import BinaryIO, Callable, List, Optional, Tuple
+
+from matching_engine_core.i_command_journal import ICommandJournal
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.side import Side
+from matching_engine_core.persistence import records
+
+SEGMENT_MAGIC = b"BKJ1"
+# magic, sequence of the first record in the segment
+SEGMENT_HEADER = struct.Struct("<4sQ")
+SEGMENT_SUFFIX = ".journal"
+# sparse index of a segment, one (sequence, file offset) entry per index interval records
+INDEX_ENTRY = struct.Struct("<QQ")
+INDEX_SUFFIX = ".index"
+
+
+class FsyncPolicy(Enum):
+    # written batches are left to the page cache of the operating system
+    Never = 0
+    # every group commit is followed by an fsync
+    EveryFlush = 1
+    # at most one fsync per fsync interval, batches in between are only written
+    Interval = 2
+
+
+def segment_file_name(first_sequence: int) -> str:
+    return f"{first_sequence:020d}{SEGMENT_SUFFIX}"
+
+
+def index_path(segment_path: str) -> str:
+    return segment_path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+
+
+def list_segments(directory: str) -> List[str]:
+    """
+    Paths of the journal segments in a directory, ordered by the sequence of their first record.
+    """
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(name for name in os.listdir(directory) if name.endswith(SEGMENT_SUFFIX))
+    return [os.path.join(directory, name) for name in names]
+
+
+def last_sequence_in_segment(path: str) -> int:
+    """
+    Sequence of the last complete record of a segment, a torn record at the tail is ignored.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < SEGMENT_HEADER.size:
+        # torn segment header, the segment has no records and its name holds the sequence of its first record
+        return int(os.path.basename(path)[:-len(SEGMENT_SUFFIX)]) - 1
+    magic, first_sequence = SEGMENT_HEADER.unpack_from(data, 0)
+    last_sequence = first_sequence - 1
+    offset = SEGMENT_HEADER.size
+    view = memoryview(data)
+    try:
+        while offset < len(data):
+            command, offset = records.decode_record(view, offset)
+            last_sequence = command.sequence
+    except records.CorruptRecordError:
+        pass
+    finally:
+        view.release()
+    return last_sequence
+
+
+class JournalWriter(ICommandJournal):
+    """
+    Append only command journal with group commit.
+
+    The matching thread is the single writer, appending a command only encodes it and extends an in memory batch.
+    A background flusher thread swaps the batch out and writes it to the current segment with one write call
+    (and at most one fsync depending on the policy), so the matching thread never waits for disk I/O.
+    Segments are rotated once they grow past segment_size, each segment is named after the sequence of its first record.
+
+    After a restart sequences continue after the last record on disk, or after start_sequence when it is higher. The
+    sequence returned by recover must be passed as start_sequence, since a snapshot may cover sequences that were never
+    written to the journal and those must not be handed out again.
+    """
+
+    def __init__(self,
+                 directory: str,
+                 segment_size: int = 64 * 1024 * 1024,
+                 fsync_policy: FsyncPolicy = FsyncPolicy.EveryFlush,
+                 fsync_interval: float = 1.0,
+                 flush_interval: float = 0.001,
+                 index_interval: int = 1024,
+                 background: bool = True,
+                 start_sequence: int = 0):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.flush_interval = flush_interval
+        self.index_interval = index_interval
+        os.makedirs(directory, exist_ok=True)
+        segments = list_segments(directory)
+        # a new segment is started after restart so a torn tail of the previous run is never appended to
+        self._sequence = max(last_sequence_in_segment(segments[-1]) if segments else 0, start_sequence)
+        self._durable_sequence = self._sequence
+        self._pending = bytearray()
+        self._pending_first_sequence = self._sequence + 1
+        # (sequence, offset in pending batch) of the records that will be indexed
+        self._pending_index: List[Tuple[int, int]] = []
+        self._pending_lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._flush_condition = threading.Condition(self._pending_lock)
+        self._segment: Optional[BinaryIO] = None
+        self._index: Optional[BinaryIO] = None
+        self._segment_bytes = 0
+        self._last_fsync = 0.0
+        self._closed = False
+        # called with (first sequence, last sequence, records) after every group commit, in sequence order
+        self._listeners: List[Callable[[int, int, bytes], None]] = []
+        # a failing listener is skipped for the batch, the batch is committed anyway
+        self.listener_error_count = 0
+        self.last_listener_error: Optional[Exception] = None
+        # error that stopped the background flusher, appends raise it to the matching thread
+        self._flush_error: Optional[Exception] = None
+        self._flusher: Optional[threading.Thread] = None
+        if background:
+            self._flusher = threading.Thread(target=self._flush_loop, name="JournalFlusher", daemon=True)
+            self._flusher.start()
+
+    @property
+    def last_sequence(self) -> int:
+        return self._sequence
+
+    @property
+    def durable_sequence(self) -> int:
+        # last sequence written to a segment file, it is also synced to disk when the fsync policy is EveryFlush
+        return self._durable_sequence
+
+    def add_listener(self, listener: Callable[[int, int, bytes], None]):
+        """
+        Register a callback for written batches, it runs on the flushing thread and should only hand the batch over.
+        """
+        with self._io_lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[int, int, bytes], None]):
+        with self._io_lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _append(self, record: bytes, sequence: int) -> int:
+        with self._pending_lock:
+            if self._closed:
+                raise ValueError("Journal is closed")
+            if self._flush_error is not None:
+                raise IOError(f"Journal flusher failed, commands are no longer made durable: {self._flush_error!r}") from self._flush_error
+            if sequence % self.index_interval == 0:
+                self._pending_index.append((sequence, len(self._pending)))
+            if len(self._pending) == 0:
+                # wakes the idle flusher, it is only notified for the first record of a batch
+                self._flush_condition.notify()
+            self._pending += record
+            self._sequence = sequence
+        return sequence
+
+    def append_submit(self, order: Order) -> int:
+        sequence = self._sequence + 1
+        return self._append(records.encode_submit(sequence, order), sequence)
+
+    def append_cancel(self, order: Order) -> int:
+        sequence = self._sequence + 1
+        return self._append(records.encode_cancel(sequence, order), sequence)
+
+    def append_replace(self, order: Order, new_price: Optional[Decimal], new_qty: Optional[Decimal]) -> int:
+        sequence = self._sequence + 1
+        return self._append(records.encode_replace(sequence, order, new_price, new_qty), sequence)
+
+    def append_mass_cancel(self, symbol: str, side: Side, lo: Optional[Decimal], hi: Optional[Decimal]) -> int:
+        sequence = self._sequence + 1
+        return self._append(records.encode_mass_cancel(sequence, symbol, side, lo, hi), sequence)
+
+    def _open_segment(self, first_sequence: int):
+        if self._segment is not None:
+            self._sync(force=True)
+            self._segment.close()
+            self._index.close()
+        path = os.path.join(self.directory, segment_file_name(first_sequence))
+        self._segment = open(path, "wb")
+        self._index = open(index_path(path), "wb")
+        self._segment.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, first_sequence))
+        self._segment_bytes = SEGMENT_HEADER.size
+
+    def _sync(self, force: bool = False):
+        if self._segment is None or self.fsync_policy == FsyncPolicy.Never:
+            return
+        now = time.monotonic()
+        if force or self.fsync_policy == FsyncPolicy.EveryFlush or now - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._segment.fileno())
+            self._last_fsync = now
+
+    def flush(self, force_sync: bool = False):
+        """
+        Write the pending batch as a single group commit, blocks until it is written and synced per policy. force_sync
+        also syncs a batch the Interval policy would leave unsynced (or the previous batch when nothing is pending).
+        """
+        with self._io_lock:
+            with self._pending_lock:
+                batch = self._pending
+                batch_index = self._pending_index
+                first_sequence = self._pending_first_sequence
+                last_sequence = self._sequence
+                self._pending = bytearray()
+                self._pending_index = []
+                self._pending_first_sequence = last_sequence + 1
+            if len(batch) == 0:
+                if force_sync:
+                    self._sync(force=True)
+                return
+            if self._segment is None or self._segment_bytes >= self.segment_size:
+                self._open_segment(first_sequence)
+            batch_offset = self._segment_bytes
+            self._segment.write(batch)
+            self._segment_bytes += len(batch)
+            self._segment.flush()
+            self._sync(force_sync)
+            # index entries are written after their records so an entry never points past the end of a segment
+            if len(batch_index) > 0:
+                self._index.write(b"".join(INDEX_ENTRY.pack(sequence, batch_offset + offset) for sequence, offset in batch_index))
+                self._index.flush()
+            if len(self._listeners) > 0:
+                written = bytes(batch)
+                for listener in self._listeners:
+                    try:
+                        listener(first_sequence, last_sequence, written)
+                    except Exception as e:
+                        # e.g. a replication session on a broken socket, it must not stop the group commits
+                        self.listener_error_count += 1
+                        self.last_listener_error = e
+            self._durable_sequence = last_sequence
+
+    def _flush_loop(self):
+        while True:
+            with self._flush_condition:
+                while len(self._pending) == 0 and not self._closed:
+                    self._flush_condition.wait()
+                # records appended within the flush interval join the same group commit
+                if not self._closed:
+                    self._flush_condition.wait(self.flush_interval)
+                closed = self._closed
+            try:
+                self.flush()
+            except Exception as e:
+                with self._pending_lock:
+                    self._flush_error = e
+                return
+            if closed:
+                return
+
+    def close(self):
+        with self._flush_condition:
+            self._closed = True
+            self._flush_condition.notify()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        with self._io_lock:
+            if self._segment is not None:
+                self._sync(force=True)
+                self._segment.close()
+                self._index.close()
+                self._segment = None
+                self._index = None
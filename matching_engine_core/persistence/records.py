@@ -0,0 +1,228 @@
+"""Fixed layout binary records of the command journal.
+
+Every record starts with a fixed header followed by a fixed layout body of its record type,
+the variable length strings (symbol, order id, ...) are appended after the body and their lengths are part of the body.
+
+    header: total length (uint32), crc32 (uint32), sequence (uint64), record type (uint8)
+
+The crc32 covers the length, sequence and record type fields of the header and the whole body, so a corrupted header
+is detected as well and never replayed as another command or sequence.
+
+Decimals are stored as a signed 64 bit coefficient and a signed 8 bit exponent, so they round trip without loss.
+"""
+import struct
+import zlib
+from decimal import Decimal
+from enum import Enum
+from typing import NamedTuple, Optional, Tuple, Union
+
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.side import Side
+from matching_engine_core.models.time_in_force import TimeInForce
+
+
+class RecordType(Enum):
+    Submit = 1
+    Cancel = 2
+    Replace = 3
+    MassCancel = 4
+
+
+class SubmitCommand(NamedTuple):
+    sequence: int
+    timestamp: int
+    symbol: str
+    order_id: str
+    cl_ord_id: str
+    side: Side
+    time_in_force: TimeInForce
+    price: Decimal
+    qty: Decimal
+
+
+class CancelCommand(NamedTuple):
+    sequence: int
+    symbol: str
+    order_id: str
+
+
+class ReplaceCommand(NamedTuple):
+    sequence: int
+    symbol: str
+    order_id: str
+    new_price: Optional[Decimal]
+    new_qty: Optional[Decimal]
+
+
+class MassCancelCommand(NamedTuple):
+    sequence: int
+    symbol: str
+    side: Side
+    lo: Optional[Decimal]
+    hi: Optional[Decimal]
+
+
+Command = Union[SubmitCommand, CancelCommand, ReplaceCommand, MassCancelCommand]
+
+HEADER = struct.Struct("<IIQB")
+# header fields covered by the crc32: total length, sequence, record type
+_CHECKED_HEADER = struct.Struct("<IQB")
+# timestamp, side, time in force, price coefficient, price exponent, qty coefficient, qty exponent, symbol length, order id length, cl ord id length
+_SUBMIT_BODY = struct.Struct("<qBBqbqbBBB")
+# symbol length, order id length
+_CANCEL_BODY = struct.Struct("<BB")
+# has price, price coefficient, price exponent, has qty, qty coefficient, qty exponent, symbol length, order id length
+_REPLACE_BODY = struct.Struct("<?qb?qbBB")
+# side, has lo, lo coefficient, lo exponent, has hi, hi coefficient, hi exponent, symbol length
+_MASS_CANCEL_BODY = struct.Struct("<B?qb?qbB")
+
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+_SIDES = {side.value: side for side in Side}
+_TIME_IN_FORCES = {tif.value: tif for tif in TimeInForce}
+_RECORD_TYPES = {record_type.value: record_type for record_type in RecordType}
+
+
+class CorruptRecordError(Exception):
+    pass
+
+
+def encode_decimal(value: Decimal) -> Tuple[int, int]:
+    exponent = value.as_tuple().exponent
+    if not isinstance(exponent, int) or exponent < -128 or exponent > 127:
+        raise ValueError(f"Decimal {value} can not be encoded")
+    coefficient = int(value.scaleb(-exponent))
+    if coefficient < _INT64_MIN or coefficient > _INT64_MAX:
+        raise ValueError(f"Decimal {value} can not be encoded")
+    return coefficient, exponent
+
+
+def decode_decimal(coefficient: int, exponent: int) -> Decimal:
+    if exponent == 0:
+        return Decimal(coefficient)
+    return Decimal(coefficient).scaleb(exponent)
+
+
+def _encode_optional_decimal(value: Optional[Decimal]) -> Tuple[bool, int, int]:
+    if value is None:
+        return False, 0, 0
+    coefficient, exponent = encode_decimal(value)
+    return True, coefficient, exponent
+
+
+def _encode_strings(*values: str) -> Tuple[bytes, ...]:
+    encoded = tuple(value.encode() for value in values)
+    for value in encoded:
+        if len(value) > 255:
+            raise ValueError(f"String field {value!r} is longer than 255 bytes")
+    return encoded
+
+
+def _checksum(length: int, sequence: int, record_type_value: int, body) -> int:
+    return zlib.crc32(body, zlib.crc32(_CHECKED_HEADER.pack(length, sequence, record_type_value)))
+
+
+def _frame(sequence: int, record_type: RecordType, body: bytes) -> bytes:
+    length = HEADER.size + len(body)
+    return HEADER.pack(length, _checksum(length, sequence, record_type.value, body), sequence, record_type.value) + body
+
+
+def encode_submit(sequence: int, order: Order) -> bytes:
+    symbol, order_id, cl_ord_id = _encode_strings(order.symbol, order.order_id, order.cl_ord_id)
+    price_coefficient, price_exponent = encode_decimal(order.price)
+    qty_coefficient, qty_exponent = encode_decimal(order.qty)
+    body = _SUBMIT_BODY.pack(order.timestamp, order.side.value, order.time_in_force.value,
+                             price_coefficient, price_exponent, qty_coefficient, qty_exponent,
+                             len(symbol), len(order_id), len(cl_ord_id)) + symbol + order_id + cl_ord_id
+    return _frame(sequence, RecordType.Submit, body)
+
+
+def encode_cancel(sequence: int, order: Order) -> bytes:
+    symbol, order_id = _encode_strings(order.symbol, order.order_id)
+    body = _CANCEL_BODY.pack(len(symbol), len(order_id)) + symbol + order_id
+    return _frame(sequence, RecordType.Cancel, body)
+
+
+def encode_replace(sequence: int, order: Order, new_price: Optional[Decimal], new_qty: Optional[Decimal]) -> bytes:
+    symbol, order_id = _encode_strings(order.symbol, order.order_id)
+    body = _REPLACE_BODY.pack(*_encode_optional_decimal(new_price), *_encode_optional_decimal(new_qty),
+                              len(symbol), len(order_id)) + symbol + order_id
+    return _frame(sequence, RecordType.Replace, body)
+
+
+def encode_mass_cancel(sequence: int, symbol: str, side: Side, lo: Optional[Decimal], hi: Optional[Decimal]) -> bytes:
+    encoded_symbol, = _encode_strings(symbol)
+    body = _MASS_CANCEL_BODY.pack(side.value, *_encode_optional_decimal(lo), *_encode_optional_decimal(hi),
+                                  len(encoded_symbol)) + encoded_symbol
+    return _frame(sequence, RecordType.MassCancel, body)
+
+
+def _decode_string(buffer, offset: int, length: int) -> str:
+    return str(buffer[offset:offset + length], "utf-8")
+
+
+def verify_record(buffer, offset: int = 0) -> Tuple[int, int]:
+    """
+    Check the framing and checksum of the record starting at offset, returns the offset of the next record and the sequence.
+    """
+    if len(buffer) - offset < HEADER.size:
+        raise CorruptRecordError(f"Truncated record header at offset {offset}")
+    length, crc, sequence, record_type_value = HEADER.unpack_from(buffer, offset)
+    end = offset + length
+    if length < HEADER.size or end > len(buffer):
+        raise CorruptRecordError(f"Truncated record at offset {offset}")
+    if _checksum(length, sequence, record_type_value, buffer[offset + HEADER.size:end]) != crc:
+        raise CorruptRecordError(f"Checksum mismatch for record at offset {offset}")
+    return end, sequence
+
+
+def decode_record(buffer, offset: int = 0) -> Tuple[Command, int]:
+    """
+    Decode the record starting at offset of a bytes like buffer (bytes, mmap or memoryview) without copying the buffer.
+    Returns the command and the offset of the next record.
+    """
+    end, sequence = verify_record(buffer, offset)
+    return decode_verified_record(buffer, offset), end
+
+
+def decode_verified_record(buffer, offset: int = 0) -> Command:
+    length, crc, sequence, record_type_value = HEADER.unpack_from(buffer, offset)
+    body_offset = offset + HEADER.size
+    record_type = _RECORD_TYPES.get(record_type_value)
+    if record_type == RecordType.Submit:
+        (timestamp, side, time_in_force, price_coefficient, price_exponent, qty_coefficient, qty_exponent,
+         symbol_length, order_id_length, cl_ord_id_length) = _SUBMIT_BODY.unpack_from(buffer, body_offset)
+        string_offset = body_offset + _SUBMIT_BODY.size
+        symbol = _decode_string(buffer, string_offset, symbol_length)
+        string_offset += symbol_length
+        order_id = _decode_string(buffer, string_offset, order_id_length)
+        string_offset += order_id_length
+        cl_ord_id = _decode_string(buffer, string_offset, cl_ord_id_length)
+        command = SubmitCommand(sequence, timestamp, symbol, order_id, cl_ord_id, _SIDES[side], _TIME_IN_FORCES[time_in_force],
+                                decode_decimal(price_coefficient, price_exponent), decode_decimal(qty_coefficient, qty_exponent))
+    elif record_type == RecordType.Cancel:
+        symbol_length, order_id_length = _CANCEL_BODY.unpack_from(buffer, body_offset)
+        string_offset = body_offset + _CANCEL_BODY.size
+        command = CancelCommand(sequence,
+                                _decode_string(buffer, string_offset, symbol_length),
+                                _decode_string(buffer, string_offset + symbol_length, order_id_length))
+    elif record_type == RecordType.Replace:
+        (has_price, price_coefficient, price_exponent, has_qty, qty_coefficient, qty_exponent,
+         symbol_length, order_id_length) = _REPLACE_BODY.unpack_from(buffer, body_offset)
+        string_offset = body_offset + _REPLACE_BODY.size
+        command = ReplaceCommand(sequence,
+                                 _decode_string(buffer, string_offset, symbol_length),
+                                 _decode_string(buffer, string_offset + symbol_length, order_id_length),
+                                 decode_decimal(price_coefficient, price_exponent) if has_price else None,
+                                 decode_decimal(qty_coefficient, qty_exponent) if has_qty else None)
+    elif record_type == RecordType.MassCancel:
+        (side, has_lo, lo_coefficient, lo_exponent, has_hi, hi_coefficient, hi_exponent,
+         symbol_length) = _MASS_CANCEL_BODY.unpack_from(buffer, body_offset)
+        command = MassCancelCommand(sequence,
+                                    _decode_string(buffer, body_offset + _MASS_CANCEL_BODY.size, symbol_length),
+                                    _SIDES[side],
+                                    decode_decimal(lo_coefficient, lo_exponent) if has_lo else None,
+                                    decode_decimal(hi_coefficient, hi_exponent) if has_hi else None)
+    else:
+        raise CorruptRecordError(f"Unknown record type {record_type_value} at offset {offset}")
+    return command
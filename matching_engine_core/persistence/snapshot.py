@@ -0,0 +1,195 @@
+"""Compact binary L3 snapshots of orderbooks.
+
+    header: magic, last journal sequence (uint64), orderbook count (uint32)
+    per orderbook: symbol, trade id prefix, trade id counter, event sequence, order count, then every resting order in priority order
+    trailer: crc32 of everything before it
+
+Recovery loads the newest valid snapshot and replays only the journal records after its sequence.
+"""
+import os
+import struct
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from matching_engine_core.id_generator import IdGenerator
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.order_status import OrderStatus
+from matching_engine_core.models.side import Side
+from matching_engine_core.models.time_in_force import TimeInForce
+from matching_engine_core.orderbook import Orderbook
+from matching_engine_core.persistence import records
+from matching_engine_core.persistence.journal_reader import JournalReader
+from matching_engine_core.persistence.journal_writer import JournalWriter
+
+SNAPSHOT_MAGIC = b"BKS1"
+SNAPSHOT_SUFFIX = ".snapshot"
+_HEADER = struct.Struct("<4sQI")
+# symbol length, trade id prefix length, trade id counter, event sequence, order count
+_BOOK_HEADER = struct.Struct("<BBQQI")
+# side, time in force, status, price coefficient, price exponent, qty coefficient, qty exponent,
+# filled qty coefficient, filled qty exponent, timestamp, order id length, cl ord id length
+_ORDER = struct.Struct("<BBBqbqbqbqBB")
+_TRAILER = struct.Struct("<I")
+
+_SIDES = {side.value: side for side in Side}
+_TIME_IN_FORCES = {tif.value: tif for tif in TimeInForce}
+_STATUSES = {status.value: status for status in OrderStatus}
+
+
+def snapshot_file_name(last_sequence: int) -> str:
+    return f"{last_sequence:020d}{SNAPSHOT_SUFFIX}"
+
+
+def encode_snapshot(orderbooks: Iterable[Orderbook], last_sequence: int) -> bytes:
+    orderbooks = list(orderbooks)
+    parts: List[bytes] = [_HEADER.pack(SNAPSHOT_MAGIC, last_sequence, len(orderbooks))]
+    for orderbook in orderbooks:
+        orders = list(orderbook.in_order_sell_orders())
+        orders.extend(orderbook.in_order_buy_orders())
+        symbol = orderbook.symbol.encode()
+        prefix = orderbook.trade_id_generator.prefix.encode()
+        parts.append(_BOOK_HEADER.pack(len(symbol), len(prefix), orderbook.trade_id_generator.value, orderbook.sequence, len(orders)))
+        parts.append(symbol)
+        parts.append(prefix)
+        for order in orders:
+            order_id = order.order_id.encode()
+            cl_ord_id = order.cl_ord_id.encode()
+            parts.append(_ORDER.pack(order.side.value, order.time_in_force.value, order.status.value,
+                                     *records.encode_decimal(order.price),
+                                     *records.encode_decimal(order.qty),
+                                     *records.encode_decimal(order.filled_qty),
+                                     order.timestamp, len(order_id), len(cl_ord_id)))
+            parts.append(order_id)
+            parts.append(cl_ord_id)
+    body = b"".join(parts)
+    return body + _TRAILER.pack(zlib.crc32(body))
+
+
+def decode_snapshot(data: bytes) -> Tuple[int, List[Orderbook]]:
+    """
+    Rebuild the orderbooks of a snapshot, returns the journal sequence the snapshot was taken at and the orderbooks.
+    """
+    if len(data) < _HEADER.size + _TRAILER.size:
+        raise records.CorruptRecordError("Truncated snapshot")
+    view = memoryview(data)
+    body_size = len(data) - _TRAILER.size
+    if zlib.crc32(view[:body_size]) != _TRAILER.unpack_from(view, body_size)[0]:
+        raise records.CorruptRecordError("Snapshot checksum mismatch")
+    magic, last_sequence, book_count = _HEADER.unpack_from(view, 0)
+    if magic != SNAPSHOT_MAGIC:
+        raise records.CorruptRecordError("Not a snapshot")
+    offset = _HEADER.size
+    orderbooks: List[Orderbook] = []
+    for i in range(book_count):
+        symbol_length, prefix_length, trade_id_counter, book_sequence, order_count = _BOOK_HEADER.unpack_from(view, offset)
+        offset += _BOOK_HEADER.size
+        symbol = str(view[offset:offset + symbol_length], "utf-8")
+        offset += symbol_length
+        prefix = str(view[offset:offset + prefix_length], "utf-8")
+        offset += prefix_length
+        orders: List[Order] = []
+        for j in range(order_count):
+            (side, time_in_force, status, price_coefficient, price_exponent, qty_coefficient, qty_exponent,
+             filled_coefficient, filled_exponent, timestamp, order_id_length, cl_ord_id_length) = _ORDER.unpack_from(view, offset)
+            offset += _ORDER.size
+            order_id = str(view[offset:offset + order_id_length], "utf-8")
+            offset += order_id_length
+            cl_ord_id = str(view[offset:offset + cl_ord_id_length], "utf-8")
+            offset += cl_ord_id_length
+            orders.append(Order(cl_ord_id=cl_ord_id,
+                                order_id=order_id,
+                                side=_SIDES[side],
+                                qty=records.decode_decimal(qty_coefficient, qty_exponent),
+                                price=records.decode_decimal(price_coefficient, price_exponent),
+                                symbol=symbol,
+                                status=_STATUSES[status],
+                                filled_qty=records.decode_decimal(filled_coefficient, filled_exponent),
+                                timestamp=timestamp,
+                                time_in_force=_TIME_IN_FORCES[time_in_force]))
+        orderbook = Orderbook(symbol, trade_id_generator=IdGenerator(prefix, trade_id_counter))
+        orderbook.load_snapshot(orders)
+        orderbook.sequence = book_sequence
+        orderbooks.append(orderbook)
+    view.release()
+    return last_sequence, orderbooks
+
+
+def write_snapshot(directory: str, orderbooks: Iterable[Orderbook], last_sequence: int) -> str:
+    """
+    Write the snapshot to a temporary file and atomically rename it, so a crash never leaves a partial snapshot behind.
+    Must be called between two commands so that the orderbooks reflect exactly the commands up to last_sequence.
+    """
+    return write_snapshot_bytes(directory, encode_snapshot(orderbooks, last_sequence), last_sequence)
+
+
+def write_journaled_snapshot(directory: str, orderbooks: Iterable[Orderbook], journal: JournalWriter) -> str:
+    """
+    Write a snapshot of orderbooks that journal to journal, tagged with the journal's durable sequence. The journal is
+    flushed first, so the snapshot never covers commands that a crash could still lose from the journal.
+    Must be called on the matching thread between two commands.
+    """
+    journal.flush(force_sync=True)
+    if journal.durable_sequence != journal.last_sequence:
+        raise ValueError(f"Journal was appended to while the snapshot was taken, durable sequence {journal.durable_sequence} "
+                         f"last sequence {journal.last_sequence}")
+    return write_snapshot(directory, orderbooks, journal.durable_sequence)
+
+
+def write_snapshot_bytes(directory: str, data: bytes, last_sequence: int) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, snapshot_file_name(last_sequence))
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    return path
+
+
+def list_snapshots(directory: str) -> List[str]:
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(name for name in os.listdir(directory) if name.endswith(SNAPSHOT_SUFFIX))
+    return [os.path.join(directory, name) for name in names]
+
+
+def load_latest_snapshot(directory: str) -> Optional[Tuple[int, List[Orderbook]]]:
+    """
+    Load the newest snapshot that is valid, corrupt snapshots are skipped in favor of older ones. A snapshot whose
+    orderbooks can not be loaded (e.g. a crossed book) is corrupt as well.
+    """
+    for path in reversed(list_snapshots(directory)):
+        with open(path, "rb") as f:
+            data = f.read()
+        try:
+            return decode_snapshot(data)
+        except (records.CorruptRecordError, ValueError):
+            continue
+    return None
+
+
+def recover(snapshot_directory: str, journal_directory: str) -> Tuple[int, Dict[str, Orderbook]]:
+    """
+    Rebuild orderbooks from the newest snapshot and the journal tail after it.
+    Orderbooks of symbols that appear only in the journal tail are created while replaying.
+    Returns the last recovered journal sequence and the orderbooks by symbol, journals should be attached afterwards.
+    The restarted JournalWriter has to get the returned sequence as start_sequence.
+    """
+    last_sequence = 0
+    orderbooks: Dict[str, Orderbook] = dict()
+    snapshot = load_latest_snapshot(snapshot_directory)
+    if snapshot is not None:
+        last_sequence, snapshot_orderbooks = snapshot
+        for orderbook in snapshot_orderbooks:
+            orderbooks[orderbook.symbol] = orderbook
+
+    def get_orderbook(symbol: str) -> Orderbook:
+        orderbook = orderbooks.get(symbol)
+        if orderbook is None:
+            orderbook = Orderbook(symbol)
+            orderbooks[symbol] = orderbook
+        return orderbook
+
+    last_sequence = JournalReader(journal_directory).replay(get_orderbook, from_sequence=last_sequence + 1)
+    return last_sequence, orderbooks
@@ -0,0 +1,58 @@
+from decimal import Decimal
+from typing import Optional
+
+from helper.collections.mapped_doubly_queue import MappedDoublyQueue
+from matching_engine_core.models.level_snapshot import LevelSnapshot
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.resting_order import RestingOrder
+
+
+class PriceLevel(MappedDoublyQueue[str, Order]):
+    """Time priority queue of orders at a single price which also keeps the aggregate open quantity of the level."""
+
+    def __init__(self, price: Decimal):
+        super().__init__()
+        self.price: Decimal = price
+        self.total_qty: Decimal = Decimal("0")
+        # copy of the level taken by snapshot, dropped by every change so unchanged levels are copied only once
+        self._snapshot: Optional[LevelSnapshot] = None
+
+    @property
+    def order_count(self) -> int:
+        return len(self.map)
+
+    def enqueue(self, key: str, value: Order):
+        super().enqueue(key, value)
+        self._snapshot = None
+        self.total_qty += value.open_qty
+
+    def dequeue(self) -> Order:
+        order = super().dequeue()
+        self._snapshot = None
+        self.total_qty -= order.open_qty
+        return order
+
+    def delete(self, key: str) -> bool:
+        node = self.map.get(key)
+        if node is None:
+            return False
+        super().delete(key)
+        self._snapshot = None
+        self.total_qty -= node.value.open_qty
+        return True
+
+    def reduce(self, qty: Decimal):
+        """
+        Reflect a fill of one of the orders in the level to the aggregate quantity.
+        """
+        self.total_qty -= qty
+        self._snapshot = None
+
+    def snapshot(self) -> LevelSnapshot:
+        """
+        Immutable copy of the level, the same one is returned until the level changes.
+        """
+        if self._snapshot is None:
+            self._snapshot = LevelSnapshot(self.price, self.total_qty,
+                                           tuple(RestingOrder.of(order) for _, order in self.traverse()))
+        return self._snapshot
@@ -0,0 +1,138 @@
+import socket
+import threading
+from typing import Dict, Optional, Tuple
+
+from matching_engine_core.orderbook import Orderbook
+from matching_engine_core.persistence import records, snapshot
+from matching_engine_core.persistence.journal_reader import apply_command
+from matching_engine_core.replication.protocol import MessageType, receive_frame, send_sequence
+
+
+class ReplicationFollower:
+    """
+    Hot standby that applies the primary's journal records to its own orderbooks.
+
+    The follower keeps its orderbooks and last applied sequence across reconnects, so after a reconnect it only
+    receives what it missed (or the primary's newest snapshot when that is ahead of it). On failover the orderbooks
+    are already up to date and can be used right away, no journal has to be replayed.
+
+    A corrupt record or a sequence gap in the stream is never applied, the follower reconnects and resyncs from the
+    primary's newest snapshot. After max_resyncs resyncs in a row without progress (or a failed reconnect) it stops
+    and keeps the error in error, failed tells callers that the standby is no longer replicating.
+    """
+
+    def __init__(self, primary_address: Tuple[str, int], max_resyncs: int = 3):
+        self.primary_address = primary_address
+        self.max_resyncs = max_resyncs
+        self.orderbooks: Dict[str, Orderbook] = dict()
+        self.last_applied_sequence = 0
+        self.resync_count = 0
+        # error that stopped replication, None while replicating or after disconnect
+        self.error: Optional[Exception] = None
+        self._sock: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stopping = False
+
+    @property
+    def connected(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+    def get_orderbook(self, symbol: str) -> Orderbook:
+        orderbook = self.orderbooks.get(symbol)
+        if orderbook is None:
+            orderbook = Orderbook(symbol)
+            self.orderbooks[symbol] = orderbook
+        return orderbook
+
+    def connect(self):
+        self._stopping = False
+        self.error = None
+        self._sock = self._open(self.last_applied_sequence)
+        self._thread = threading.Thread(target=self._receive_loop, name="ReplicationFollower", daemon=True)
+        self._thread.start()
+
+    def _open(self, sequence: int) -> socket.socket:
+        sock = socket.create_connection(self.primary_address)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        send_sequence(sock, MessageType.Hello, sequence)
+        return sock
+
+    def _apply_snapshot(self, payload: bytes):
+        last_sequence, orderbooks = snapshot.decode_snapshot(payload)
+        with self._lock:
+            self.orderbooks = {orderbook.symbol: orderbook for orderbook in orderbooks}
+            self.last_applied_sequence = last_sequence
+
+    def _apply_records(self, payload: bytes):
+        view = memoryview(payload)
+        offset = 0
+        try:
+            with self._lock:
+                while offset < len(view):
+                    command, offset = records.decode_record(view, offset)
+                    if command.sequence <= self.last_applied_sequence:
+                        continue
+                    if command.sequence != self.last_applied_sequence + 1:
+                        raise records.CorruptRecordError(f"Sequence gap, expected {self.last_applied_sequence + 1} got {command.sequence}")
+                    apply_command(self.get_orderbook(command.symbol), command)
+                    self.last_applied_sequence = command.sequence
+        finally:
+            view.release()
+
+    def _receive(self, sock: socket.socket):
+        while True:
+            message_type, payload = receive_frame(sock)
+            if message_type == MessageType.Snapshot:
+                self._apply_snapshot(payload)
+            elif message_type == MessageType.Records:
+                self._apply_records(payload)
+            else:
+                continue
+            send_sequence(sock, MessageType.Ack, self.last_applied_sequence)
+
+    def _receive_loop(self):
+        resyncs = 0
+        resync_sequence = self.last_applied_sequence
+        while True:
+            sock = self._sock
+            try:
+                self._receive(sock)
+            except records.CorruptRecordError as e:
+                error: Exception = e
+            except (ConnectionError, OSError):
+                return
+            finally:
+                sock.close()
+            # only resyncs that did not get the follower past the sequence of the previous one count against the limit
+            resyncs = 1 if self.last_applied_sequence > resync_sequence else resyncs + 1
+            resync_sequence = self.last_applied_sequence
+            with self._lock:
+                if self._stopping:
+                    return
+                if resyncs > self.max_resyncs:
+                    self.error = error
+                    return
+                try:
+                    # hello with sequence 0 makes the primary send its newest snapshot, which replaces the orderbooks,
+                    # records the follower has already applied are skipped
+                    self._sock = self._open(0)
+                except OSError as e:
+                    self.error = e
+                    return
+                self.resync_count += 1
+
+    def disconnect(self):
+        with self._lock:
+            self._stopping = True
+            if self._sock is not None:
+                try:
+                    self._sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        if self._thread is not None:
+            self._thread.join()
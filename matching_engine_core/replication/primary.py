@@ -0,0 +1,171 @@
+import os
+import queue
+import socket
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from matching_engine_core.persistence import records, snapshot
+from matching_engine_core.persistence.journal_reader import JournalReader
+from matching_engine_core.persistence.journal_writer import JournalWriter
+from matching_engine_core.replication.protocol import MessageType, decode_sequence, receive_frame, send_frame
+
+# catch up records read from disk are sent in chunks of this many bytes
+_CATCH_UP_CHUNK_SIZE = 256 * 1024
+
+
+@dataclass
+class FollowerStatus:
+    address: Tuple[str, int]
+    # last sequence sent to the follower
+    sent_sequence: int = 0
+    # last sequence the follower reported as applied
+    acked_sequence: int = 0
+    connected: bool = True
+
+
+def _records_after(first_sequence: int, batch: bytes, sequence: int) -> bytes:
+    # part of a batch of consecutive records whose sequences are greater than sequence
+    if first_sequence > sequence:
+        return batch
+    offset = 0
+    current = first_sequence
+    while offset < len(batch) and current <= sequence:
+        length = records.HEADER.unpack_from(batch, offset)[0]
+        offset += length
+        current += 1
+    return batch[offset:]
+
+
+class _FollowerSession:
+    def __init__(self, sock: socket.socket, status: FollowerStatus):
+        self.sock = sock
+        self.status = status
+        self.live_batches: "queue.Queue[Optional[Tuple[int, int, bytes]]]" = queue.Queue()
+
+
+class ReplicationPrimary:
+    """
+    Streams sequenced journal records to hot standby followers over TCP.
+
+    A connecting follower reports the last sequence it applied. When the newest snapshot is ahead of it, the follower
+    first receives that snapshot, then the journal records after it are read from disk and finally the follower joins
+    the live stream of group commits coming from the journal writer. Followers ack the sequences they applied,
+    the lag of every follower is the distance between the journal's last sequence and its ack.
+    """
+
+    def __init__(self, journal: JournalWriter, snapshot_directory: str, host: str = "127.0.0.1", port: int = 0):
+        self.journal = journal
+        self.snapshot_directory = snapshot_directory
+        self._server = socket.create_server((host, port))
+        self.address: Tuple[str, int] = self._server.getsockname()[:2]
+        self._sessions: List[_FollowerSession] = []
+        self._sessions_lock = threading.Lock()
+        self._running = True
+        journal.add_listener(self._on_batch_written)
+        self._accept_thread = threading.Thread(target=self._accept_loop, name="ReplicationAccept", daemon=True)
+        self._accept_thread.start()
+
+    @property
+    def followers(self) -> List[FollowerStatus]:
+        with self._sessions_lock:
+            return [session.status for session in self._sessions]
+
+    def lag(self) -> Dict[Tuple[str, int], int]:
+        """
+        Number of journaled commands each connected follower has not acked yet.
+        """
+        last_sequence = self.journal.last_sequence
+        return {status.address: last_sequence - status.acked_sequence for status in self.followers if status.connected}
+
+    def _on_batch_written(self, first_sequence: int, last_sequence: int, batch: bytes):
+        with self._sessions_lock:
+            for session in self._sessions:
+                session.live_batches.put((first_sequence, last_sequence, batch))
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                sock, address = self._server.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._serve, args=(sock, address), name=f"ReplicationSession{address}", daemon=True).start()
+
+    def _serve(self, sock: socket.socket, address: Tuple[str, int]):
+        session: Optional[_FollowerSession] = None
+        try:
+            message_type, payload = receive_frame(sock)
+            if message_type != MessageType.Hello:
+                return
+            status = FollowerStatus(address, sent_sequence=decode_sequence(payload), acked_sequence=decode_sequence(payload))
+            session = _FollowerSession(sock, status)
+            # the session starts collecting live batches before catch up so nothing written in between is missed
+            with self._sessions_lock:
+                self._sessions.append(session)
+            threading.Thread(target=self._receive_acks, args=(session,), name=f"ReplicationAcks{address}", daemon=True).start()
+            self._catch_up(session)
+            while self._running:
+                item = session.live_batches.get()
+                if item is None:
+                    return
+                first_sequence, last_sequence, batch = item
+                if last_sequence <= status.sent_sequence:
+                    continue
+                send_frame(sock, MessageType.Records, _records_after(first_sequence, batch, status.sent_sequence))
+                status.sent_sequence = last_sequence
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            if session is not None:
+                session.status.connected = False
+                with self._sessions_lock:
+                    self._sessions.remove(session)
+            sock.close()
+
+    def _catch_up(self, session: _FollowerSession):
+        status = session.status
+        latest = snapshot.list_snapshots(self.snapshot_directory)
+        if latest:
+            snapshot_sequence = int(os.path.basename(latest[-1]).split(".")[0])
+            if snapshot_sequence > status.sent_sequence:
+                with open(latest[-1], "rb") as f:
+                    send_frame(session.sock, MessageType.Snapshot, f.read())
+                status.sent_sequence = snapshot_sequence
+        chunk: List[bytes] = []
+        chunk_size = 0
+        last_sequence = status.sent_sequence
+        for sequence, record in JournalReader(self.journal.directory).read_raw(status.sent_sequence + 1):
+            chunk.append(record)
+            chunk_size += len(record)
+            last_sequence = sequence
+            if chunk_size >= _CATCH_UP_CHUNK_SIZE:
+                send_frame(session.sock, MessageType.Records, b"".join(chunk))
+                status.sent_sequence = last_sequence
+                chunk = []
+                chunk_size = 0
+        if chunk:
+            send_frame(session.sock, MessageType.Records, b"".join(chunk))
+            status.sent_sequence = last_sequence
+
+    def _receive_acks(self, session: _FollowerSession):
+        try:
+            while True:
+                message_type, payload = receive_frame(session.sock)
+                if message_type == MessageType.Ack:
+                    session.status.acked_sequence = decode_sequence(payload)
+        except (ConnectionError, OSError):
+            session.live_batches.put(None)
+
+    def close(self):
+        self._running = False
+        self.journal.remove_listener(self._on_batch_written)
+        self._server.close()
+        with self._sessions_lock:
+            sessions = list(self._sessions)
+        for session in sessions:
+            session.live_batches.put(None)
+            try:
+                session.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
@@ -0,0 +1,55 @@
+"""Framing of the replication stream between a primary and its followers.
+
+Every frame is a message type (uint8) and payload length (uint32) followed by the payload.
+Journal records are shipped exactly as they are written to the journal, so they keep their sequence numbers and checksums.
+"""
+import socket
+import struct
+from enum import Enum
+from typing import Tuple
+
+FRAME_HEADER = struct.Struct("<BI")
+SEQUENCE = struct.Struct("<Q")
+
+
+class MessageType(Enum):
+    # follower -> primary, payload is the last sequence applied by the follower
+    Hello = 1
+    # follower -> primary, payload is the last sequence applied by the follower
+    Ack = 2
+    # primary -> follower, payload is an encoded snapshot
+    Snapshot = 3
+    # primary -> follower, payload is one or more consecutive journal records
+    Records = 4
+
+
+_MESSAGE_TYPES = {message_type.value: message_type for message_type in MessageType}
+
+
+def send_frame(sock: socket.socket, message_type: MessageType, payload: bytes):
+    sock.sendall(FRAME_HEADER.pack(message_type.value, len(payload)) + payload)
+
+
+def _receive_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = sock.recv(min(remaining, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Replication connection closed")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def receive_frame(sock: socket.socket) -> Tuple[MessageType, bytes]:
+    message_type, length = FRAME_HEADER.unpack(_receive_exact(sock, FRAME_HEADER.size))
+    return _MESSAGE_TYPES[message_type], _receive_exact(sock, length)
+
+
+def send_sequence(sock: socket.socket, message_type: MessageType, sequence: int):
+    send_frame(sock, message_type, SEQUENCE.pack(sequence))
+
+
+def decode_sequence(payload: bytes) -> int:
+    return SEQUENCE.unpack(payload)[0]
@@ -0,0 +1,157 @@
+import copy
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+from helper.collections.ring_buffer import RingBuffer, RingBufferReader
+from matching_engine_core.i_transaction_subscriber import BookEvent, ITransactionSubscriber
+from matching_engine_core.models.event_type import EventType
+from matching_engine_core.models.execution_report import ExecutionReport
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.reject_codes import RejectCode
+from matching_engine_core.models.sequenced_event import SequencedEvent
+from matching_engine_core.models.trade import Trade
+from matching_engine_core.orderbook import Orderbook
+
+
+class Sequencer:
+    """
+    Merges the events of several orderbooks into a single gapless, totally ordered stream.
+
+    Every event gets the next global sequence and keeps the book sequence of its orderbook, the stream is published
+    into a ring buffer that consumers read at their own pace through their own readers. Consumers that have to see the
+    book in the state right after a command (the market data publishers) or that share the sequencer's events (the
+    asynchronous dispatcher) register with subscribe or add_consumer instead: they are fed from a single reader of the
+    ring at the end of every command, so the orderbook fans out to the sequencer only and every event is built once.
+    That reader is polled by the writer, the ring must therefore hold the events of the largest command (a mass cancel
+    publishes one event per cancelled order).
+    Orderbooks must be driven from a single thread, the sequencer is the single writer of the ring buffer, so gating
+    readers have to be polled from other threads.
+    """
+
+    def __init__(self, capacity: int = 65536, start_sequence: int = 0, gating_timeout: Optional[float] = 5.0):
+        self.ring_buffer: RingBuffer[SequencedEvent] = RingBuffer(capacity, gating_timeout)
+        self.ring_buffer.sequence = start_sequence
+        self._adapters: Dict[str, OrderbookEventAdapter] = dict()
+        # consumers of every symbol and per symbol, fed by _reader at the end of every command
+        self._consumers: List[CommandConsumer] = []
+        self._symbol_consumers: Dict[str, List[CommandConsumer]] = dict()
+        self._reader: Optional[RingBufferReader[SequencedEvent]] = None
+        # events of a command that was not completely polled yet
+        self._command: List[SequencedEvent] = []
+
+    @property
+    def sequence(self) -> int:
+        return self.ring_buffer.sequence
+
+    def attach(self, orderbook: Orderbook):
+        if orderbook.symbol in self._adapters:
+            raise ValueError(f"Orderbook {orderbook.symbol} is already attached")
+        adapter = OrderbookEventAdapter(orderbook, self._publish)
+        self._adapters[orderbook.symbol] = adapter
+        orderbook.subscribe(adapter)
+
+    def reader(self, gating: bool = False, from_sequence: Optional[int] = None) -> RingBufferReader[SequencedEvent]:
+        return self.ring_buffer.reader(gating, from_sequence)
+
+    def remove_reader(self, reader: RingBufferReader[SequencedEvent]):
+        self.ring_buffer.remove_reader(reader)
+
+    def add_consumer(self, consumer: "CommandConsumer", symbols: Optional[Iterable[str]] = None):
+        # consumer gets the events of every command (of the given symbols) published after this call
+        if self._reader is None:
+            self._reader = self.ring_buffer.reader()
+        if symbols is None:
+            self._consumers.append(consumer)
+        else:
+            for symbol in symbols:
+                self._symbol_consumers.setdefault(symbol, []).append(consumer)
+
+    def subscribe(self, sub: ITransactionSubscriber, event_types: Optional[Iterable[EventType]] = None,
+                  symbols: Optional[Iterable[str]] = None):
+        # like Orderbook.subscribe, but sub is fed from the ring: on_events once per command and rejects one by one
+        self.add_consumer(_SubscriberConsumer(sub, event_types), symbols)
+
+    def dispatch(self):
+        # feeds the consumers with the complete commands published since the last call
+        reader = self._reader
+        if reader is None:
+            return
+        while reader.available:
+            for event in reader.poll():
+                self._command.append(event)
+                if not event.last_in_command:
+                    continue
+                command = self._command
+                self._command = []
+                for consumer in self._consumers:
+                    consumer(command)
+                for consumer in self._symbol_consumers.get(event.symbol, ()):
+                    consumer(command)
+
+    def _publish(self, orderbook: Orderbook, event_type: EventType, payload: Union[Trade, ExecutionReport, Order],
+                 reject_code: Optional[RejectCode], book_sequence: int, last_in_command: bool):
+        ring_buffer = self.ring_buffer
+        ring_buffer.publish(SequencedEvent(ring_buffer.sequence + 1, orderbook.symbol, book_sequence,
+                                           event_type, payload, reject_code, last_in_command))
+        if last_in_command and self._reader is not None:
+            self.dispatch()
+
+
+PublishEvent = Callable[[Orderbook, EventType, Union[Trade, ExecutionReport, Order], Optional[RejectCode], int, bool], None]
+CommandConsumer = Callable[[List[SequencedEvent]], None]
+
+
+class _SubscriberConsumer:
+    # delivers the commands read from the ring to a transaction subscriber the way an orderbook would
+
+    def __init__(self, sub: ITransactionSubscriber, event_types: Optional[Iterable[EventType]]):
+        self.sub = sub
+        self.event_types = None if event_types is None else frozenset(event_types)
+
+    def __call__(self, command: List[SequencedEvent]):
+        event_types = self.event_types
+        first = command[0]
+        if first.event_type == EventType.CancelReject or first.event_type == EventType.ReplaceReject:
+            if event_types is None or first.event_type in event_types:
+                if first.event_type == EventType.CancelReject:
+                    self.sub.on_cancel_reject(first.payload, first.reject_code)
+                else:
+                    self.sub.on_replace_reject(first.payload, first.reject_code)
+            return
+        events: List[BookEvent] = [e.payload for e in command if event_types is None or e.event_type in event_types]
+        if events:
+            self.sub.on_events(events)
+
+
+class OrderbookEventAdapter(ITransactionSubscriber):
+    """
+    Turns the callbacks of one orderbook into (orderbook, event type, payload, reject code, book sequence, last in
+    command) calls of publish. The events of a command arrive in one on_events call, so the last one is flagged.
+    Execution reports are immutable and published as they are, rejected orders are mutated in place by the orderbook
+    so publish gets a copy of their state at the time of the reject.
+    """
+
+    def __init__(self, orderbook: Orderbook, publish: PublishEvent):
+        self._orderbook = orderbook
+        self._publish = publish
+
+    def on_trade(self, trade: Trade):
+        self.on_events([trade])
+
+    def on_order_update(self, report: ExecutionReport):
+        self.on_events([report])
+
+    def on_events(self, events: List[BookEvent]):
+        orderbook = self._orderbook
+        publish = self._publish
+        # the book sequences of a command are consecutive and end at the sequence of the orderbook
+        first_sequence = orderbook.sequence - len(events) + 1
+        last = len(events) - 1
+        for i, event in enumerate(events):
+            event_type = EventType.Trade if isinstance(event, Trade) else EventType.OrderUpdate
+            publish(orderbook, event_type, event, None, first_sequence + i, i == last)
+
+    def on_cancel_reject(self, order: Order, reject_code: RejectCode):
+        self._publish(self._orderbook, EventType.CancelReject, copy.copy(order), reject_code, self._orderbook.sequence, True)
+
+    def on_replace_reject(self, order: Order, reject_code: RejectCode):
+        self._publish(self._orderbook, EventType.ReplaceReject, copy.copy(order), reject_code, self._orderbook.sequence, True)
@@ -0,0 +1,160 @@
+"""Binary records of the events that matcher processes send back to the front end.
+
+    header: total length (uint32), event type (uint8), book sequence (uint64)
+
+Bodies are fixed layout like the command records of the journal, strings are appended after the body.
+Records travel inside a single host, so they carry no checksum.
+"""
+import struct
+from decimal import Decimal
+from typing import Generator, NamedTuple, Union
+
+from matching_engine_core.models.event_type import EventType
+from matching_engine_core.models.exec_type import ExecType
+from matching_engine_core.models.execution_report import ExecutionReport
+from matching_engine_core.models.order_status import OrderStatus
+from matching_engine_core.models.reject_codes import RejectCode
+from matching_engine_core.models.side import Side
+from matching_engine_core.models.trade import Trade
+from matching_engine_core.persistence.records import decode_decimal, encode_decimal
+
+EVENT_HEADER = struct.Struct("<IBQ")
+# status, exec type, side, has last price, price, qty, last qty, last price, cum qty, leaves qty (each decimal as
+# coefficient and exponent), symbol length, order id length, client order id length
+_ORDER_UPDATE_BODY = struct.Struct("<BBBBqbqbqbqbqbqbBBB")
+# active side, price coefficient, price exponent, qty coefficient, qty exponent,
+# symbol length, buy order id length, sell order id length, trade id length
+_TRADE_BODY = struct.Struct("<BqbqbBBBB")
+# reject code, symbol length, order id length
+_REJECT_BODY = struct.Struct("<BBB")
+
+_EVENT_TYPES = {event_type.value: event_type for event_type in EventType}
+_EXEC_TYPES = {exec_type.value: exec_type for exec_type in ExecType}
+_STATUSES = {status.value: status for status in OrderStatus}
+_SIDES = {side.value: side for side in Side}
+_REJECT_CODES = {reject_code.value: reject_code for reject_code in RejectCode}
+
+
+class OrderUpdateEvent(NamedTuple):
+    book_sequence: int
+    report: ExecutionReport
+
+
+class TradeEvent(NamedTuple):
+    book_sequence: int
+    symbol: str
+    trade: Trade
+
+
+class RejectEvent(NamedTuple):
+    book_sequence: int
+    event_type: EventType
+    symbol: str
+    order_id: str
+    reject_code: RejectCode
+
+
+Event = Union[OrderUpdateEvent, TradeEvent, RejectEvent]
+
+
+def _frame(event_type: EventType, book_sequence: int, body: bytes) -> bytes:
+    return EVENT_HEADER.pack(EVENT_HEADER.size + len(body), event_type.value, book_sequence) + body
+
+
+def encode_order_update(report: ExecutionReport) -> bytes:
+    symbol = report.symbol.encode()
+    order_id = report.order_id.encode()
+    cl_ord_id = report.cl_ord_id.encode()
+    has_last_px = report.last_px is not None
+    body = _ORDER_UPDATE_BODY.pack(report.status.value, report.exec_type.value, report.side.value, has_last_px,
+                                   *encode_decimal(report.price), *encode_decimal(report.qty),
+                                   *encode_decimal(report.last_qty),
+                                   *encode_decimal(report.last_px if has_last_px else Decimal(0)),
+                                   *encode_decimal(report.cum_qty), *encode_decimal(report.leaves_qty),
+                                   len(symbol), len(order_id), len(cl_ord_id))
+    return _frame(EventType.OrderUpdate, report.seq, body + symbol + order_id + cl_ord_id)
+
+
+def encode_trade(book_sequence: int, symbol: str, trade: Trade) -> bytes:
+    encoded_symbol = symbol.encode()
+    buy_order_id = trade.buy_order_id.encode()
+    sell_order_id = trade.sell_order_id.encode()
+    trade_id = trade.trade_id.encode()
+    body = _TRADE_BODY.pack(trade.active_side.value, *encode_decimal(trade.price), *encode_decimal(trade.qty),
+                            len(encoded_symbol), len(buy_order_id), len(sell_order_id), len(trade_id))
+    return _frame(EventType.Trade, book_sequence, body + encoded_symbol + buy_order_id + sell_order_id + trade_id)
+
+
+def encode_reject(book_sequence: int, event_type: EventType, symbol: str, order_id: str, reject_code: RejectCode) -> bytes:
+    encoded_symbol = symbol.encode()
+    encoded_order_id = order_id.encode()
+    body = _REJECT_BODY.pack(reject_code.value, len(encoded_symbol), len(encoded_order_id)) + encoded_symbol + encoded_order_id
+    return _frame(event_type, book_sequence, body)
+
+
+def _decode_string(buffer, offset: int, length: int) -> str:
+    return str(buffer[offset:offset + length], "utf-8")
+
+
+def decode_event(buffer, offset: int = 0) -> Event:
+    length, event_type_value, book_sequence = EVENT_HEADER.unpack_from(buffer, offset)
+    body_offset = offset + EVENT_HEADER.size
+    event_type = _EVENT_TYPES[event_type_value]
+    if event_type == EventType.OrderUpdate:
+        (status, exec_type, side, has_last_px, price_coefficient, price_exponent, qty_coefficient, qty_exponent,
+         last_qty_coefficient, last_qty_exponent, last_px_coefficient, last_px_exponent, cum_coefficient, cum_exponent,
+         leaves_coefficient, leaves_exponent, symbol_length, order_id_length,
+         cl_ord_id_length) = _ORDER_UPDATE_BODY.unpack_from(buffer, body_offset)
+        string_offset = body_offset + _ORDER_UPDATE_BODY.size
+        symbol = _decode_string(buffer, string_offset, symbol_length)
+        string_offset += symbol_length
+        order_id = _decode_string(buffer, string_offset, order_id_length)
+        string_offset += order_id_length
+        cl_ord_id = _decode_string(buffer, string_offset, cl_ord_id_length)
+        return OrderUpdateEvent(book_sequence, ExecutionReport(
+            order_id=order_id,
+            cl_ord_id=cl_ord_id,
+            symbol=symbol,
+            side=_SIDES[side],
+            price=decode_decimal(price_coefficient, price_exponent),
+            qty=decode_decimal(qty_coefficient, qty_exponent),
+            status=_STATUSES[status],
+            exec_type=_EXEC_TYPES[exec_type],
+            last_qty=decode_decimal(last_qty_coefficient, last_qty_exponent),
+            last_px=decode_decimal(last_px_coefficient, last_px_exponent) if has_last_px else None,
+            cum_qty=decode_decimal(cum_coefficient, cum_exponent),
+            leaves_qty=decode_decimal(leaves_coefficient, leaves_exponent),
+            seq=book_sequence))
+    if event_type == EventType.Trade:
+        (active_side, price_coefficient, price_exponent, qty_coefficient, qty_exponent,
+         symbol_length, buy_length, sell_length, trade_id_length) = _TRADE_BODY.unpack_from(buffer, body_offset)
+        string_offset = body_offset + _TRADE_BODY.size
+        symbol = _decode_string(buffer, string_offset, symbol_length)
+        string_offset += symbol_length
+        buy_order_id = _decode_string(buffer, string_offset, buy_length)
+        string_offset += buy_length
+        sell_order_id = _decode_string(buffer, string_offset, sell_length)
+        string_offset += sell_length
+        trade_id = _decode_string(buffer, string_offset, trade_id_length)
+        return TradeEvent(book_sequence, symbol, Trade(active_side=_SIDES[active_side],
+                                                       buy_order_id=buy_order_id,
+                                                       sell_order_id=sell_order_id,
+                                                       qty=decode_decimal(qty_coefficient, qty_exponent),
+                                                       price=decode_decimal(price_coefficient, price_exponent),
+                                                       trade_id=trade_id))
+    reject_code, symbol_length, order_id_length = _REJECT_BODY.unpack_from(buffer, body_offset)
+    string_offset = body_offset + _REJECT_BODY.size
+    return RejectEvent(book_sequence, event_type,
+                       _decode_string(buffer, string_offset, symbol_length),
+                       _decode_string(buffer, string_offset + symbol_length, order_id_length),
+                       _REJECT_CODES[reject_code])
+
+
+def decode_events(buffer) -> Generator[Event, None, None]:
+    # decodes consecutive event records filling the whole buffer
+    offset = 0
+    end = len(buffer)
+    while offset < end:
+        length = EVENT_HEADER.unpack_from(buffer, offset)[0]
+        yield decode_event(buffer, offset)
+        offset += length
@@ -0,0 +1,452 @@
+import multiprocessing
+import os
+import struct
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from helper.collections.consistent_hash_ring import ConsistentHashRing
+from helper.cpu_affinity import CpuPlacement, PlacementResult, apply_placement, read_scheduler_stats
+from helper.collections.shared_memory_ring import SharedMemoryRing, WaitStrategy, pause
+from matching_engine_core.i_transaction_subscriber import BookEvent, ITransactionSubscriber
+from matching_engine_core.models.event_type import EventType
+from matching_engine_core.models.execution_report import ExecutionReport
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.reject_codes import RejectCode
+from matching_engine_core.models.side import Side
+from matching_engine_core.models.trade import Trade
+from matching_engine_core.orderbook import Orderbook
+from matching_engine_core.persistence import records
+from matching_engine_core.sharding import event_records
+
+# command messages are batches of journal records, which are never shorter than a record header, or control messages
+_STOP = b""
+_METRICS_REQUEST = b"\x00"
+# result kind, command count and last command sequence of the batch. A batch whose events do not fit into one message
+# is answered with several messages and only the last one carries the command count
+_RESULT_HEADER = struct.Struct("<BIQ")
+_EVENTS_RESULT = 0
+_METRICS_RESULT = 1
+# pid, affinity applied, real time applied, migrations, run queue wait, cpu seconds, timeslices, cpu count, then the cpus.
+# Unavailable statistics are -1
+_WORKER_METRICS = struct.Struct("<qBBqddqH")
+
+
+@dataclass
+class WorkerMetrics:
+    shard: int
+    pid: int
+    cpus: List[int]
+    affinity_applied: bool
+    realtime_applied: bool
+    migrations: Optional[int]
+    run_queue_wait_seconds: Optional[float]
+    cpu_seconds: Optional[float]
+    timeslices: Optional[int]
+
+
+def _encode_worker_metrics(placement: PlacementResult) -> bytes:
+    stats = read_scheduler_stats()
+    body = _WORKER_METRICS.pack(os.getpid(), placement.affinity_applied, placement.realtime_applied,
+                                -1 if stats.migrations is None else stats.migrations,
+                                -1 if stats.run_queue_wait_seconds is None else stats.run_queue_wait_seconds,
+                                -1 if stats.cpu_seconds is None else stats.cpu_seconds,
+                                -1 if stats.timeslices is None else stats.timeslices,
+                                len(placement.cpus))
+    return _RESULT_HEADER.pack(_METRICS_RESULT, 0, 0) + body + struct.pack(f"<{len(placement.cpus)}H", *placement.cpus)
+
+
+def _decode_worker_metrics(shard: int, message: bytes) -> WorkerMetrics:
+    (pid, affinity_applied, realtime_applied, migrations, run_queue_wait, cpu_seconds, timeslices,
+     cpu_count) = _WORKER_METRICS.unpack_from(message, _RESULT_HEADER.size)
+    cpus = list(struct.unpack_from(f"<{cpu_count}H", message, _RESULT_HEADER.size + _WORKER_METRICS.size))
+    return WorkerMetrics(shard, pid, cpus, bool(affinity_applied), bool(realtime_applied),
+                         None if migrations < 0 else migrations,
+                         None if run_queue_wait < 0 else run_queue_wait,
+                         None if cpu_seconds < 0 else cpu_seconds,
+                         None if timeslices < 0 else timeslices)
+
+
+class _EventEncoder(ITransactionSubscriber):
+    # encodes the events of one orderbook of a worker into the pending result batch of the worker, trades and order updates
+    # of a command arrive in a single on_events call
+
+    def __init__(self, orderbook: Orderbook, events: List[bytes]):
+        self._orderbook = orderbook
+        self._events = events
+
+    def on_trade(self, trade: Trade):
+        self._events.append(event_records.encode_trade(self._orderbook.sequence, self._orderbook.symbol, trade))
+
+    def on_order_update(self, report: ExecutionReport):
+        self._events.append(event_records.encode_order_update(report))
+
+    def on_events(self, events: List[BookEvent]):
+        symbol = self._orderbook.symbol
+        book_sequence = self._orderbook.sequence - len(events)
+        encoded = []
+        for event in events:
+            book_sequence += 1
+            if isinstance(event, Trade):
+                encoded.append(event_records.encode_trade(book_sequence, symbol, event))
+            else:
+                encoded.append(event_records.encode_order_update(event))
+        self._events.extend(encoded)
+
+    def on_cancel_reject(self, order: Order, reject_code: RejectCode):
+        self._events.append(event_records.encode_reject(self._orderbook.sequence, EventType.CancelReject,
+                                                        order.symbol, order.order_id, reject_code))
+
+    def on_replace_reject(self, order: Order, reject_code: RejectCode):
+        self._events.append(event_records.encode_reject(self._orderbook.sequence, EventType.ReplaceReject,
+                                                        order.symbol, order.order_id, reject_code))
+
+
+class _ShardWorker:
+    # owns the orderbooks of the symbols of one shard inside a worker process
+
+    def __init__(self):
+        self.orderbooks: Dict[str, Orderbook] = dict()
+        self.events: List[bytes] = []
+
+    def get_orderbook(self, symbol: str) -> Orderbook:
+        orderbook = self.orderbooks.get(symbol)
+        if orderbook is None:
+            orderbook = Orderbook(symbol)
+            orderbook.subscribe(_EventEncoder(orderbook, self.events))
+            self.orderbooks[symbol] = orderbook
+        return orderbook
+
+    def apply(self, command: records.Command):
+        orderbook = self.get_orderbook(command.symbol)
+        if isinstance(command, records.SubmitCommand):
+            orderbook.submit_order(Order(cl_ord_id=command.cl_ord_id,
+                                         order_id=command.order_id,
+                                         side=command.side,
+                                         qty=command.qty,
+                                         price=command.price,
+                                         symbol=command.symbol,
+                                         timestamp=command.timestamp,
+                                         time_in_force=command.time_in_force))
+        elif isinstance(command, records.CancelCommand):
+            order = orderbook.get_order(command.order_id)
+            if order is None:
+                self.events.append(event_records.encode_reject(orderbook.sequence, EventType.CancelReject, command.symbol,
+                                                               command.order_id, RejectCode.OrderDoesNotExist))
+            else:
+                orderbook.cancel_order(order)
+        elif isinstance(command, records.ReplaceCommand):
+            order = orderbook.get_order(command.order_id)
+            if order is None:
+                self.events.append(event_records.encode_reject(orderbook.sequence, EventType.ReplaceReject, command.symbol,
+                                                               command.order_id, RejectCode.OrderDoesNotExist))
+            else:
+                orderbook.replace_order(order, command.new_price, command.new_qty)
+        else:
+            orderbook.cancel_orders_in_range(command.side, command.lo, command.hi)
+
+    def process_batch(self, batch: bytes, max_message_size: int) -> List[bytes]:
+        # returns the result messages of the batch
+        view = memoryview(batch)
+        offset = 0
+        count = 0
+        last_sequence = 0
+        while offset < len(view):
+            command, offset = records.decode_record(view, offset)
+            self.apply(command)
+            count += 1
+            last_sequence = command.sequence
+        view.release()
+        messages = []
+        chunk: List[bytes] = []
+        chunk_size = _RESULT_HEADER.size
+        for event in self.events:
+            if chunk_size + len(event) > max_message_size:
+                messages.append(_RESULT_HEADER.pack(_EVENTS_RESULT, 0, last_sequence) + b"".join(chunk))
+                chunk.clear()
+                chunk_size = _RESULT_HEADER.size
+            chunk.append(event)
+            chunk_size += len(event)
+        messages.append(_RESULT_HEADER.pack(_EVENTS_RESULT, count, last_sequence) + b"".join(chunk))
+        self.events.clear()
+        return messages
+
+
+def _worker_main(commands: SharedMemoryRing, results: SharedMemoryRing, placement: CpuPlacement):
+    placement_result = apply_placement(placement)
+    worker = _ShardWorker()
+    try:
+        while True:
+            batch = commands.read()
+            if batch == _STOP:
+                return
+            if batch == _METRICS_REQUEST:
+                results.write(_encode_worker_metrics(placement_result))
+                continue
+            for message in worker.process_batch(batch, results.max_message_size):
+                results.write(message)
+    finally:
+        commands.close()
+        results.close()
+
+
+class ShardedMatchingEngine:
+    """
+    Runs the orderbooks in worker processes so that different symbols are matched on different cores.
+
+    Symbols are assigned to workers with consistent hashing, every symbol lives in exactly one worker. Commands are
+    encoded as journal records, batched per worker and written into the shared memory command ring of the worker; every
+    batch is answered with the encoded events it produced through the result ring of the worker. No message is pickled.
+    A worker processes its batches in order and its results arrive in order, so the events of a symbol are delivered
+    in the order they were produced.
+
+    The front end mirrors the orders it has sent and updates them in place from the events, like an in process
+    orderbook does, then passes them to the subscribers. Events are delivered by poll and drain on the calling thread.
+    Cancels and replaces of orders the worker no longer has are rejected with OrderDoesNotExist before the replace
+    fields are validated, since only the worker knows the current state of an order.
+
+    worker_placements pins the workers (one placement per worker) and front_end_placement the front end process to cores
+    and optionally gives them real time scheduling, worker_metrics reports where the workers run and how often the
+    scheduler migrated them or kept them waiting. worker_count defaults to the number of placements, or to the cpu count
+    at the time the engine is created.
+    """
+
+    def __init__(self, worker_count: Optional[int] = None, batch_size: int = 256, replicas: int = 64,
+                 start_method: Optional[str] = None, wait_strategy: WaitStrategy = WaitStrategy.Yield,
+                 slot_count: int = 64, slot_size: int = 65536, worker_placements: Optional[Sequence[CpuPlacement]] = None,
+                 front_end_placement: Optional[CpuPlacement] = None):
+        # one worker per placement when placements are given, otherwise one per cpu of the machine running the engine
+        if worker_count is None:
+            worker_count = multiprocessing.cpu_count() if worker_placements is None else len(worker_placements)
+        if worker_count <= 0:
+            raise ValueError("Worker count must be positive")
+        if worker_placements is None:
+            worker_placements = [CpuPlacement()] * worker_count
+        if len(worker_placements) != worker_count:
+            raise ValueError("There must be one placement per worker")
+        self.front_end_placement = front_end_placement
+        self.front_end_placement_result: Optional[PlacementResult] = None
+        self.worker_count = worker_count
+        self.batch_size = batch_size
+        self.wait_strategy = wait_strategy
+        self._hash_ring: ConsistentHashRing[int] = ConsistentHashRing(range(worker_count), replicas)
+        self._shard_of_symbol: Dict[str, int] = dict()
+        self._context = multiprocessing.get_context(start_method)
+        self._command_rings = [SharedMemoryRing(slot_count, slot_size, wait_strategy, self._context) for i in range(worker_count)]
+        self._result_rings = [SharedMemoryRing(slot_count, slot_size, wait_strategy, self._context) for i in range(worker_count)]
+        self._workers = [self._context.Process(target=_worker_main,
+                                               args=(self._command_rings[shard], self._result_rings[shard], worker_placements[shard]),
+                                               name=f"MatchingShard-{shard}", daemon=True)
+                         for shard in range(worker_count)]
+        self._pending: List[List[bytes]] = [[] for i in range(worker_count)]
+        self._pending_sizes = [0] * worker_count
+        self._sent_counts = [0] * worker_count
+        self._processed_counts = [0] * worker_count
+        self._command_sequence = 0
+        self._orders: Dict[Tuple[str, str], Order] = dict()
+        # sequence of the last command sent for an order, a closed order is forgotten once all of its commands are answered
+        self._last_commands: Dict[Tuple[str, str], int] = dict()
+        self._closed_orders: List[Tuple[str, str]] = []
+        self._worker_metrics: Dict[int, WorkerMetrics] = dict()
+        self._t_subs: List[ITransactionSubscriber] = []
+        self._started = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        for worker in self._workers:
+            worker.start()
+        # the workers are started first so they do not inherit the placement of the front end
+        if self.front_end_placement is not None:
+            self.front_end_placement_result = apply_placement(self.front_end_placement)
+        self._started = True
+
+    def stop(self):
+        if not self._started:
+            return
+        self.drain()
+        for shard in range(self.worker_count):
+            self._write_command_message(shard, _STOP)
+        for worker in self._workers:
+            worker.join()
+        for ring in self._command_rings + self._result_rings:
+            ring.close()
+        self._started = False
+
+    def subscribe(self, sub: ITransactionSubscriber):
+        if sub not in self._t_subs:
+            self._t_subs.append(sub)
+
+    def shard_of(self, symbol: str) -> int:
+        shard = self._shard_of_symbol.get(symbol)
+        if shard is None:
+            shard = self._hash_ring.get_node(symbol)
+            self._shard_of_symbol[symbol] = shard
+        return shard
+
+    def get_order(self, symbol: str, order_id: str) -> Optional[Order]:
+        # orders sent by this front end that are not known to be closed yet
+        return self._orders.get((symbol, order_id))
+
+    def _send(self, symbol: str, encode, *args):
+        self._command_sequence += 1
+        shard = self.shard_of(symbol)
+        record = encode(self._command_sequence, *args)
+        if self._pending_sizes[shard] + len(record) > self._command_rings[shard].max_message_size:
+            self._send_batch(shard)
+        pending = self._pending[shard]
+        pending.append(record)
+        self._pending_sizes[shard] += len(record)
+        if len(pending) >= self.batch_size:
+            self._send_batch(shard)
+
+    def _write_command_message(self, shard: int, message: bytes):
+        ring = self._command_rings[shard]
+        # results are consumed while the command ring is full, a worker blocked on a full result ring never frees a slot
+        while not ring.try_write(message):
+            if self._poll_once() == 0:
+                self._idle()
+
+    def _send_batch(self, shard: int):
+        pending = self._pending[shard]
+        self._write_command_message(shard, b"".join(pending))
+        self._sent_counts[shard] += len(pending)
+        pending.clear()
+        self._pending_sizes[shard] = 0
+
+    def _track(self, order: Order):
+        key = (order.symbol, order.order_id)
+        self._orders.setdefault(key, order)
+        self._last_commands[key] = self._command_sequence
+
+    def submit_order(self, order: Order):
+        self._send(order.symbol, records.encode_submit, order)
+        self._track(order)
+
+    def cancel_order(self, order: Order):
+        self._send(order.symbol, records.encode_cancel, order)
+        self._track(order)
+
+    def replace_order(self, order: Order, new_price: Optional[Decimal], new_qty: Optional[Decimal]):
+        self._send(order.symbol, records.encode_replace, order, new_price, new_qty)
+        self._track(order)
+
+    def cancel_orders_in_range(self, symbol: str, side: Side, lo: Optional[Decimal] = None, hi: Optional[Decimal] = None):
+        self._send(symbol, records.encode_mass_cancel, symbol, side, lo, hi)
+
+    def flush(self):
+        for shard in range(self.worker_count):
+            if self._pending[shard]:
+                self._send_batch(shard)
+
+    def _dispatch(self, event: event_records.Event):
+        if isinstance(event, event_records.OrderUpdateEvent):
+            report = event.report
+            key = (report.symbol, report.order_id)
+            order = self._orders.get(key)
+            if order is None:
+                return
+            order.status = report.status
+            order.price = report.price
+            order.qty = report.qty
+            order.filled_qty = report.cum_qty
+            if not order.is_open:
+                self._closed_orders.append(key)
+            for sub in self._t_subs:
+                sub.on_order_update(report)
+        elif isinstance(event, event_records.TradeEvent):
+            for sub in self._t_subs:
+                sub.on_trade(event.trade)
+        else:
+            key = (event.symbol, event.order_id)
+            order = self._orders.get(key)
+            if order is None:
+                return
+            if not order.is_open:
+                self._closed_orders.append(key)
+            for sub in self._t_subs:
+                if event.event_type == EventType.CancelReject:
+                    sub.on_cancel_reject(order, event.reject_code)
+                else:
+                    sub.on_replace_reject(order, event.reject_code)
+
+    def _process_result(self, shard: int, message: bytes) -> int:
+        kind, count, last_sequence = _RESULT_HEADER.unpack_from(message)
+        if kind == _METRICS_RESULT:
+            self._worker_metrics[shard] = _decode_worker_metrics(shard, message)
+            return 0
+        dispatched = 0
+        for event in event_records.decode_events(memoryview(message)[_RESULT_HEADER.size:]):
+            self._dispatch(event)
+            dispatched += 1
+        if count == 0:
+            return dispatched
+        self._processed_counts[shard] += count
+        # a closed order stays known while a later cancel or replace of it is in flight, so its reject finds it
+        for key in self._closed_orders:
+            if self._last_commands.get(key, 0) <= last_sequence:
+                self._orders.pop(key, None)
+                self._last_commands.pop(key, None)
+        self._closed_orders.clear()
+        return dispatched
+
+    def _poll_once(self) -> int:
+        # number of result messages processed
+        processed = 0
+        for shard in range(self.worker_count):
+            ring = self._result_rings[shard]
+            message = ring.try_read()
+            while message is not None:
+                self._process_result(shard, message)
+                processed += 1
+                message = ring.try_read()
+        return processed
+
+    def _idle(self):
+        # the front end reads several rings, so it can not sleep on the semaphore of one of them
+        pause(self.wait_strategy)
+
+    def poll(self, timeout: float = 0) -> bool:
+        """
+        Deliver the events of the batches the workers have finished, waits up to timeout for the first batch.
+        Returns whether any batch was delivered.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            if self._poll_once() > 0:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            self._idle()
+
+    @property
+    def in_flight(self) -> int:
+        # commands sent to the workers whose events are not delivered yet
+        return sum(self._sent_counts) - sum(self._processed_counts)
+
+    def drain(self):
+        # sends the pending batches and delivers every event they produce
+        self.flush()
+        while self.in_flight > 0:
+            if not all(worker.is_alive() for worker in self._workers):
+                raise RuntimeError("A matching worker process exited")
+            self.poll(timeout=0.1)
+
+    def worker_metrics(self, timeout: float = 5.0) -> List[WorkerMetrics]:
+        # asks every worker for its placement and scheduler statistics, events arriving meanwhile are delivered
+        self.flush()
+        self._worker_metrics.clear()
+        for shard in range(self.worker_count):
+            self._write_command_message(shard, _METRICS_REQUEST)
+        deadline = time.monotonic() + timeout
+        while len(self._worker_metrics) < self.worker_count:
+            if time.monotonic() >= deadline:
+                raise TimeoutError("Workers did not report their metrics")
+            self.poll(timeout=0.1)
+        return [self._worker_metrics[shard] for shard in range(self.worker_count)]
@@ -0,0 +1,185 @@
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from helper.collections.consistent_hash_ring import ConsistentHashRing
+from matching_engine_core.i_transaction_subscriber import ITransactionSubscriber
+from matching_engine_core.models.book_snapshot import BookSnapshot
+from matching_engine_core.models.event_type import EventType
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.side import Side
+from matching_engine_core.orderbook import Orderbook
+
+
+def is_gil_enabled() -> bool:
+    # sys._is_gil_enabled only exists from python 3.13, older interpreters always have the gil
+    is_enabled = getattr(sys, "_is_gil_enabled", None)
+    return True if is_enabled is None else is_enabled()
+
+
+class _BookThread:
+    # matches the orderbooks assigned to it, commands are handed over through a deque whose append and popleft are atomic
+
+    def __init__(self, index: int):
+        self.commands: Deque[Tuple[Callable, threading.Lock, tuple]] = deque()
+        self.wakeup = threading.Event()
+        # each counter has a single writer, this thread for processed_count and the sending thread for sent_count
+        self.processed_count = 0
+        self.sent_count = 0
+        # (method name, args, exception) of the commands that raised, appended by this thread only
+        self.errors: List[Tuple[str, tuple, Exception]] = []
+        self.stopping = False
+        self.thread = threading.Thread(target=self._run, name=f"BookThread-{index}", daemon=True)
+
+    def _run(self):
+        commands = self.commands
+        while True:
+            while commands:
+                method, lock, args = commands.popleft()
+                try:
+                    with lock:
+                        method(*args)
+                except Exception as e:
+                    # a failing command (or subscriber) must not stop the commands queued behind it
+                    self.errors.append((method.__name__, args, e))
+                finally:
+                    self.processed_count += 1
+            if self.stopping:
+                return
+            # cleared before the queue is checked again, so a command appended in between is not slept on
+            self.wakeup.clear()
+            if not commands:
+                self.wakeup.wait()
+
+    def send(self, method: Callable, lock: threading.Lock, args: tuple):
+        self.sent_count += 1
+        self.commands.append((method, lock, args))
+        self.wakeup.set()
+
+
+class ThreadedMatchingEngine:
+    """
+    Matches different symbols on a fixed pool of thread_count book threads of one process, which run truly parallel on
+    free threaded builds. It is a separate engine next to MatchingEngine, not a mode of it.
+
+    Every orderbook is owned by exactly one book thread (books are spread over the threads with consistent hashing) and
+    every command of a symbol is applied by the owning thread in the order it was sent. The per book structures,
+    RedBlackTree, PriceLevel (MappedDoublyQueue), the order index, the trade id generator and the subscriber list of
+    the orderbook, are never touched by any other thread while the engine runs. Each orderbook also has a lock which its
+    thread holds while it applies a command, other threads take it through locked_orderbook to read a consistent book.
+
+    Subscribers are called from the book threads, concurrently for different symbols, so they must be thread safe.
+    Subscribers have to be added before start since the subscriber list of an orderbook is read without a lock.
+    Commands must be sent from a single thread, and orders sent to the engine are updated by the book threads, so the
+    sender must not modify them afterwards. A command that raises is counted as processed and its exception is kept in
+    errors, the book thread goes on with the next command.
+    """
+
+    def __init__(self, thread_count: int = 4, replicas: int = 64):
+        if thread_count <= 0:
+            raise ValueError("Thread count must be positive")
+        self.thread_count = thread_count
+        self._threads = [_BookThread(i) for i in range(thread_count)]
+        self._hash_ring: ConsistentHashRing[int] = ConsistentHashRing(range(thread_count), replicas)
+        self._orderbooks: Dict[str, Tuple[Orderbook, threading.Lock, _BookThread]] = dict()
+        self._t_subs: List[Tuple[ITransactionSubscriber, Optional[List[EventType]], Optional[List[str]]]] = []
+        self._started = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        for book_thread in self._threads:
+            book_thread.thread.start()
+        self._started = True
+
+    def stop(self):
+        if not self._started:
+            return
+        for book_thread in self._threads:
+            book_thread.stopping = True
+            book_thread.wakeup.set()
+        for book_thread in self._threads:
+            book_thread.thread.join()
+        self._started = False
+
+    def subscribe(self, sub: ITransactionSubscriber, event_types: Optional[Iterable[EventType]] = None,
+                  order_ids: Optional[Iterable[str]] = None):
+        # filters are those of Orderbook.subscribe
+        if self._started:
+            raise RuntimeError("Subscribers must be added before the engine is started")
+        if not any(sub is subscribed for subscribed, _, _ in self._t_subs):
+            self._t_subs.append((sub, None if event_types is None else list(event_types),
+                                 None if order_ids is None else list(order_ids)))
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._orderbooks.keys())
+
+    def _book(self, symbol: str) -> Tuple[Orderbook, threading.Lock, _BookThread]:
+        book = self._orderbooks.get(symbol)
+        if book is None:
+            # created by the sending thread, the deque hand off of its first command publishes it to the book thread
+            orderbook = Orderbook(symbol)
+            for sub, event_types, order_ids in self._t_subs:
+                orderbook.subscribe(sub, event_types, order_ids)
+            book = (orderbook, threading.Lock(), self._threads[self._hash_ring.get_node(symbol)])
+            self._orderbooks[symbol] = book
+        return book
+
+    def _send(self, symbol: str, method_name: str, *args):
+        orderbook, lock, book_thread = self._book(symbol)
+        book_thread.send(getattr(orderbook, method_name), lock, args)
+
+    @contextmanager
+    def locked_orderbook(self, symbol: str) -> Iterator[Optional[Orderbook]]:
+        # the orderbook of symbol (None if it does not exist yet) is not modified while the context is held
+        book = self._orderbooks.get(symbol)
+        if book is None:
+            yield None
+            return
+        with book[1]:
+            yield book[0]
+
+    def snapshot(self, symbol: str) -> Optional[BookSnapshot]:
+        # consistent view of the orderbook of symbol, the lock is only held while the snapshot is taken
+        with self.locked_orderbook(symbol) as orderbook:
+            return None if orderbook is None else orderbook.snapshot()
+
+    def submit_order(self, order: Order):
+        self._send(order.symbol, "submit_order", order)
+
+    def cancel_order(self, order: Order):
+        self._send(order.symbol, "cancel_order", order)
+
+    def replace_order(self, order: Order, new_price: Optional[Decimal], new_qty: Optional[Decimal]):
+        self._send(order.symbol, "replace_order", order, new_price, new_qty)
+
+    def cancel_orders_in_range(self, symbol: str, side: Side, lo: Optional[Decimal] = None, hi: Optional[Decimal] = None):
+        self._send(symbol, "cancel_orders_in_range", side, lo, hi)
+
+    @property
+    def errors(self) -> List[Tuple[str, tuple, Exception]]:
+        # (method name, args, exception) of every command that raised, per book thread in the order they failed
+        return [error for book_thread in self._threads for error in book_thread.errors]
+
+    @property
+    def in_flight(self) -> int:
+        return sum(book_thread.sent_count - book_thread.processed_count for book_thread in self._threads)
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        # waits until every command sent so far is applied, returns False on timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.in_flight > 0:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.0001)
+        return True
@@ -6,6 +6,7 @@ from typing import Dict, List, Optional
 
 from helper import string_helper
 from matching_engine_core.i_transaction_subscriber import ITransactionSubscriber
+from matching_engine_core.models.execution_report import ExecutionReport
 from matching_engine_core.models.order import Order
 from matching_engine_core.models.reject_codes import RejectCode
 from matching_engine_core.models.side import Side
@@ -304,8 +305,10 @@ class OrderbookGUI(ITransactionSubscriber):
         for item in self.sell_tree.get_children():
             self.sell_tree.delete(item)
         
+        # the snapshot is not affected by commands applied while the levels are built
+        snapshot = self.orderbook.snapshot()
         buy_levels: List[PriceLevel] = []
-        for order in self.orderbook.in_order_buy_orders():
+        for order in snapshot.in_order_buy_orders():
             if len(buy_levels) == 0 or buy_levels[-1].price != order.price:
                 if len(buy_levels) > 0:
                     total_qty = buy_levels[-1].total_qty
@@ -317,7 +320,7 @@ class OrderbookGUI(ITransactionSubscriber):
                 buy_levels[-1].total_qty += order.open_qty
         
         sell_levels: List[PriceLevel] = []
-        for order in self.orderbook.in_order_sell_orders():
+        for order in snapshot.in_order_sell_orders():
             if len(sell_levels) == 0 or sell_levels[-1].price != order.price:
                 if len(sell_levels) > 0:
                     total_qty = sell_levels[-1].total_qty
@@ -349,12 +352,12 @@ class OrderbookGUI(ITransactionSubscriber):
         self.trades_tree.insert("", 0, values=(trade.qty, trade.price, trade.active_side.name, trade.trade_id), tags=(tag,))
         self.trades.append(trade)
     
-    def on_order_update(self, order: Order):
-        if not order.is_open:
-            if order.order_id == self.selected_order_id:
+    def on_order_update(self, report: ExecutionReport):
+        if not report.is_open:
+            if report.order_id == self.selected_order_id:
                 self.selected_order_id = None
                 
-            del self.open_orders[order.order_id]
+            del self.open_orders[report.order_id]
     
     def on_cancel_reject(self, order: Order, reject_code: RejectCode):
         self.show_error(f"Cancel Reject: {reject_code.name}")
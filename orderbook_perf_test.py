@@ -178,6 +178,27 @@ def cancel_test_unit(cancel_count: int, insert_count: int, price_range: int) ->
     return round(diff, max(4 - logarithm, 0))
     
     
+def load_snapshot_test_unit(count: int, price_range: int) -> float:
+    orders = initialize_orders(count, price_range, no_matching=True)
+    ob = Orderbook("TEST")
+    
+    start = time.time()
+    ob.load_snapshot(orders)
+    end = time.time()
+    
+    assert len(list(ob.in_order_buy_orders())) + len(list(ob.in_order_sell_orders())) == count
+    diff = end - start
+    logarithm = int(math.log10(diff))
+    return round(diff, max(4 - logarithm, 0))
+    
+def load_snapshot_test():
+    duration = load_snapshot_test_unit(LARGE, SMALL)
+    print(f"Load snapshot large (count: {LARGE}) on small price range([1,{SMALL}]) took {duration} seconds")
+    duration = load_snapshot_test_unit(LARGE, MEDIUM)
+    print(f"Load snapshot large (count: {LARGE}) on medium price range([1,{MEDIUM}]) took {duration} seconds")
+    duration = load_snapshot_test_unit(LARGE, LARGE)
+    print(f"Load snapshot large (count: {LARGE}) on large price range([1,{LARGE}]) took {duration} seconds")
+    
 def replace_test(count: int, count_verbal: str):
     duration = replace_test_unit(count, SMALL, SMALL)
     print(f"Replace {count_verbal}(count: {count}) for small order count({SMALL}), for small price range (([1,{SMALL}])) took {duration} seconds")
@@ -223,6 +244,7 @@ def cancel_test(count: int, count_verbal: str):
 insert_small_test()
 insert_medium_test()
 insert_large_test()
+load_snapshot_test()
 replace_test(SMALL, "small")
 replace_test(MEDIUM, "medium")
 replace_test(LARGE, "large")
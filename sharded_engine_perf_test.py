@@ -0,0 +1,72 @@
+from decimal import Decimal
+import multiprocessing
+import random
+import time
+from typing import List
+from helper import cpu_affinity, string_helper
+from helper.cpu_affinity import CpuPlacement
+from matching_engine_core.matching_engine import MatchingEngine
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.side import Side
+from matching_engine_core.sharding.sharded_engine import ShardedMatchingEngine
+
+# Multi symbol throughput of the in process engine against the sharded engine with an increasing number of worker processes.
+# Sharding only pays off when there are more cores than one, the front end encodes and batches the commands while
+# the workers match, so the scaling is bounded by the front end once the workers are fast enough.
+
+SYMBOL_COUNT = 64
+ORDER_COUNT = 200000
+PRICE_RANGE = 100
+QTY_MIN = 90
+QTY_MAX = 100
+
+
+def initialize_orders(count: int, symbol_count: int) -> List[Order]:
+    symbols = [f"SYM{i}" for i in range(symbol_count)]
+    orders: List[Order] = []
+    for i in range(count):
+        orders.append(Order(cl_ord_id=string_helper.generate_uuid(),
+                            order_id=string_helper.generate_uuid(),
+                            side=Side(random.randint(0, 1)),
+                            qty=Decimal(random.randint(QTY_MIN, QTY_MAX)),
+                            price=Decimal(random.randint(1, PRICE_RANGE)),
+                            symbol=random.choice(symbols)))
+    return orders
+
+
+def in_process_test(orders: List[Order]) -> float:
+    engine = MatchingEngine()
+    start = time.time()
+    for order in orders:
+        engine.submit_order(order)
+    end = time.time()
+    return end - start
+
+
+def sharded_test(orders: List[Order], worker_count: int) -> float:
+    # the front end gets the first core and every worker a core of its own while there are enough of them
+    cpus = cpu_affinity.current_cpus()
+    worker_placements = [CpuPlacement(cpus=[cpus[(i + 1) % len(cpus)]]) for i in range(worker_count)]
+    with ShardedMatchingEngine(worker_count=worker_count, worker_placements=worker_placements,
+                               front_end_placement=CpuPlacement(cpus=[cpus[0]])) as engine:
+        start = time.time()
+        for order in orders:
+            engine.submit_order(order)
+        engine.drain()
+        end = time.time()
+        for metrics in engine.worker_metrics():
+            print(f"    worker {metrics.shard} on cpus {metrics.cpus}: {metrics.migrations} migrations, "
+                  f"{metrics.run_queue_wait_seconds} seconds waiting on the run queue")
+    cpu_affinity.apply_placement(CpuPlacement(cpus=cpus))
+    return end - start
+
+
+if __name__ == "__main__":
+    print(f"{multiprocessing.cpu_count()} cpus, {SYMBOL_COUNT} symbols, {ORDER_COUNT} orders")
+    duration = in_process_test(initialize_orders(ORDER_COUNT, SYMBOL_COUNT))
+    print(f"In process engine took {duration} seconds, {ORDER_COUNT / duration:.0f} orders/s")
+    worker_count = 1
+    while worker_count <= multiprocessing.cpu_count():
+        duration = sharded_test(initialize_orders(ORDER_COUNT, SYMBOL_COUNT), worker_count)
+        print(f"Sharded engine with {worker_count} workers took {duration} seconds, {ORDER_COUNT / duration:.0f} orders/s")
+        worker_count *= 2
@@ -0,0 +1,76 @@
+import multiprocessing
+import statistics
+import time
+from typing import List
+from helper.collections.shared_memory_ring import SharedMemoryRing, WaitStrategy
+
+# Round trip latency of a 64 byte message between two processes, the echo process sends every message straight back.
+# Busy spin needs a core for each side, on a single core machine the spinning side holds the core until it is preempted.
+
+ROUND_TRIPS = 20000
+MESSAGE = bytes(64)
+
+
+def ring_echo(requests: SharedMemoryRing, responses: SharedMemoryRing):
+    while True:
+        message = requests.read()
+        responses.write(message)
+        if not message:
+            return
+
+
+def queue_echo(requests, responses):
+    while True:
+        message = requests.get()
+        responses.put(message)
+        if not message:
+            return
+
+
+def report(name: str, latencies: List[float]):
+    latencies.sort()
+    print(f"{name}: median {statistics.median(latencies) * 1e6:.1f} us, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.1f} us, max {latencies[-1] * 1e6:.1f} us")
+
+
+def ring_test(wait_strategy: WaitStrategy) -> List[float]:
+    requests = SharedMemoryRing(slot_count=64, slot_size=128, wait_strategy=wait_strategy)
+    responses = SharedMemoryRing(slot_count=64, slot_size=128, wait_strategy=wait_strategy)
+    process = multiprocessing.Process(target=ring_echo, args=(requests, responses), daemon=True)
+    process.start()
+    latencies = []
+    for i in range(ROUND_TRIPS):
+        start = time.perf_counter()
+        requests.write(MESSAGE)
+        responses.read()
+        latencies.append(time.perf_counter() - start)
+    requests.write(b"")
+    responses.read()
+    process.join()
+    requests.close()
+    responses.close()
+    return latencies
+
+
+def queue_test() -> List[float]:
+    requests = multiprocessing.Queue()
+    responses = multiprocessing.Queue()
+    process = multiprocessing.Process(target=queue_echo, args=(requests, responses), daemon=True)
+    process.start()
+    latencies = []
+    for i in range(ROUND_TRIPS):
+        start = time.perf_counter()
+        requests.put(MESSAGE)
+        responses.get()
+        latencies.append(time.perf_counter() - start)
+    requests.put(b"")
+    responses.get()
+    process.join()
+    return latencies
+
+
+if __name__ == "__main__":
+    print(f"{multiprocessing.cpu_count()} cpus, {ROUND_TRIPS} round trips of {len(MESSAGE)} bytes")
+    for wait_strategy in WaitStrategy:
+        report(f"Shared memory ring ({wait_strategy.name})", ring_test(wait_strategy))
+    report("multiprocessing.Queue", queue_test())
@@ -0,0 +1,26 @@
+from decimal import Decimal
+import random
+from typing import List
+
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.side import Side
+from matching_engine_core.models.time_in_force import TimeInForce
+from matching_engine_core.orderbook import Orderbook
+
+
+def random_command(ob: Orderbook, orders: List[Order], i: int):
+    # submits, cancels, replaces and mass cancels so that levels and resting orders appear, change and disappear
+    roll = random.randint(1, 20)
+    if roll <= 4 and orders:
+        ob.cancel_order(random.choice(orders))
+    elif roll <= 8 and orders:
+        order = random.choice(orders)
+        ob.replace_order(order, Decimal(random.randint(1, 20)), order.qty + Decimal(random.randint(0, 2)))
+    elif roll == 9:
+        ob.cancel_orders_in_range(Side(random.randint(0, 1)), Decimal(random.randint(1, 10)), Decimal(random.randint(10, 20)))
+    else:
+        order = Order(cl_ord_id=str(i), order_id=str(i), side=Side(random.randint(0, 1)),
+                      price=Decimal(random.randint(1, 20)), qty=Decimal(random.randint(1, 10)), symbol=ob.symbol,
+                      time_in_force=random.choice([TimeInForce.GoodTillCancel] * 4 + [TimeInForce.ImmediateOrCancel, TimeInForce.FillOrKill]))
+        orders.append(order)
+        ob.submit_order(order)
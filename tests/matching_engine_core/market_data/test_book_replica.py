@@ -0,0 +1,73 @@
+from decimal import Decimal
+from typing import List
+
+import pytest
+
+from matching_engine_core.market_data.book_replica import BookReplica, SequenceGapError
+from matching_engine_core.market_data.l2_publisher import L2Publisher
+from matching_engine_core.market_data.l3_publisher import L3Publisher
+from matching_engine_core.market_data.messages import L2Delta, L3Message
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.side import Side
+from matching_engine_core.orderbook import Orderbook
+from tests.matching_engine_core.market_data.book_commands import random_command
+
+
+def assert_same_depth(replica: BookReplica, ob: Orderbook):
+    for side in Side:
+        levels = list(ob.levels(side))
+        assert replica.depth(side) == ([p for p, _, _ in levels], [q for _, q, _ in levels], [c for _, _, c in levels])
+        assert replica.top_levels(side, 3) == ob.top_levels(side, 3)
+    assert (replica.best_bid, replica.best_ask) == (ob.best_bid, ob.best_ask)
+
+
+def test_replica_follows_l2_and_l3_feeds():
+    ob = Orderbook("A")
+    l2: List[L2Delta] = []
+    l3: List[L3Message] = []
+    l2_replica = BookReplica("A")
+    l3_replica = BookReplica("A")
+    l2_replica.load_snapshot(L2Publisher(ob, l2.extend).snapshot())
+    l3_replica.load_snapshot(L3Publisher(ob, l3.extend).snapshot())
+    orders: List[Order] = []
+    for i in range(2000):
+        random_command(ob, orders, i)
+        l2_replica.apply_l2(l2)
+        l3_replica.apply_l3(l3)
+        l2.clear()
+        l3.clear()
+        assert_same_depth(l2_replica, ob)
+        assert_same_depth(l3_replica, ob)
+    assert l2_replica.book_seq <= ob.sequence and l3_replica.book_seq <= ob.sequence
+    bid, ask = l3_replica.bbo()
+    assert bid is None or bid == ob.top_levels(Side.Buy, 1)[0]
+    assert ask is None or ask == ob.top_levels(Side.Sell, 1)[0]
+
+
+def test_gap_requests_a_snapshot():
+    ob = Orderbook("A")
+    l3: List[L3Message] = []
+    publisher = L3Publisher(ob, l3.extend)
+    replica = BookReplica("A", request_snapshot=publisher.snapshot)
+    orders: List[Order] = []
+    for i in range(500):
+        random_command(ob, orders, i)
+        # every tenth batch is lost
+        if i % 10 != 0:
+            replica.apply_l3(l3)
+        l3.clear()
+    random_command(ob, orders, 500)
+    replica.apply_l3(l3)
+    assert replica.gap_count > 0
+    assert replica.feed_seq == publisher.feed_seq
+    assert_same_depth(replica, ob)
+
+
+def test_gap_without_snapshot_source_raises():
+    replica = BookReplica("A")
+    with pytest.raises(SequenceGapError):
+        replica.apply_l2([L2Delta(2, 1, "A", Side.Buy, Decimal(1), Decimal(1), 1)])
+    replica.apply_l2([L2Delta(1, 1, "A", Side.Buy, Decimal(1), Decimal(1), 1)])
+    # already applied deltas are skipped
+    replica.apply_l2([L2Delta(1, 1, "A", Side.Buy, Decimal(1), Decimal(5), 1)])
+    assert replica.bbo() == ((Decimal(1), Decimal(1)), None)
@@ -0,0 +1,129 @@
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+from matching_engine_core.market_data.l2_publisher import L2Publisher
+from matching_engine_core.market_data.messages import L2Delta, L2Snapshot
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.side import Side
+from matching_engine_core.orderbook import Orderbook
+from matching_engine_core.sequencer import Sequencer
+from tests.matching_engine_core.market_data.book_commands import random_command
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class L2Client:
+    # depth rebuilt from a snapshot and the deltas after it
+    def __init__(self, snapshot: L2Snapshot):
+        self.feed_seq = snapshot.feed_seq
+        self.levels: Dict[Tuple[Side, Decimal], Tuple[Decimal, int]] = dict()
+        for side, levels in ((Side.Buy, snapshot.bids), (Side.Sell, snapshot.asks)):
+            for price, qty, count in levels:
+                self.levels[(side, price)] = (qty, count)
+
+    def apply(self, deltas: List[L2Delta]):
+        for delta in deltas:
+            if delta.feed_seq <= self.feed_seq:
+                continue
+            assert delta.feed_seq == self.feed_seq + 1
+            self.feed_seq = delta.feed_seq
+            if delta.count == 0:
+                del self.levels[(delta.side, delta.price)]
+            else:
+                self.levels[(delta.side, delta.price)] = (delta.qty, delta.count)
+
+
+def book_levels(ob: Orderbook) -> Dict[Tuple[Side, Decimal], Tuple[Decimal, int]]:
+    return {(side, price): (qty, count) for side in Side for price, qty, count in ob.levels(side)}
+
+
+def test_deltas_rebuild_the_book():
+    ob = Orderbook("A")
+    published: List[L2Delta] = []
+    publisher = L2Publisher(ob, published.extend)
+    client = L2Client(publisher.snapshot())
+    orders: List[Order] = []
+    for i in range(2000):
+        random_command(ob, orders, i)
+        client.apply(published)
+        published.clear()
+        assert client.levels == book_levels(ob)
+    assert publisher.feed_seq == client.feed_seq
+
+
+def test_publisher_fed_by_the_sequencer_publishes_the_same_deltas():
+    ob = Orderbook("A")
+    sequencer = Sequencer(capacity=256)
+    sequencer.attach(ob)
+    direct: List[L2Delta] = []
+    from_ring: List[L2Delta] = []
+    L2Publisher(ob, direct.extend)
+    L2Publisher(ob, from_ring.extend, sequencer=sequencer)
+    orders: List[Order] = []
+    for i in range(2000):
+        random_command(ob, orders, i)
+        assert from_ring == direct
+    assert direct
+
+
+def test_late_joiner_and_existing_book():
+    ob = Orderbook("A")
+    orders: List[Order] = []
+    for i in range(300):
+        random_command(ob, orders, i)
+    published: List[L2Delta] = []
+    publisher = L2Publisher(ob, published.extend)
+    assert L2Client(publisher.snapshot()).levels == book_levels(ob)
+    for i in range(300, 600):
+        random_command(ob, orders, i)
+    snapshot = publisher.snapshot()
+    assert snapshot.book_seq == ob.sequence
+    late_client = L2Client(snapshot)
+    for i in range(600, 900):
+        random_command(ob, orders, i)
+    late_client.apply(published)
+    assert late_client.levels == book_levels(ob)
+    after_snapshot = [delta for delta in published if delta.feed_seq > snapshot.feed_seq]
+    assert after_snapshot and all(delta.book_seq > snapshot.book_seq for delta in after_snapshot)
+
+
+def test_conflation_keeps_latest_state_per_level():
+    ob = Orderbook("A")
+    clock = FakeClock()
+    published: List[List[L2Delta]] = []
+    L2Publisher(ob, published.append, conflation_interval=1.0, clock=clock)
+    orders = [Order(cl_ord_id=str(i), order_id=str(i), side=Side.Buy, price=Decimal(10), qty=Decimal(1), symbol="A")
+              for i in range(100)]
+    for order in orders:
+        ob.submit_order(order)
+    for order in orders[:40]:
+        ob.cancel_order(order)
+    ob.submit_order(Order(cl_ord_id="s", order_id="s", side=Side.Sell, price=Decimal(12), qty=Decimal(1), symbol="A"))
+    assert published == []
+    clock.now = 1.0
+    ob.submit_order(Order(cl_ord_id="b", order_id="b", side=Side.Buy, price=Decimal(9), qty=Decimal(2), symbol="A"))
+    assert len(published) == 1
+    assert [(d.feed_seq, d.side, d.price, d.qty, d.count) for d in published[0]] == [
+        (1, Side.Buy, Decimal(10), Decimal(60), 60),
+        (2, Side.Sell, Decimal(12), Decimal(1), 1),
+        (3, Side.Buy, Decimal(9), Decimal(2), 1)]
+    assert all(d.book_seq == ob.sequence for d in published[0])
+
+
+def test_level_changed_and_restored_within_interval_is_not_published():
+    ob = Orderbook("A")
+    clock = FakeClock()
+    published: List[List[L2Delta]] = []
+    publisher = L2Publisher(ob, published.append, conflation_interval=1.0, clock=clock)
+    order = Order(cl_ord_id="o", order_id="o", side=Side.Sell, price=Decimal(5), qty=Decimal(1), symbol="A")
+    ob.submit_order(order)
+    ob.cancel_order(order)
+    publisher.flush()
+    assert published == []
+    assert publisher.feed_seq == 0
@@ -0,0 +1,135 @@
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+from matching_engine_core.market_data.l3_action import L3Action
+from matching_engine_core.market_data.l3_publisher import L3Publisher
+from matching_engine_core.market_data.messages import L3Message, L3Snapshot
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.side import Side
+from matching_engine_core.orderbook import Orderbook
+from matching_engine_core.sequencer import Sequencer
+from tests.matching_engine_core.market_data.book_commands import random_command
+
+
+class L3Client:
+    # resting orders rebuilt from a snapshot and the messages after it, dicts keep the time priority of a level
+    def __init__(self, snapshot: L3Snapshot):
+        self.feed_seq = snapshot.feed_seq
+        self.levels: Dict[Tuple[Side, Decimal], Dict[str, Decimal]] = dict()
+        self.orders: Dict[str, Tuple[Side, Decimal]] = dict()
+        for side, orders in ((Side.Buy, snapshot.bids), (Side.Sell, snapshot.asks)):
+            for order in orders:
+                self._add(side, order.price, order.order_id, order.qty)
+
+    def _add(self, side: Side, price: Decimal, order_id: str, qty: Decimal):
+        self.levels.setdefault((side, price), dict())[order_id] = qty
+        self.orders[order_id] = (side, price)
+
+    def _remove(self, order_id: str):
+        key = self.orders.pop(order_id)
+        del self.levels[key][order_id]
+        if not self.levels[key]:
+            del self.levels[key]
+
+    def apply(self, messages: List[L3Message]):
+        for message in messages:
+            if message.feed_seq <= self.feed_seq:
+                continue
+            assert message.feed_seq == self.feed_seq + 1
+            self.feed_seq = message.feed_seq
+            if message.action == L3Action.Add:
+                assert message.order_id not in self.orders
+                self._add(message.side, message.price, message.order_id, message.qty)
+            elif message.action == L3Action.Modify:
+                self._remove(message.order_id)
+                self._add(message.side, message.price, message.order_id, message.qty)
+            elif message.action == L3Action.Delete:
+                self._remove(message.order_id)
+            else:
+                side, price = self.orders[message.order_id]
+                assert price == message.price
+                if message.qty == 0:
+                    self._remove(message.order_id)
+                else:
+                    self.levels[(side, price)][message.order_id] = message.qty
+
+    def book(self) -> List[Tuple[Side, str, Decimal, Decimal]]:
+        result = []
+        for side, reverse in ((Side.Buy, True), (Side.Sell, False)):
+            for price in sorted((price for s, price in self.levels if s == side), reverse=reverse):
+                for order_id, qty in self.levels[(side, price)].items():
+                    result.append((side, order_id, price, qty))
+        return result
+
+
+def book_orders(ob: Orderbook) -> List[Tuple[Side, str, Decimal, Decimal]]:
+    return ([(Side.Buy, o.order_id, o.price, o.open_qty) for o in ob.in_order_buy_orders()] +
+            [(Side.Sell, o.order_id, o.price, o.open_qty) for o in ob.in_order_sell_orders()])
+
+
+def test_messages_rebuild_the_book_with_priorities():
+    ob = Orderbook("A")
+    published: List[L3Message] = []
+    publisher = L3Publisher(ob, published.extend)
+    client = L3Client(publisher.snapshot())
+    orders: List[Order] = []
+    for i in range(3000):
+        random_command(ob, orders, i)
+        client.apply(published)
+        published.clear()
+        assert client.book() == book_orders(ob)
+    assert client.feed_seq == publisher.feed_seq
+
+
+def test_publisher_fed_by_the_sequencer_only_sees_its_book():
+    ob = Orderbook("A")
+    other = Orderbook("B")
+    sequencer = Sequencer(capacity=256)
+    sequencer.attach(ob)
+    sequencer.attach(other)
+    published: List[L3Message] = []
+    publisher = L3Publisher(ob, published.extend, sequencer=sequencer)
+    client = L3Client(publisher.snapshot())
+    orders: List[Order] = []
+    for i in range(1000):
+        random_command(ob, orders, i)
+        other.submit_order(Order(cl_ord_id=str(i), order_id=str(i), side=Side(i % 2), price=Decimal(i % 7 + 1),
+                                 qty=Decimal(1), symbol="B"))
+        client.apply(published)
+        published.clear()
+        assert client.book() == book_orders(ob)
+    assert client.feed_seq == publisher.feed_seq
+
+
+def test_late_joiner_syncs_from_snapshot():
+    ob = Orderbook("A")
+    orders: List[Order] = []
+    for i in range(300):
+        random_command(ob, orders, i)
+    published: List[L3Message] = []
+    publisher = L3Publisher(ob, published.extend)
+    for i in range(300, 600):
+        random_command(ob, orders, i)
+    snapshot = publisher.snapshot()
+    client = L3Client(snapshot)
+    for i in range(600, 900):
+        random_command(ob, orders, i)
+    client.apply(published)
+    assert client.book() == book_orders(ob)
+    assert all(message.book_seq > snapshot.book_seq for message in published if message.feed_seq > snapshot.feed_seq)
+
+
+def test_aggressive_order_messages():
+    ob = Orderbook("A")
+    published: List[L3Message] = []
+    L3Publisher(ob, published.extend)
+    so = Order(cl_ord_id="s", order_id="s", side=Side.Sell, price=Decimal(10), qty=Decimal(3), symbol="A")
+    bo = Order(cl_ord_id="b", order_id="b", side=Side.Buy, price=Decimal(11), qty=Decimal(5), symbol="A")
+    ob.submit_order(so)
+    ob.submit_order(bo)
+    assert [(m.action, m.order_id, m.price, m.qty, m.last_qty) for m in published] == [
+        (L3Action.Add, "s", Decimal(10), Decimal(3), Decimal(0)),
+        (L3Action.Execute, "s", Decimal(10), Decimal(0), Decimal(3)),
+        (L3Action.Add, "b", Decimal(11), Decimal(2), Decimal(0))]
+    assert [m.feed_seq for m in published] == [1, 2, 3]
+    assert published[-1].book_seq == ob.sequence - 1
@@ -0,0 +1,83 @@
+from decimal import Decimal
+import multiprocessing
+
+import pytest
+
+from matching_engine_core.market_data.top_of_book import TopOfBook, TopOfBookPublisher, TopOfBookTable
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.side import Side
+from matching_engine_core.orderbook import Orderbook
+
+
+def create_order(order_id: str, side: Side, price: int, qty: int, symbol: str = "A") -> Order:
+    return Order(cl_ord_id=order_id, order_id=order_id, side=side, price=Decimal(price), qty=Decimal(qty), symbol=symbol)
+
+
+def write_consistent_records(table: TopOfBookTable, count: int):
+    # bid qty, ask qty and book sequence are always equal, a torn read would see them differ
+    slot = table.slot_of("A")
+    for i in range(1, count + 1):
+        table.write(slot, i, (Decimal(1), Decimal(i)), (Decimal(2), Decimal(i)), None)
+    table.close()
+
+
+def read_in_child(table: TopOfBookTable, results):
+    results.put(table.read("B"))
+    table.close()
+
+
+def test_publisher_writes_best_levels_and_last_trade():
+    table = TopOfBookTable(["A", "B"])
+    try:
+        ob = Orderbook("A")
+        TopOfBookPublisher(ob, table)
+        assert table.read("A") == TopOfBook("A", 0, None, None, None)
+        ob.submit_order(create_order("b1", Side.Buy, 10, 5))
+        ob.submit_order(create_order("b2", Side.Buy, 10, 2))
+        ob.submit_order(create_order("s1", Side.Sell, 12, 4))
+        assert table.read("A") == TopOfBook("A", ob.sequence, (Decimal(10), Decimal(7)), (Decimal(12), Decimal(4)), None)
+        ob.submit_order(create_order("s2", Side.Sell, 9, 6))
+        assert table.read("A") == TopOfBook("A", ob.sequence, (Decimal(10), Decimal(1)), (Decimal(12), Decimal(4)),
+                                            (Decimal(10), Decimal(1)))
+        assert ob.best_bid_level == (Decimal(10), Decimal(1))
+        assert table.read("B").book_seq == 0
+        with pytest.raises(KeyError):
+            table.read("C")
+    finally:
+        table.close()
+
+
+def test_reader_in_other_process():
+    table = TopOfBookTable(["A", "B"])
+    try:
+        ob = Orderbook("B")
+        TopOfBookPublisher(ob, table)
+        ob.submit_order(create_order("s", Side.Sell, 7, 3, "B"))
+        results = multiprocessing.Queue()
+        process = multiprocessing.Process(target=read_in_child, args=(table, results), daemon=True)
+        process.start()
+        assert results.get(timeout=10) == TopOfBook("B", ob.sequence, None, (Decimal(7), Decimal(3)), None)
+        process.join()
+        attached = TopOfBookTable.attach(table.name)
+        assert attached.symbols == ["A", "B"]
+        assert attached.read("B") == table.read("B")
+        attached.close()
+    finally:
+        table.close()
+
+
+def test_reads_are_never_torn():
+    table = TopOfBookTable(["A"])
+    try:
+        process = multiprocessing.Process(target=write_consistent_records, args=(table, 20000), daemon=True)
+        process.start()
+        last = 0
+        while last < 20000:
+            top = table.read("A")
+            if top.book_seq:
+                assert top.bid[1] == top.ask[1] == top.book_seq
+            assert top.book_seq >= last
+            last = top.book_seq
+        process.join()
+    finally:
+        table.close()
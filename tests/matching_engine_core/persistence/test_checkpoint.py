@@ -0,0 +1,66 @@
+from decimal import Decimal
+
+import pytest
+
+from helper import string_helper
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.side import Side
+from matching_engine_core.orderbook import Orderbook
+from matching_engine_core.persistence import snapshot
+from matching_engine_core.persistence.checkpoint import FORK_SUPPORTED, Checkpointer
+from matching_engine_core.persistence.journal_writer import FsyncPolicy, JournalWriter
+
+
+def populated_orderbook() -> Orderbook:
+    orderbook = Orderbook("A")
+    for i in range(200):
+        orderbook.submit_order(Order(cl_ord_id=string_helper.generate_uuid(),
+                                     order_id=string_helper.generate_uuid(),
+                                     side=Side.Buy if i % 2 == 0 else Side.Sell,
+                                     qty=Decimal(i % 5 + 1),
+                                     price=Decimal(i % 40 + 1),
+                                     symbol="A"))
+    return orderbook
+
+
+def resting_ids(orderbook: Orderbook):
+    return [o.order_id for o in orderbook.in_order_buy_orders()], [o.order_id for o in orderbook.in_order_sell_orders()]
+
+
+@pytest.mark.parametrize("use_fork", [True, False])
+def test_checkpoint_writes_consistent_snapshot(tmp_path, use_fork):
+    if use_fork and not FORK_SUPPORTED:
+        pytest.skip("fork is not available")
+    orderbook = populated_orderbook()
+    expected = resting_ids(orderbook)
+    checkpointer = Checkpointer(str(tmp_path), use_fork=use_fork)
+    metrics = checkpointer.checkpoint([orderbook], 7)
+    # the parent keeps mutating the book, the child's view is unaffected
+    orderbook.cancel_orders_in_range(Side.Buy)
+    checkpointer.wait()
+    assert metrics.forked == use_fork
+    assert metrics.succeeded
+    assert metrics.pause_seconds <= metrics.duration_seconds
+    assert not checkpointer.in_progress
+    last_sequence, orderbooks = snapshot.load_latest_snapshot(str(tmp_path))
+    assert last_sequence == 7
+    assert resting_ids(orderbooks[0]) == expected
+
+
+@pytest.mark.parametrize("use_fork", [True, False])
+def test_checkpoint_is_tagged_with_the_durable_journal_sequence(tmp_path, use_fork):
+    if use_fork and not FORK_SUPPORTED:
+        pytest.skip("fork is not available")
+    journal = JournalWriter(str(tmp_path / "journal"), fsync_policy=FsyncPolicy.Never, background=False)
+    orderbook = populated_orderbook()
+    orderbook.journal = journal
+    orderbook.cancel_orders_in_range(Side.Buy)
+    checkpointer = Checkpointer(str(tmp_path / "snapshots"), use_fork=use_fork, journal=journal)
+    with pytest.raises(ValueError):
+        checkpointer.checkpoint([orderbook], journal.last_sequence + 1)
+    metrics = checkpointer.checkpoint([orderbook])
+    checkpointer.wait()
+    assert metrics.succeeded
+    assert metrics.last_sequence == journal.durable_sequence == journal.last_sequence == 1
+    assert snapshot.load_latest_snapshot(str(tmp_path / "snapshots"))[0] == 1
+    journal.close()
@@ -0,0 +1,182 @@
+from decimal import Decimal
+import os
+import time
+from typing import List
+
+import pytest
+
+from helper import string_helper
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.side import Side
+from matching_engine_core.models.time_in_force import TimeInForce
+from matching_engine_core.orderbook import Orderbook
+from matching_engine_core.persistence import records
+from matching_engine_core.persistence.journal_reader import JournalReader
+from matching_engine_core.persistence.journal_writer import SEGMENT_HEADER, FsyncPolicy, JournalWriter, list_segments
+
+
+def create_order(price: Decimal, qty: Decimal, side: Side, time_in_force: TimeInForce = TimeInForce.GoodTillCancel) -> Order:
+    return Order(cl_ord_id=string_helper.generate_uuid(),
+                 order_id=string_helper.generate_uuid(),
+                 side=side,
+                 qty=qty,
+                 price=price,
+                 symbol="test",
+                 time_in_force=time_in_force)
+
+
+def read_commands(directory: str) -> List[records.Command]:
+    commands = []
+    for path in list_segments(directory):
+        with open(path, "rb") as f:
+            data = memoryview(f.read())
+        offset = SEGMENT_HEADER.size
+        while offset < len(data):
+            command, offset = records.decode_record(data, offset)
+            commands.append(command)
+    return commands
+
+
+def test_decimal_round_trip():
+    for value in ["0", "0.000000005", "-12.5", "123456789.123456789", "1E+5"]:
+        assert records.decode_decimal(*records.encode_decimal(Decimal(value))) == Decimal(value)
+    try:
+        records.encode_decimal(Decimal("NaN"))
+        assert False
+    except ValueError:
+        pass
+
+
+def test_record_round_trip():
+    order = create_order(Decimal("10.25"), Decimal("3"), Side.Sell, TimeInForce.FillOrKill)
+    command, offset = records.decode_record(records.encode_submit(7, order))
+    assert command == records.SubmitCommand(7, order.timestamp, "test", order.order_id, order.cl_ord_id, Side.Sell,
+                                            TimeInForce.FillOrKill, Decimal("10.25"), Decimal("3"))
+    command, offset = records.decode_record(records.encode_replace(8, order, None, Decimal("4")))
+    assert command == records.ReplaceCommand(8, "test", order.order_id, None, Decimal("4"))
+    command, offset = records.decode_record(records.encode_mass_cancel(9, "test", Side.Buy, Decimal("1"), None))
+    assert command == records.MassCancelCommand(9, "test", Side.Buy, Decimal("1"), None)
+    # the body, the sequence and the record type are all covered by the checksum
+    for index in (-1, 8, records.HEADER.size - 1):
+        corrupted = bytearray(records.encode_cancel(10, order))
+        corrupted[index] ^= 0x01
+        try:
+            records.decode_record(corrupted)
+            assert False
+        except records.CorruptRecordError:
+            pass
+
+
+def test_orderbook_journals_accepted_commands(tmp_path):
+    journal = JournalWriter(str(tmp_path), fsync_policy=FsyncPolicy.Never, background=False)
+    ob = Orderbook("test", journal=journal)
+    bo = create_order(Decimal("5"), Decimal("2"), Side.Buy)
+    ob.submit_order(bo)
+    ob.replace_order(bo, Decimal("6"), None)
+    # rejected commands are not journaled
+    ob.replace_order(bo, Decimal("6"), None)
+    ob.cancel_order(create_order(Decimal("5"), Decimal("2"), Side.Buy))
+    ob.cancel_order(bo)
+    ob.cancel_orders_in_range(Side.Sell, hi=Decimal("3"))
+    assert journal.last_sequence == 4
+    assert journal.durable_sequence == 0
+    journal.flush()
+    assert journal.durable_sequence == 4
+    commands = read_commands(str(tmp_path))
+    assert [type(c) for c in commands] == [records.SubmitCommand, records.ReplaceCommand, records.CancelCommand, records.MassCancelCommand]
+    assert [c.sequence for c in commands] == [1, 2, 3, 4]
+    journal.close()
+
+
+def test_group_commit_rotation_and_restart(tmp_path):
+    journal = JournalWriter(str(tmp_path), segment_size=1024, fsync_policy=FsyncPolicy.EveryFlush, flush_interval=0.0005)
+    ob = Orderbook("test", journal=journal)
+    for i in range(200):
+        ob.submit_order(create_order(Decimal(i % 10 + 1), Decimal("1"), Side.Buy if i % 2 == 0 else Side.Sell))
+    journal.close()
+    assert len(list_segments(str(tmp_path))) > 1
+    assert [c.sequence for c in read_commands(str(tmp_path))] == list(range(1, 201))
+    # a torn record at the tail is ignored and the next run continues in a new segment
+    last_segment = list_segments(str(tmp_path))[-1]
+    with open(last_segment, "ab") as f:
+        f.write(b"\x01\x02\x03")
+    journal = JournalWriter(str(tmp_path), background=False)
+    assert journal.last_sequence == 200
+    journal.append_cancel(create_order(Decimal("1"), Decimal("1"), Side.Buy))
+    journal.close()
+    assert os.path.basename(list_segments(str(tmp_path))[-1]).startswith(f"{201:020d}")
+    # a segment whose header was torn continues from the sequence in its name
+    with open(os.path.join(str(tmp_path), f"{202:020d}.journal"), "wb") as f:
+        f.write(b"BK")
+    journal = JournalWriter(str(tmp_path))
+    assert journal.last_sequence == 201
+    journal.append_cancel(create_order(Decimal("1"), Decimal("1"), Side.Buy))
+    journal.close()
+    assert os.path.basename(list_segments(str(tmp_path))[-1]).startswith(f"{202:020d}")
+    assert JournalWriter(str(tmp_path), background=False).last_sequence == 202
+
+
+def test_reader_replays_into_orderbook(tmp_path):
+    journal = JournalWriter(str(tmp_path), segment_size=4096, fsync_policy=FsyncPolicy.Never, index_interval=16, background=False)
+    ob = Orderbook("test", journal=journal)
+    orders = []
+    for i in range(600):
+        order = create_order(Decimal(i % 13 + 1), Decimal(i % 4 + 1), Side.Buy if i % 3 == 0 else Side.Sell)
+        ob.submit_order(order)
+        orders.append(order)
+        if i % 7 == 0:
+            ob.cancel_order(orders[i // 2])
+        if i % 11 == 0 and orders[i // 3].is_open:
+            ob.replace_order(orders[i // 3], Decimal(i % 13 + 2), None)
+        if i % 50 == 0:
+            journal.flush()
+    ob.cancel_orders_in_range(Side.Buy, hi=Decimal("2"))
+    journal.close()
+    assert len(list_segments(str(tmp_path))) > 1
+
+    reader = JournalReader(str(tmp_path))
+    replayed = Orderbook("test")
+    assert reader.replay(lambda symbol: replayed) == journal.last_sequence
+    assert [(o.order_id, o.filled_qty, o.status) for o in replayed.in_order_buy_orders()] == [(o.order_id, o.filled_qty, o.status) for o in ob.in_order_buy_orders()]
+    assert [(o.order_id, o.filled_qty, o.status) for o in replayed.in_order_sell_orders()] == [(o.order_id, o.filled_qty, o.status) for o in ob.in_order_sell_orders()]
+
+    # seeking through the sparse index yields exactly the tail
+    for from_sequence in [1, 17, 100, 333, journal.last_sequence, journal.last_sequence + 1]:
+        assert [c.sequence for c in reader.read(from_sequence)] == list(range(from_sequence, journal.last_sequence + 1))
+    assert sum(len(batch) for batch in reader.read_batches(batch_size=100)) == journal.last_sequence
+
+
+def test_failing_listener_does_not_stop_group_commits(tmp_path):
+    journal = JournalWriter(str(tmp_path), fsync_policy=FsyncPolicy.Never, flush_interval=0.0005)
+    batches: List[int] = []
+
+    def failing_listener(first_sequence: int, last_sequence: int, batch: bytes):
+        raise ConnectionError("broken socket")
+
+    journal.add_listener(failing_listener)
+    journal.add_listener(lambda first_sequence, last_sequence, batch: batches.append(last_sequence))
+    ob = Orderbook("test", journal=journal)
+    for i in range(20):
+        ob.submit_order(create_order(Decimal("1"), Decimal("1"), Side.Buy))
+        deadline = time.monotonic() + 5
+        while journal.durable_sequence < journal.last_sequence:
+            assert time.monotonic() < deadline
+            time.sleep(0.001)
+    assert journal.listener_error_count > 0 and isinstance(journal.last_listener_error, ConnectionError)
+    assert batches[-1] == 20
+    journal.close()
+    assert [c.sequence for c in read_commands(str(tmp_path))] == list(range(1, 21))
+
+
+def test_flusher_failure_is_raised_to_the_submitter(tmp_path, monkeypatch):
+    journal = JournalWriter(str(tmp_path), fsync_policy=FsyncPolicy.Never, flush_interval=0.0005)
+
+    def failing_open_segment(first_sequence: int):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(journal, "_open_segment", failing_open_segment)
+    ob = Orderbook("test", journal=journal)
+    ob.submit_order(create_order(Decimal("1"), Decimal("1"), Side.Buy))
+    journal._flusher.join(timeout=5)
+    with pytest.raises(IOError):
+        ob.submit_order(create_order(Decimal("1"), Decimal("1"), Side.Buy))
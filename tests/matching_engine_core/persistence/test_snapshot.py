@@ -0,0 +1,119 @@
+from decimal import Decimal
+import os
+import random
+
+from helper import string_helper
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.side import Side
+from matching_engine_core.orderbook import Orderbook
+from matching_engine_core.persistence import snapshot
+from matching_engine_core.persistence.journal_writer import FsyncPolicy, JournalWriter
+
+
+def create_random_order(symbol: str) -> Order:
+    return Order(cl_ord_id=string_helper.generate_uuid(),
+                 order_id=string_helper.generate_uuid(),
+                 side=Side(random.randint(0, 1)),
+                 price=Decimal(random.randint(1, 20)) / 4,
+                 qty=Decimal(random.randint(1, 10)),
+                 symbol=symbol)
+
+
+def book_state(orderbook: Orderbook):
+    return ([(o.order_id, o.cl_ord_id, o.price, o.qty, o.filled_qty, o.status, o.timestamp) for o in orderbook.in_order_buy_orders()],
+            [(o.order_id, o.cl_ord_id, o.price, o.qty, o.filled_qty, o.status, o.timestamp) for o in orderbook.in_order_sell_orders()],
+            orderbook.trade_id_generator.value,
+            orderbook.sequence)
+
+
+def run_random_commands(orderbook: Orderbook, count: int):
+    for i in range(count):
+        order = create_random_order(orderbook.symbol)
+        orderbook.submit_order(order)
+        resting = list(orderbook.in_order_buy_orders())
+        if resting and random.randint(1, 5) == 1:
+            orderbook.cancel_order(random.choice(resting))
+        if resting and random.randint(1, 5) == 1:
+            orderbook.replace_order(random.choice(resting), Decimal(random.randint(1, 20)) / 4, None)
+
+
+def test_snapshot_round_trip():
+    orderbook = Orderbook("A")
+    run_random_commands(orderbook, 300)
+    last_sequence, orderbooks = snapshot.decode_snapshot(snapshot.encode_snapshot([orderbook, Orderbook("B")], 42))
+    assert last_sequence == 42
+    assert [o.symbol for o in orderbooks] == ["A", "B"]
+    assert book_state(orderbooks[0]) == book_state(orderbook)
+    assert orderbooks[0].trade_id_generator.prefix == orderbook.trade_id_generator.prefix
+
+
+def test_recover_from_snapshot_and_journal_tail(tmp_path):
+    journal_directory = str(tmp_path / "journal")
+    snapshot_directory = str(tmp_path / "snapshots")
+    journal = JournalWriter(journal_directory, fsync_policy=FsyncPolicy.Never, background=False)
+    books = {symbol: Orderbook(symbol, journal=journal) for symbol in ["A", "B"]}
+    for book in books.values():
+        run_random_commands(book, 200)
+    snapshot.write_journaled_snapshot(snapshot_directory, books.values(), journal)
+    snapshot_sequence = journal.last_sequence
+    for book in books.values():
+        run_random_commands(book, 200)
+    books["C"] = Orderbook("C", journal=journal)
+    run_random_commands(books["C"], 50)
+    journal.close()
+
+    last_sequence, recovered = snapshot.recover(snapshot_directory, journal_directory)
+    assert last_sequence == journal.last_sequence > snapshot_sequence
+    assert sorted(recovered) == ["A", "B", "C"]
+    for symbol, book in books.items():
+        assert book_state(recovered[symbol]) == book_state(book)
+
+
+def test_corrupt_snapshot_falls_back_to_older(tmp_path):
+    orderbook = Orderbook("A")
+    run_random_commands(orderbook, 50)
+    snapshot.write_snapshot(str(tmp_path), [orderbook], 10)
+    path = snapshot.write_snapshot(str(tmp_path), [orderbook], 20)
+    with open(path, "r+b") as f:
+        f.seek(os.path.getsize(path) // 2)
+        f.write(b"\xff\xff\xff")
+    last_sequence, orderbooks = snapshot.load_latest_snapshot(str(tmp_path))
+    assert last_sequence == 10
+    assert book_state(orderbooks[0]) == book_state(orderbook)
+    # a snapshot with a crossed book does not abort loading either
+    crossed = Orderbook("A")
+    buy = Order(cl_ord_id="1", order_id="1", side=Side.Buy, price=Decimal(5), qty=Decimal(1), symbol="A")
+    crossed.submit_order(buy)
+    crossed.submit_order(Order(cl_ord_id="2", order_id="2", side=Side.Sell, price=Decimal(6), qty=Decimal(1), symbol="A"))
+    buy.price = Decimal(7)
+    snapshot.write_snapshot(str(tmp_path), [crossed], 30)
+    assert snapshot.load_latest_snapshot(str(tmp_path))[0] == 10
+
+
+def test_restart_after_crash_never_reuses_snapshot_sequences(tmp_path):
+    journal_directory = str(tmp_path / "journal")
+    snapshot_directory = str(tmp_path / "snapshots")
+    journal = JournalWriter(journal_directory, fsync_policy=FsyncPolicy.Never, background=False)
+    book = Orderbook("A", journal=journal)
+    run_random_commands(book, 50)
+    snapshot.write_journaled_snapshot(snapshot_directory, [book], journal)
+    assert journal.durable_sequence == journal.last_sequence
+    # a snapshot tagged ahead of the journal on disk, then the process crashes before the journal is flushed
+    run_random_commands(book, 20)
+    snapshot.write_snapshot(snapshot_directory, [book], journal.last_sequence)
+    run_random_commands(book, 20)
+    snapshot_sequence = 0
+    for restart in range(2):
+        last_sequence, recovered = snapshot.recover(snapshot_directory, journal_directory)
+        if restart == 0:
+            snapshot_sequence = last_sequence
+        else:
+            # the commands of the first restart are recovered, none of them was skipped as already in the snapshot
+            assert last_sequence > snapshot_sequence
+            assert book_state(recovered["A"]) == book_state(book)
+        journal = JournalWriter(journal_directory, fsync_policy=FsyncPolicy.Never, background=False, start_sequence=last_sequence)
+        assert journal.last_sequence == last_sequence
+        book = recovered["A"]
+        book.journal = journal
+        run_random_commands(book, 20)
+        journal.close()
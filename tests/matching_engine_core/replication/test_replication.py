@@ -0,0 +1,121 @@
+from decimal import Decimal
+import random
+import socket
+import threading
+import time
+from typing import List
+
+from helper import string_helper
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.side import Side
+from matching_engine_core.orderbook import Orderbook
+from matching_engine_core.persistence import records, snapshot
+from matching_engine_core.persistence.journal_writer import FsyncPolicy, JournalWriter
+from matching_engine_core.replication.follower import ReplicationFollower
+from matching_engine_core.replication.primary import ReplicationPrimary
+from matching_engine_core.replication.protocol import MessageType, decode_sequence, receive_frame, send_frame
+
+
+def submit_random_orders(orderbook: Orderbook, count: int):
+    for i in range(count):
+        orderbook.submit_order(Order(cl_ord_id=string_helper.generate_uuid(),
+                                     order_id=string_helper.generate_uuid(),
+                                     side=Side(random.randint(0, 1)),
+                                     qty=Decimal(random.randint(1, 10)),
+                                     price=Decimal(random.randint(1, 20)),
+                                     symbol=orderbook.symbol))
+        resting = list(orderbook.in_order_sell_orders())
+        if resting and random.randint(1, 4) == 1:
+            orderbook.cancel_order(random.choice(resting))
+
+
+def book_state(orderbook: Orderbook):
+    return ([(o.order_id, o.filled_qty) for o in orderbook.in_order_buy_orders()],
+            [(o.order_id, o.filled_qty) for o in orderbook.in_order_sell_orders()],
+            orderbook.trade_id_generator.value,
+            orderbook.sequence)
+
+
+def wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_follower_streams_catches_up_and_reconnects(tmp_path):
+    journal = JournalWriter(str(tmp_path / "journal"), fsync_policy=FsyncPolicy.Never, flush_interval=0.001)
+    snapshot_directory = str(tmp_path / "snapshots")
+    primary_books = {symbol: Orderbook(symbol, journal=journal) for symbol in ["A", "B"]}
+    primary = ReplicationPrimary(journal, snapshot_directory)
+    try:
+        # history written before the follower exists is read from disk
+        submit_random_orders(primary_books["A"], 100)
+        follower = ReplicationFollower(primary.address)
+        follower.connect()
+        submit_random_orders(primary_books["B"], 100)
+        wait_until(lambda: follower.last_applied_sequence == journal.last_sequence)
+        wait_until(lambda: list(primary.lag().values()) == [0])
+        for symbol, book in primary_books.items():
+            assert book_state(follower.orderbooks[symbol]) == book_state(book)
+
+        # while disconnected the primary moves on and takes a snapshot, the follower resumes from the snapshot
+        follower.disconnect()
+        submit_random_orders(primary_books["A"], 100)
+        journal.flush()
+        snapshot.write_snapshot(snapshot_directory, primary_books.values(), journal.last_sequence)
+        submit_random_orders(primary_books["B"], 50)
+        follower.connect()
+        wait_until(lambda: follower.last_applied_sequence == journal.last_sequence)
+        for symbol, book in primary_books.items():
+            assert book_state(follower.orderbooks[symbol]) == book_state(book)
+        follower.disconnect()
+    finally:
+        primary.close()
+        journal.close()
+
+
+def serve_corrupt_stream(server: socket.socket, hellos: List[int], connections: int, heal: bool):
+    # every connection gets a record with a flipped bit, the resync connections get a snapshot instead when heal is set
+    order = Order(cl_ord_id="1", order_id="1", side=Side.Buy, qty=Decimal(1), price=Decimal(1), symbol="A")
+    book = Orderbook("A")
+    book.submit_order(Order(cl_ord_id="0", order_id="0", side=Side.Buy, qty=Decimal(1), price=Decimal(1), symbol="A"))
+    for i in range(connections):
+        sock, _ = server.accept()
+        hello = decode_sequence(receive_frame(sock)[1])
+        hellos.append(hello)
+        if heal and i > 0:
+            send_frame(sock, MessageType.Snapshot, snapshot.encode_snapshot([book], 5))
+            send_frame(sock, MessageType.Records, records.encode_submit(6, order))
+        else:
+            corrupted = bytearray(records.encode_submit(1, order))
+            corrupted[-1] ^= 0x01
+            send_frame(sock, MessageType.Records, bytes(corrupted))
+        try:
+            receive_frame(sock)
+        except (ConnectionError, OSError):
+            pass
+        sock.close()
+
+
+def test_follower_resyncs_from_snapshot_after_corrupt_records():
+    for heal in (True, False):
+        server = socket.create_server(("127.0.0.1", 0))
+        hellos: List[int] = []
+        connections = 2 if heal else 4
+        thread = threading.Thread(target=serve_corrupt_stream, args=(server, hellos, connections, heal), daemon=True)
+        thread.start()
+        follower = ReplicationFollower(server.getsockname(), max_resyncs=3)
+        follower.connect()
+        if heal:
+            wait_until(lambda: follower.last_applied_sequence == 6)
+            assert not follower.failed and follower.resync_count == 1
+            assert [o.order_id for o in follower.orderbooks["A"].in_order_buy_orders()] == ["0", "1"]
+            follower.disconnect()
+        else:
+            wait_until(lambda: not follower.connected)
+            assert follower.failed and isinstance(follower.error, records.CorruptRecordError)
+            assert follower.resync_count == 3
+        assert hellos == [0] * connections
+        thread.join(timeout=5)
+        server.close()
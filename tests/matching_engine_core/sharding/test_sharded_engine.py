@@ -0,0 +1,133 @@
+from decimal import Decimal
+import os
+import random
+from typing import List, Tuple
+
+from helper import string_helper
+from matching_engine_core.i_transaction_subscriber import ITransactionSubscriber
+from matching_engine_core.matching_engine import MatchingEngine
+from matching_engine_core.models.exec_type import ExecType
+from matching_engine_core.models.execution_report import ExecutionReport
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.order_status import OrderStatus
+from matching_engine_core.models.reject_codes import RejectCode
+from matching_engine_core.models.side import Side
+from matching_engine_core.models.trade import Trade
+from helper import cpu_affinity
+from helper.cpu_affinity import CpuPlacement
+from matching_engine_core.sharding import event_records
+from matching_engine_core.sharding.sharded_engine import ShardedMatchingEngine
+
+
+class RecordingSubscriber(ITransactionSubscriber):
+    def __init__(self):
+        self.events: List[Tuple] = []
+
+    def on_trade(self, trade: Trade):
+        self.events.append(("trade", trade.buy_order_id, trade.sell_order_id, trade.qty, trade.price, trade.trade_id))
+
+    def on_order_update(self, report: ExecutionReport):
+        self.events.append(("update", report.symbol, report))
+
+    def on_cancel_reject(self, order: Order, reject_code: RejectCode):
+        self.events.append(("cancel_reject", order.symbol, order.order_id, reject_code))
+
+    def on_replace_reject(self, order: Order, reject_code: RejectCode):
+        self.events.append(("replace_reject", order.symbol, order.order_id, reject_code))
+
+
+def create_commands(symbols: List[str], count: int) -> List[Tuple]:
+    commands = []
+    orders = []
+    for i in range(count):
+        roll = random.randint(1, 10)
+        if orders and roll == 1:
+            commands.append(("cancel", random.choice(orders)))
+        elif orders and roll == 2:
+            # replaced prices are unique, validation rejects of closed orders differ by design
+            commands.append(("replace", random.choice(orders), Decimal(random.randint(1, 20)) / 4 + Decimal(i) / 1000000))
+        else:
+            order = Order(cl_ord_id=string_helper.generate_uuid(),
+                          order_id=string_helper.generate_uuid(),
+                          side=Side(random.randint(0, 1)),
+                          price=Decimal(random.randint(1, 20)) / 4,
+                          qty=Decimal(random.randint(1, 10)),
+                          symbol=random.choice(symbols),
+                          timestamp=i)
+            orders.append(order)
+            commands.append(("submit", order))
+    return commands
+
+
+def run_commands(engine, commands: List[Tuple]):
+    # every engine gets its own copies of the orders since the engines update them in place
+    copies = dict()
+    for command in commands:
+        order = command[1]
+        if order.order_id not in copies:
+            copies[order.order_id] = Order(cl_ord_id=order.cl_ord_id, order_id=order.order_id, side=order.side, price=order.price,
+                                           qty=order.qty, symbol=order.symbol, timestamp=order.timestamp)
+        copy = copies[order.order_id]
+        if command[0] == "submit":
+            engine.submit_order(copy)
+        elif command[0] == "cancel":
+            engine.cancel_order(copy)
+        else:
+            engine.replace_order(copy, command[2], None)
+
+
+def events_by_symbol(events: List[Tuple], orders_by_id) -> dict:
+    result = dict()
+    for event in events:
+        symbol = event[1] if event[0] != "trade" else orders_by_id[event[1]]
+        result.setdefault(symbol, []).append(event)
+    return result
+
+
+def test_sharded_engine_matches_like_in_process_engine():
+    symbols = [f"SYM{i}" for i in range(8)]
+    commands = create_commands(symbols, 1500)
+    orders_by_id = {command[1].order_id: command[1].symbol for command in commands}
+
+    expected = RecordingSubscriber()
+    engine = MatchingEngine()
+    engine.subscribe(expected)
+    run_commands(engine, commands)
+
+    actual = RecordingSubscriber()
+    with ShardedMatchingEngine(worker_count=3, batch_size=16) as sharded:
+        sharded.subscribe(actual)
+        run_commands(sharded, commands)
+        sharded.drain()
+        assert sharded.in_flight == 0
+        assert len({sharded.shard_of(symbol) for symbol in symbols}) > 1
+
+    # events of a symbol arrive in the order they were produced, symbols interleave freely
+    assert events_by_symbol(actual.events, orders_by_id) == events_by_symbol(expected.events, orders_by_id)
+
+
+def test_event_records_round_trip():
+    report = ExecutionReport(order_id="o", cl_ord_id="c", symbol="A", side=Side.Buy, price=Decimal("1.25"), qty=Decimal(3),
+                             status=OrderStatus.PartiallyFilled, exec_type=ExecType.Trade, last_qty=Decimal("0.5"),
+                             last_px=Decimal("1.2"), cum_qty=Decimal("0.5"), leaves_qty=Decimal("2.5"), seq=3)
+    new_report = report._replace(exec_type=ExecType.New, last_qty=Decimal(0), last_px=None, seq=2)
+    trade = Trade(active_side=Side.Sell, buy_order_id="b", sell_order_id="s", qty=Decimal(2), price=Decimal("1.5"), trade_id="A-1")
+    buffer = (event_records.encode_order_update(new_report) + event_records.encode_order_update(report) +
+              event_records.encode_trade(4, "A", trade) +
+              event_records.encode_reject(4, event_records.EventType.CancelReject, "A", "x", RejectCode.OrderDoesNotExist))
+    new_update, update, trade_event, reject = event_records.decode_events(buffer)
+    assert new_update == event_records.OrderUpdateEvent(2, new_report)
+    assert update == event_records.OrderUpdateEvent(3, report)
+    assert trade_event == event_records.TradeEvent(4, "A", trade)
+    assert reject == event_records.RejectEvent(4, event_records.EventType.CancelReject, "A", "x", RejectCode.OrderDoesNotExist)
+
+
+def test_worker_placement_and_metrics():
+    cpu = cpu_affinity.current_cpus()[0]
+    with ShardedMatchingEngine(worker_count=2, worker_placements=[CpuPlacement(cpus=[cpu]), CpuPlacement()]) as sharded:
+        metrics = sharded.worker_metrics()
+    assert [m.shard for m in metrics] == [0, 1]
+    assert metrics[0].cpus == [cpu]
+    assert metrics[0].affinity_applied == hasattr(os, "sched_setaffinity")
+    assert not metrics[1].affinity_applied
+    assert metrics[0].pid != metrics[1].pid != os.getpid()
@@ -0,0 +1,132 @@
+from decimal import Decimal
+import threading
+from typing import List
+
+import pytest
+
+from matching_engine_core.async_dispatcher import AsyncDispatcher, OverflowPolicy
+from matching_engine_core.i_transaction_subscriber import ITransactionSubscriber
+from matching_engine_core.matching_engine import MatchingEngine
+from matching_engine_core.models.execution_report import ExecutionReport
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.order_status import OrderStatus
+from matching_engine_core.models.reject_codes import RejectCode
+from matching_engine_core.models.side import Side
+from matching_engine_core.models.trade import Trade
+from matching_engine_core.orderbook import Orderbook
+from matching_engine_core.sequencer import Sequencer
+
+
+class GatedSubscriber(ITransactionSubscriber):
+    # every callback waits until the gate is opened
+    def __init__(self):
+        self.gate = threading.Event()
+        self.updates: List[ExecutionReport] = []
+        self.trades: List[Trade] = []
+
+    def on_trade(self, trade: Trade):
+        self.gate.wait()
+        self.trades.append(trade)
+
+    def on_order_update(self, report: ExecutionReport):
+        self.gate.wait()
+        self.updates.append(report)
+
+    def on_cancel_reject(self, order: Order, reject_code: RejectCode):
+        self.gate.wait()
+
+    def on_replace_reject(self, order: Order, reject_code: RejectCode):
+        self.gate.wait()
+
+
+def create_order(order_id: str, side: Side, price: int, qty: int) -> Order:
+    return Order(cl_ord_id=order_id, order_id=order_id, side=side, price=Decimal(price), qty=Decimal(qty), symbol="A")
+
+
+def test_slow_subscriber_does_not_stall_matching():
+    dispatcher = AsyncDispatcher()
+    engine = MatchingEngine(dispatcher=dispatcher)
+    slow = GatedSubscriber()
+    fast = GatedSubscriber()
+    fast.gate.set()
+    dispatcher.subscribe(slow, capacity=4, overflow_policy=OverflowPolicy.DropOldest, name="slow")
+    dispatcher.subscribe(fast, capacity=4, overflow_policy=OverflowPolicy.Block, name="fast")
+    for i in range(50):
+        engine.submit_order(create_order(str(i), Side.Buy, 10, 1))
+    assert dispatcher.wait_idle(timeout=0.1) is False
+    slow_metrics, fast_metrics = dispatcher.metrics()
+    assert slow_metrics.dropped > 0
+    assert slow_metrics.lag > 0
+    slow.gate.set()
+    assert dispatcher.wait_idle(timeout=10)
+    slow_metrics, fast_metrics = dispatcher.metrics()
+    assert slow_metrics.lag == fast_metrics.lag == 0
+    assert slow_metrics.delivered + slow_metrics.dropped == 50
+    assert [o.order_id for o in fast.updates] == [str(i) for i in range(50)]
+    # the newest events survive dropping
+    assert slow.updates[-1].order_id == "49"
+    dispatcher.close()
+
+
+def test_events_are_snapshots_in_order():
+    dispatcher = AsyncDispatcher()
+    engine = MatchingEngine(dispatcher=dispatcher)
+    subscriber = GatedSubscriber()
+    subscriber.gate.set()
+    dispatcher.subscribe(subscriber, capacity=2)
+    sell = create_order("s", Side.Sell, 10, 2)
+    engine.submit_order(sell)
+    engine.submit_order(create_order("b1", Side.Buy, 10, 1))
+    engine.submit_order(create_order("b2", Side.Buy, 10, 1))
+    dispatcher.close()
+    assert [(o.order_id, o.status) for o in subscriber.updates if o.order_id == "s"] == [
+        ("s", OrderStatus.Open), ("s", OrderStatus.PartiallyFilled), ("s", OrderStatus.Filled)]
+    assert all(o is not sell for o in subscriber.updates)
+    assert len(subscriber.trades) == 2
+
+
+def test_conflate_keeps_newest_update_of_an_order():
+    dispatcher = AsyncDispatcher()
+    engine = MatchingEngine(dispatcher=dispatcher)
+    subscriber = GatedSubscriber()
+    dispatcher.subscribe(subscriber, capacity=100, overflow_policy=OverflowPolicy.Conflate)
+    # the first event is taken by the delivery thread, which waits on the gate with it
+    engine.submit_order(create_order("x", Side.Buy, 1, 1))
+    sell = create_order("s", Side.Sell, 10, 5)
+    engine.submit_order(sell)
+    for i in range(5):
+        engine.submit_order(create_order(f"b{i}", Side.Buy, 10, 1))
+    subscriber.gate.set()
+    assert dispatcher.wait_idle(timeout=10)
+    metrics = dispatcher.metrics()[0]
+    assert metrics.conflated > 0
+    assert metrics.lag == 0
+    sell_updates = [o for o in subscriber.updates if o.order_id == "s"]
+    assert sell_updates[-1].status == OrderStatus.Filled
+    assert len(subscriber.trades) == 5
+    dispatcher.close()
+
+
+def test_dispatcher_reads_the_events_of_the_sequencer():
+    sequencer = Sequencer(capacity=64)
+    dispatcher = AsyncDispatcher(sequencer)
+    engine = MatchingEngine(sequencer=sequencer, dispatcher=dispatcher)
+    subscriber = GatedSubscriber()
+    subscriber.gate.set()
+    dispatcher.subscribe(subscriber, capacity=2)
+    engine.submit_order(create_order("s", Side.Sell, 10, 2))
+    engine.submit_order(create_order("b1", Side.Buy, 10, 1))
+    engine.cancel_order(create_order("x", Side.Buy, 10, 1))
+    events = sequencer.reader(from_sequence=1).poll()
+    assert dispatcher.wait_idle(timeout=10)
+    # the reports are the sequencer's, the orderbook only fans out to the sequencer
+    assert all(any(update is e.payload for e in events) for update in subscriber.updates)
+    assert len(subscriber.updates) == 4 and len(subscriber.trades) == 1
+    assert dispatcher.sequence == sequencer.sequence == len(events)
+    assert dispatcher.metrics()[0].lag == 0
+    assert len(engine.get_orderbook("A")._batch_subs) == 1
+    with pytest.raises(ValueError):
+        dispatcher.attach(Orderbook("B"))
+    with pytest.raises(ValueError):
+        MatchingEngine(sequencer=Sequencer(), dispatcher=dispatcher)
+    dispatcher.close()
@@ -0,0 +1,95 @@
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import pytest
+
+from matching_engine_core.i_transaction_subscriber import ITransactionSubscriber
+from matching_engine_core.matching_engine import MatchingEngine
+from matching_engine_core.models.event_type import EventType
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.order_status import OrderStatus
+from matching_engine_core.models.reject_codes import RejectCode
+from matching_engine_core.models.side import Side
+from matching_engine_core.orderbook import Orderbook
+from matching_engine_core.sequencer import Sequencer
+
+
+def create_order(engine: MatchingEngine, symbol: str, side: Side, price: str, qty: str) -> Order:
+    order_id = engine.next_order_id()
+    return Order(cl_ord_id=order_id, order_id=order_id, side=side, price=Decimal(price), qty=Decimal(qty), symbol=symbol)
+
+
+def test_routes_by_symbol_and_creates_books_lazily():
+    engine = MatchingEngine()
+    assert engine.symbols == []
+    buy = create_order(engine, "A", Side.Buy, "10", "5")
+    engine.submit_order(buy)
+    engine.submit_order(create_order(engine, "B", Side.Sell, "10", "5"))
+    assert engine.symbols == ["A", "B"]
+    # same price on another symbol does not cross
+    assert buy.status == OrderStatus.Open
+    assert engine.get_order("A", buy.order_id) is buy
+    assert engine.get_order("B", buy.order_id) is None
+    assert engine.get_order("C", buy.order_id) is None
+    assert engine.find_orderbook("C") is None
+
+    engine.submit_order(create_order(engine, "A", Side.Sell, "10", "2"))
+    assert buy.filled_qty == Decimal(2)
+    engine.replace_order(buy, Decimal(11), None)
+    assert engine.get_orderbook("A").best_bid == Decimal(11)
+    engine.cancel_order(buy)
+    assert engine.cancel_orders_in_range("B", Side.Sell) == 1
+
+    metrics = engine.metrics()
+    assert metrics.book_count == 2
+    assert metrics.resting_order_count == 0
+    assert metrics.trade_count == 1
+    assert (metrics.submit_count, metrics.cancel_count, metrics.replace_count, metrics.mass_cancel_count) == (3, 1, 1, 1)
+
+
+def test_subscribers_and_sequencer_are_shared():
+    sequencer = Sequencer(capacity=64)
+    engine = MatchingEngine(sequencer=sequencer)
+    early = MagicMock(spec=ITransactionSubscriber)
+    engine.subscribe(early)
+    engine.submit_order(create_order(engine, "A", Side.Buy, "10", "5"))
+    late = MagicMock(spec=ITransactionSubscriber)
+    engine.subscribe(late)
+    engine.submit_order(create_order(engine, "B", Side.Buy, "10", "5"))
+    engine.submit_order(create_order(engine, "A", Side.Buy, "10", "5"))
+    assert early.on_order_update.call_count == 3
+    assert late.on_order_update.call_count == 2
+    events = sequencer.reader(from_sequence=1).poll()
+    assert [(e.symbol, e.book_sequence) for e in events] == [("A", 1), ("B", 1), ("A", 2)]
+
+
+def test_subscription_filters_apply_to_future_orderbooks():
+    engine = MatchingEngine()
+    trades_only = MagicMock(spec=ITransactionSubscriber)
+    engine.subscribe(trades_only, event_types=[EventType.Trade])
+    engine.submit_order(create_order(engine, "A", Side.Buy, "10", "5"))
+    engine.submit_order(create_order(engine, "A", Side.Sell, "10", "5"))
+    assert trades_only.on_trade.call_count == 1
+    assert trades_only.on_order_update.call_count == 0
+
+
+def test_commands_of_unknown_symbols_do_not_create_orderbooks():
+    engine = MatchingEngine()
+    subscriber = MagicMock(spec=ITransactionSubscriber)
+    engine.subscribe(subscriber)
+    order = create_order(engine, "X", Side.Buy, "10", "5")
+    engine.cancel_order(order)
+    engine.replace_order(order, Decimal(11), None)
+    assert engine.cancel_orders_in_range("X", Side.Buy) == 0
+    assert engine.symbols == []
+    subscriber.on_cancel_reject.assert_called_once_with(order, RejectCode.OrderDoesNotExist)
+    subscriber.on_replace_reject.assert_called_once_with(order, RejectCode.OrderDoesNotExist)
+
+
+def test_add_existing_orderbook():
+    engine = MatchingEngine()
+    orderbook = Orderbook("A")
+    engine.add_orderbook(orderbook)
+    assert engine.get_orderbook("A") is orderbook
+    with pytest.raises(ValueError):
+        engine.add_orderbook(Orderbook("A"))
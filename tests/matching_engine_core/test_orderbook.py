@@ -5,11 +5,15 @@ import random
 from typing import Dict, List, Optional, Set, Tuple
 from unittest.mock import MagicMock
 from helper import bk_decimal, string_helper
-from matching_engine_core.i_transaction_subscriber import ITransactionSubscriber
+from matching_engine_core.i_transaction_subscriber import BookEvent, ITransactionSubscriber
+from matching_engine_core.models.event_type import EventType
+from matching_engine_core.models.exec_type import ExecType
+from matching_engine_core.models.execution_report import ExecutionReport
 from matching_engine_core.models.order import Order
 from matching_engine_core.models.order_status import OrderStatus
 from matching_engine_core.models.reject_codes import RejectCode
 from matching_engine_core.models.side import Side
+from matching_engine_core.models.time_in_force import TimeInForce
 from matching_engine_core.models.trade import Trade
 from matching_engine_core.orderbook import Orderbook
 
@@ -54,20 +58,19 @@ class MockTransSubscriber(ITransactionSubscriber):
     def __init__(self):
         super().__init__()
         self.trades: List[Trade] = []
-        self.order_updates: Dict[str, List[Order]] = dict()
+        self.order_updates: Dict[str, List[ExecutionReport]] = dict()
         self.cancel_rejects: Dict[str, List[RejectModel]] = dict()
         self.replace_rejects: Dict[str, List[RejectModel]] = dict()
         
     def on_trade(self, trade: Trade):
         self.trades.append(trade)
         
-    def on_order_update(self, order: Order):
-        order_copy = copy.deepcopy(order)
-        related_order_updates = self.order_updates.get(order_copy.order_id)
+    def on_order_update(self, report: ExecutionReport):
+        related_order_updates = self.order_updates.get(report.order_id)
         if related_order_updates is None:
             related_order_updates = list()
-            self.order_updates[order_copy.order_id] = related_order_updates
-        related_order_updates.append(order_copy)
+            self.order_updates[report.order_id] = related_order_updates
+        related_order_updates.append(report)
         
     def on_cancel_reject(self, order: Order, reject_code: RejectCode):
         order_copy = copy.deepcopy(order)
@@ -1042,3 +1045,336 @@ def test_random_replace():
         assert order_update_counts_by_status[OrderStatus.Filled] == initial_buy_order_count + initial_sell_order_count - len(buy_orders) - len(sell_orders)
     assert order_update_counts_by_status.get(OrderStatus.Canceled) is None
                     
+
+def submit_tif_order(ob: Orderbook, price: Decimal, qty: Decimal, side: Side, time_in_force: TimeInForce):
+    order = create_order(price, qty, side)
+    order.time_in_force = time_in_force
+    ob.submit_order(order)
+    return order
+
+def test_ioc_partial_fill_cancels_remaining():
+    ob = Orderbook("test")
+    subscriber = MockTransSubscriber()
+    ob.subscribe(subscriber)
+    so = submit_order(ob, price=Decimal("5"), qty=Decimal("3"), side=Side.Sell)
+    bo = submit_tif_order(ob, price=Decimal("6"), qty=Decimal("5"), side=Side.Buy, time_in_force=TimeInForce.ImmediateOrCancel)
+    assert len(subscriber.trades) == 1
+    assert subscriber.trades[0].qty == Decimal("3")
+    assert so.status == OrderStatus.Filled
+    assert bo.status == OrderStatus.Canceled
+    assert bo.filled_qty == Decimal("3")
+    assert [u.status for u in subscriber.order_updates[bo.order_id]] == [OrderStatus.Open, OrderStatus.PartiallyFilled, OrderStatus.Canceled]
+    assert_orders_length(ob, 0, 0)
+    assert ob.best_bid is None
+    
+def test_ioc_without_match_does_not_rest():
+    ob = Orderbook("test")
+    subscriber = MockTransSubscriber()
+    ob.subscribe(subscriber)
+    submit_order(ob, price=Decimal("5"), qty=Decimal("3"), side=Side.Buy)
+    so = submit_tif_order(ob, price=Decimal("6"), qty=Decimal("3"), side=Side.Sell, time_in_force=TimeInForce.ImmediateOrCancel)
+    assert len(subscriber.trades) == 0
+    assert so.status == OrderStatus.Canceled
+    assert_orders_length(ob, 1, 0)
+    assert ob.best_ask is None
+    
+def test_fok_rejected_without_partial_state():
+    ob = Orderbook("test")
+    subscriber = MockTransSubscriber()
+    ob.subscribe(subscriber)
+    so1 = submit_order(ob, price=Decimal("5"), qty=Decimal("3"), side=Side.Sell)
+    so2 = submit_order(ob, price=Decimal("7"), qty=Decimal("3"), side=Side.Sell)
+    bo = submit_tif_order(ob, price=Decimal("6"), qty=Decimal("4"), side=Side.Buy, time_in_force=TimeInForce.FillOrKill)
+    assert bo.status == OrderStatus.Rejected
+    assert len(subscriber.trades) == 0
+    assert [u.status for u in subscriber.order_updates[bo.order_id]] == [OrderStatus.Rejected]
+    assert so1.status == OrderStatus.Open and so1.filled_qty == Decimal("0")
+    assert so2.status == OrderStatus.Open
+    assert_orders_length(ob, 0, 2)
+    
+def test_fok_fills_across_levels():
+    ob = Orderbook("test")
+    subscriber = MockTransSubscriber()
+    ob.subscribe(subscriber)
+    bo1 = submit_order(ob, price=Decimal("7"), qty=Decimal("3"), side=Side.Buy)
+    bo2 = submit_order(ob, price=Decimal("6"), qty=Decimal("3"), side=Side.Buy)
+    so = submit_tif_order(ob, price=Decimal("6"), qty=Decimal("5"), side=Side.Sell, time_in_force=TimeInForce.FillOrKill)
+    assert so.status == OrderStatus.Filled
+    assert len(subscriber.trades) == 2
+    assert bo1.status == OrderStatus.Filled
+    assert bo2.status == OrderStatus.PartiallyFilled
+    assert_orders_length(ob, 1, 0)
+
+def test_execution_reports():
+    ob = Orderbook("test")
+    subscriber = MockTransSubscriber()
+    ob.subscribe(subscriber)
+    so = submit_order(ob, price=Decimal("5"), qty=Decimal("3"), side=Side.Sell)
+    bo = submit_order(ob, price=Decimal("6"), qty=Decimal("2"), side=Side.Buy)
+    ob.replace_order(so, new_price=Decimal("4"), new_qty=None)
+    ob.cancel_order(so)
+    sell_reports = subscriber.order_updates[so.order_id]
+    buy_reports = subscriber.order_updates[bo.order_id]
+    assert [r.exec_type for r in sell_reports] == [ExecType.New, ExecType.Trade, ExecType.Replaced, ExecType.Canceled]
+    assert [r.exec_type for r in buy_reports] == [ExecType.New, ExecType.Trade]
+    fill = sell_reports[1]
+    assert (fill.last_qty, fill.last_px, fill.cum_qty, fill.leaves_qty) == (Decimal("2"), Decimal("5"), Decimal("2"), Decimal("1"))
+    assert sell_reports[0].last_px is None and sell_reports[0].leaves_qty == Decimal("3")
+    assert sell_reports[2].price == Decimal("4")
+    assert sell_reports[3].status == OrderStatus.Canceled and sell_reports[3].leaves_qty == Decimal("0")
+    assert buy_reports[1].status == OrderStatus.Filled and buy_reports[1].cl_ord_id == bo.cl_ord_id
+    # reports are snapshots, later events do not change the ones already delivered
+    assert sell_reports[1].status == OrderStatus.PartiallyFilled
+    assert sorted(r.seq for r in sell_reports + buy_reports) == [1, 2, 3, 4, 6, 7]
+    assert ob.sequence == 7
+    
+class BatchSubscriber(MockTransSubscriber):
+    def __init__(self):
+        super().__init__()
+        self.batches: List[List[BookEvent]] = []
+        
+    def on_events(self, events: List[BookEvent]):
+        self.batches.append(events)
+        super().on_events(events)
+        
+def test_on_events_once_per_command():
+    ob = Orderbook("test")
+    per_event = MockTransSubscriber()
+    batched = BatchSubscriber()
+    ob.subscribe(per_event)
+    ob.subscribe(batched)
+    so1 = submit_order(ob, price=Decimal("5"), qty=Decimal("1"), side=Side.Sell)
+    so2 = submit_order(ob, price=Decimal("6"), qty=Decimal("1"), side=Side.Sell)
+    submit_order(ob, price=Decimal("6"), qty=Decimal("3"), side=Side.Buy)
+    ob.cancel_order(so1)
+    ob.replace_order(so2, new_price=Decimal("7"), new_qty=None)
+    assert [len(batch) for batch in batched.batches] == [1, 1, 7]
+    sweep = batched.batches[2]
+    assert [type(event) for event in sweep] == [ExecutionReport] * 3 + [Trade] + [ExecutionReport] * 2 + [Trade]
+    assert sweep[-2].seq == ob.sequence - 1
+    # the default on_events dispatches to the per event methods in publish order
+    assert batched.trades == per_event.trades
+    assert batched.order_updates == per_event.order_updates
+    assert batched.cancel_rejects[so1.order_id][0].reject_code == RejectCode.OrderDoesNotExist
+    assert batched.replace_rejects[so2.order_id][0].reject_code == RejectCode.OrderDoesNotExist
+    
+class RaisingSubscriber(MockTransSubscriber):
+    def on_events(self, events: List[BookEvent]):
+        raise ValueError("batch subscriber failure")
+        
+def test_events_are_not_redelivered_after_a_subscriber_raises():
+    ob = Orderbook("test")
+    batched = BatchSubscriber()
+    failing = MagicMock(spec=ITransactionSubscriber)
+    failing.on_order_update.side_effect = ValueError("per event subscriber failure")
+    ob.subscribe(batched)
+    ob.subscribe(failing)
+    ob.subscribe(RaisingSubscriber())
+    for i in range(2):
+        try:
+            submit_order(ob, price=Decimal("5"), qty=Decimal("1"), side=Side.Sell)
+            assert False
+        except ValueError:
+            pass
+    # each command delivers its own events once, even though a subscriber raised in the middle of it
+    assert [len(batch) for batch in batched.batches] == [1, 1]
+    assert batched.batches[0][0].order_id != batched.batches[1][0].order_id
+    
+def test_subscription_filters():
+    ob = Orderbook("test")
+    trades_only = MockTransSubscriber()
+    first_order_only = MockTransSubscriber()
+    rejects_only = MockTransSubscriber()
+    updates_batched = BatchSubscriber()
+    so1 = create_order(price=Decimal("5"), qty=Decimal("1"), side=Side.Sell)
+    so2 = create_order(price=Decimal("5"), qty=Decimal("1"), side=Side.Sell)
+    ob.subscribe(trades_only, event_types=[EventType.Trade])
+    ob.subscribe(first_order_only, order_ids=[so1.order_id])
+    ob.subscribe(rejects_only, event_types=[EventType.CancelReject, EventType.ReplaceReject])
+    ob.subscribe(updates_batched, event_types=[EventType.OrderUpdate, EventType.CancelReject], order_ids=[so2.order_id])
+    ob.submit_order(so1)
+    ob.submit_order(so2)
+    bo = submit_order(ob, price=Decimal("5"), qty=Decimal("2"), side=Side.Buy)
+    ob.cancel_order(so1)
+    ob.cancel_order(so2)
+    assert len(trades_only.trades) == 2 and not trades_only.order_updates and not trades_only.cancel_rejects
+    assert [t.sell_order_id for t in first_order_only.trades] == [so1.order_id]
+    assert list(first_order_only.order_updates) == [so1.order_id]
+    assert list(first_order_only.cancel_rejects) == [so1.order_id]
+    assert not rejects_only.trades and not rejects_only.order_updates
+    assert set(rejects_only.cancel_rejects) == {so1.order_id, so2.order_id}
+    assert [[r.exec_type for r in batch] for batch in updates_batched.batches] == [[ExecType.New], [ExecType.Trade]]
+    assert list(updates_batched.order_updates) == [so2.order_id] and not updates_batched.trades
+    assert list(updates_batched.cancel_rejects) == [so2.order_id]
+    assert bo.status == OrderStatus.Filled
+    
+def test_unobserved_order_updates_still_advance_the_sequence():
+    quiet = Orderbook("test")
+    observed = Orderbook("test")
+    subscriber = MockTransSubscriber()
+    observed.subscribe(subscriber)
+    for i in range(300):
+        order = create_random_order()
+        quiet.submit_order(copy.copy(order))
+        observed.submit_order(order)
+    assert quiet.sequence == observed.sequence == len(subscriber.trades) + sum(map(len, subscriber.order_updates.values()))
+    snapshot = quiet.snapshot()
+    quiet.cancel_order(next(quiet.in_order_buy_orders()))
+    assert quiet.snapshot() is not snapshot
+    
+def test_estimate_fill_walks_levels_without_mutation():
+    ob = Orderbook("test")
+    so1 = submit_order(ob, price=Decimal("5"), qty=Decimal("2"), side=Side.Sell)
+    submit_order(ob, price=Decimal("5"), qty=Decimal("1"), side=Side.Sell)
+    submit_order(ob, price=Decimal("6"), qty=Decimal("4"), side=Side.Sell)
+    submit_order(ob, price=Decimal("8"), qty=Decimal("4"), side=Side.Sell)
+    estimate = ob.estimate_fill(Side.Buy, Decimal("5"))
+    assert estimate.filled_qty == Decimal("5")
+    assert estimate.avg_price == (Decimal("3") * 5 + Decimal("2") * 6) / 5
+    assert estimate.worst_price == Decimal("6")
+    assert estimate.levels_consumed == 2
+    assert estimate.is_complete
+    limited = ob.estimate_fill(Side.Buy, Decimal("20"), limit=Decimal("6"))
+    assert limited.filled_qty == Decimal("7")
+    assert limited.levels_consumed == 2
+    assert not limited.is_complete
+    assert so1.filled_qty == Decimal("0")
+    assert_orders_length(ob, 0, 4)
+    empty = ob.estimate_fill(Side.Sell, Decimal("1"))
+    assert empty.filled_qty == Decimal("0")
+    assert empty.avg_price is None
+    assert empty.worst_price is None
+    
+def test_level_aggregates_follow_random_operations():
+    ob = Orderbook("test")
+    orders: List[Order] = []
+    for i in range(500):
+        if orders and random.randint(1, 4) == 1:
+            order = random.choice(orders)
+            ob.cancel_order(order)
+        else:
+            order = create_random_order()
+            ob.submit_order(order)
+        orders.append(order)
+        for levels in (ob._buy_levels, ob._sell_levels):
+            for price, level in levels.in_order():
+                assert level.total_qty == sum((o.open_qty for o_id, o in level.traverse()), Decimal("0"))
+                assert level.order_count == len(list(level.traverse()))
+    
+def test_level_counts_and_top_levels():
+    ob = Orderbook("test")
+    for price in ["3", "1", "2", "2", "5"]:
+        submit_order(ob, price=Decimal(price), qty=Decimal("2"), side=Side.Buy)
+    for price in ["7", "9", "8", "8"]:
+        submit_order(ob, price=Decimal(price), qty=Decimal("1"), side=Side.Sell)
+    assert ob.buy_level_count == 4
+    assert ob.sell_level_count == 3
+    assert ob.top_levels(Side.Buy, 2) == [(Decimal("5"), Decimal("2")), (Decimal("3"), Decimal("2"))]
+    assert ob.top_levels(Side.Sell, 10) == [(Decimal("7"), Decimal("1")), (Decimal("8"), Decimal("2")), (Decimal("9"), Decimal("1"))]
+    submit_order(ob, price=Decimal("7"), qty=Decimal("1"), side=Side.Buy)
+    assert ob.sell_level_count == 2
+    
+def test_cancel_orders_in_range():
+    ob = Orderbook("test")
+    subscriber = MockTransSubscriber()
+    ob.subscribe(subscriber)
+    orders = [submit_order(ob, price=Decimal(price), qty=Decimal("1"), side=Side.Sell) for price in ["5", "6", "6", "7", "9"]]
+    assert ob.cancel_orders_in_range(Side.Sell, lo=Decimal("6"), hi=Decimal("8")) == 3
+    assert [o.status for o in orders] == [OrderStatus.Open, OrderStatus.Canceled, OrderStatus.Canceled, OrderStatus.Canceled, OrderStatus.Open]
+    assert subscriber.order_updates[orders[1].order_id][-1].status == OrderStatus.Canceled
+    assert [o.price for o in ob.in_order_sell_orders()] == [Decimal("5"), Decimal("9")]
+    assert ob.cancel_orders_in_range(Side.Buy) == 0
+    assert ob.cancel_orders_in_range(Side.Sell) == 2
+    assert ob.best_ask is None
+    
+def test_load_snapshot():
+    source = Orderbook("test")
+    for i in range(300):
+        source.submit_order(create_random_order())
+    snapshot_orders = [copy.copy(o) for o in list(source.in_order_sell_orders()) + list(source.in_order_buy_orders())]
+    ob = Orderbook("test")
+    ob.load_snapshot(snapshot_orders)
+    assert [o.order_id for o in ob.in_order_buy_orders()] == [o.order_id for o in source.in_order_buy_orders()]
+    assert [o.order_id for o in ob.in_order_sell_orders()] == [o.order_id for o in source.in_order_sell_orders()]
+    assert ob.best_bid == source.best_bid
+    assert ob.best_ask == source.best_ask
+    assert ob.top_levels(Side.Buy, 5) == source.top_levels(Side.Buy, 5)
+    subscriber = MockTransSubscriber()
+    ob.subscribe(subscriber)
+    for i in range(100):
+        ob.submit_order(create_random_order())
+    assert ob.buy_level_count + ob.sell_level_count > 0
+    try:
+        ob.load_snapshot(snapshot_orders)
+        assert False
+    except ValueError:
+        pass
+    crossed = [create_order(Decimal("5"), Decimal("1"), Side.Buy), create_order(Decimal("5"), Decimal("1"), Side.Sell)]
+    empty = Orderbook("test")
+    try:
+        empty.load_snapshot(crossed)
+        assert False
+    except ValueError:
+        pass
+    assert empty.resting_order_count == 0 and crossed[0].status == OrderStatus.PendingNew
+
+def order_states(orders) -> List[Tuple]:
+    return [(o.order_id, o.price, o.qty, o.filled_qty, o.status) for o in orders]
+    
+def test_snapshot_is_unaffected_by_matching():
+    ob = Orderbook("test")
+    for i in range(300):
+        ob.submit_order(create_random_order())
+    snapshot = ob.snapshot()
+    assert ob.snapshot() is snapshot
+    expected_buys = order_states(ob.in_order_buy_orders())
+    expected_sells = order_states(ob.in_order_sell_orders())
+    assert order_states(snapshot.in_order_buy_orders()) == expected_buys
+    assert order_states(snapshot.in_order_sell_orders()) == expected_sells
+    assert snapshot.top_levels(Side.Buy, 5) == ob.top_levels(Side.Buy, 5)
+    assert (snapshot.best_bid, snapshot.best_ask) == (ob.best_bid, ob.best_ask)
+    assert snapshot.resting_order_count == ob.resting_order_count
+    # matching goes on while the snapshot is read
+    iterator = snapshot.in_order_buy_orders()
+    read = [next(iterator)]
+    for i in range(300):
+        ob.submit_order(create_random_order())
+    read.extend(iterator)
+    assert order_states(read) == expected_buys
+    assert order_states(snapshot.in_order_sell_orders()) == expected_sells
+    assert ob.snapshot().sequence == ob.sequence > snapshot.sequence
+    
+def test_snapshot_copies_only_changed_levels():
+    ob = Orderbook("test")
+    for price in range(1, 6):
+        ob.submit_order(Order("", f"b{price}", Side.Buy, Decimal("10"), Decimal(price), "test"))
+    first = ob.snapshot()
+    ob.submit_order(Order("", "s1", Side.Sell, Decimal("4"), Decimal("5"), "test"))
+    second = ob.snapshot()
+    assert second.bids[0].total_qty == Decimal("6") and first.bids[0].total_qty == Decimal("10")
+    assert first.bids[0].orders[0].filled_qty == Decimal("0")
+    assert all(a is b for a, b in zip(first.bids[1:], second.bids[1:]))
+    
+def test_fork_is_independent():
+    ob = Orderbook("test")
+    subscriber = MockTransSubscriber()
+    ob.subscribe(subscriber)
+    for i in range(300):
+        ob.submit_order(create_random_order())
+    expected = order_states(ob.in_order_buy_orders()) + order_states(ob.in_order_sell_orders())
+    update_count = len(subscriber.order_updates)
+    fork = ob.fork()
+    assert fork.sequence == ob.sequence
+    assert order_states(fork.in_order_buy_orders()) + order_states(fork.in_order_sell_orders()) == expected
+    for i in range(300):
+        fork.submit_order(create_random_order())
+    fork.cancel_orders_in_range(Side.Buy)
+    assert order_states(ob.in_order_buy_orders()) + order_states(ob.in_order_sell_orders()) == expected
+    assert len(subscriber.order_updates) == update_count
+    # the fork matches the same way as the original
+    order = create_random_order()
+    other = ob.fork()
+    ob.submit_order(copy.copy(order))
+    other.submit_order(copy.copy(order))
+    assert order_states(ob.in_order_buy_orders()) == order_states(other.in_order_buy_orders())
+    assert order_states(ob.in_order_sell_orders()) == order_states(other.in_order_sell_orders())
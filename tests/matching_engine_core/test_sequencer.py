@@ -0,0 +1,120 @@
+from decimal import Decimal
+import random
+
+from typing import List
+
+from helper import string_helper
+from matching_engine_core.i_transaction_subscriber import BookEvent, ITransactionSubscriber
+from matching_engine_core.models.event_type import EventType
+from matching_engine_core.models.execution_report import ExecutionReport
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.order_status import OrderStatus
+from matching_engine_core.models.reject_codes import RejectCode
+from matching_engine_core.models.side import Side
+from matching_engine_core.models.trade import Trade
+from matching_engine_core.orderbook import Orderbook
+from matching_engine_core.sequencer import Sequencer
+
+
+def create_random_order(symbol: str) -> Order:
+    return Order(cl_ord_id=string_helper.generate_uuid(),
+                 order_id=string_helper.generate_uuid(),
+                 side=Side(random.randint(0, 1)),
+                 price=Decimal(random.randint(1, 20)) / 4,
+                 qty=Decimal(random.randint(1, 10)),
+                 symbol=symbol)
+
+
+def test_global_and_book_sequences_are_gapless():
+    sequencer = Sequencer(capacity=1024)
+    books = [Orderbook("A"), Orderbook("B")]
+    for book in books:
+        sequencer.attach(book)
+    reader = sequencer.reader()
+    for i in range(300):
+        book = random.choice(books)
+        book.submit_order(create_random_order(book.symbol))
+    events = []
+    while reader.available:
+        events.extend(reader.poll())
+
+    assert [e.sequence for e in events] == list(range(1, sequencer.sequence + 1))
+    for book in books:
+        book_sequences = [e.book_sequence for e in events if e.symbol == book.symbol]
+        assert book_sequences == list(range(1, book.sequence + 1))
+
+
+def test_order_payload_is_a_copy_of_the_event_state():
+    sequencer = Sequencer(capacity=16)
+    book = Orderbook("A")
+    sequencer.attach(book)
+    reader = sequencer.reader()
+    sell = Order(cl_ord_id="s", order_id="s", side=Side.Sell, price=Decimal(1), qty=Decimal(2), symbol="A")
+    book.submit_order(sell)
+    book.submit_order(Order(cl_ord_id="b", order_id="b", side=Side.Buy, price=Decimal(1), qty=Decimal(2), symbol="A"))
+    events = reader.poll()
+    assert [e.event_type for e in events] == [EventType.OrderUpdate, EventType.OrderUpdate, EventType.OrderUpdate,
+                                              EventType.OrderUpdate, EventType.Trade]
+    assert events[0].payload is not sell
+    assert events[0].payload.status == OrderStatus.Open
+    assert sell.status == OrderStatus.Filled
+
+
+def test_rejects_do_not_advance_book_sequence():
+    sequencer = Sequencer(capacity=16)
+    book = Orderbook("A")
+    sequencer.attach(book)
+    reader = sequencer.reader()
+    book.cancel_order(create_random_order("A"))
+    events = reader.poll()
+    assert len(events) == 1
+    assert events[0].event_type == EventType.CancelReject
+    assert events[0].reject_code == RejectCode.OrderDoesNotExist
+    assert events[0].book_sequence == book.sequence == 0
+
+
+class RecordingSubscriber(ITransactionSubscriber):
+    def __init__(self):
+        self.batches: List[List[BookEvent]] = []
+        self.rejects: List[RejectCode] = []
+
+    def on_trade(self, trade: Trade):
+        pass
+
+    def on_order_update(self, report: ExecutionReport):
+        pass
+
+    def on_cancel_reject(self, order: Order, reject_code: RejectCode):
+        self.rejects.append(reject_code)
+
+    def on_replace_reject(self, order: Order, reject_code: RejectCode):
+        self.rejects.append(reject_code)
+
+    def on_events(self, events: List[BookEvent]):
+        self.batches.append(events)
+
+
+def test_ring_subscribers_get_the_batches_of_the_orderbook():
+    sequencer = Sequencer(capacity=256)
+    books = [Orderbook("A"), Orderbook("B")]
+    for book in books:
+        sequencer.attach(book)
+    direct = RecordingSubscriber()
+    books[0].subscribe(direct, event_types=[EventType.OrderUpdate])
+    from_ring = RecordingSubscriber()
+    sequencer.subscribe(from_ring, event_types=[EventType.OrderUpdate], symbols=["A"])
+    everything = RecordingSubscriber()
+    sequencer.subscribe(everything)
+    reader = sequencer.reader()
+    for i in range(300):
+        book = random.choice(books)
+        book.submit_order(create_random_order(book.symbol))
+        events = reader.poll()
+        assert events[-1].last_in_command and not any(e.last_in_command for e in events[:-1])
+    books[0].cancel_order(create_random_order("A"))
+    books[1].cancel_order(create_random_order("B"))
+
+    assert from_ring.batches == direct.batches
+    assert from_ring.rejects == direct.rejects == []
+    assert len(everything.batches) == 300
+    assert everything.rejects == [RejectCode.OrderDoesNotExist, RejectCode.OrderDoesNotExist]
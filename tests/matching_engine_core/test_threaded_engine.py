@@ -0,0 +1,118 @@
+from decimal import Decimal
+import random
+import threading
+from typing import Dict, List, Set, Tuple
+
+import pytest
+
+from helper import string_helper
+from matching_engine_core.i_transaction_subscriber import ITransactionSubscriber
+from matching_engine_core.matching_engine import MatchingEngine
+from matching_engine_core.models.execution_report import ExecutionReport
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.reject_codes import RejectCode
+from matching_engine_core.models.side import Side
+from matching_engine_core.models.trade import Trade
+from matching_engine_core.threaded_engine import ThreadedMatchingEngine, is_gil_enabled
+
+
+class RecordingSubscriber(ITransactionSubscriber):
+    # events are recorded per symbol together with the thread that published them
+    def __init__(self, symbol_of_order: Dict[str, str]):
+        self.symbol_of_order = symbol_of_order
+        self.events: Dict[str, List[Tuple]] = dict()
+        self.threads: Dict[str, Set[int]] = dict()
+        self._lock = threading.Lock()
+
+    def _record(self, symbol: str, event: Tuple):
+        with self._lock:
+            self.events.setdefault(symbol, []).append(event)
+            self.threads.setdefault(symbol, set()).add(threading.get_ident())
+
+    def on_trade(self, trade: Trade):
+        self._record(self.symbol_of_order[trade.buy_order_id], ("trade", trade.buy_order_id, trade.sell_order_id, trade.qty, trade.price))
+
+    def on_order_update(self, report: ExecutionReport):
+        self._record(report.symbol, ("update", report))
+
+    def on_cancel_reject(self, order: Order, reject_code: RejectCode):
+        self._record(order.symbol, ("cancel_reject", order.order_id, reject_code))
+
+    def on_replace_reject(self, order: Order, reject_code: RejectCode):
+        self._record(order.symbol, ("replace_reject", order.order_id, reject_code))
+
+
+def create_orders(symbols: List[str], count: int) -> List[Order]:
+    return [Order(cl_ord_id=string_helper.generate_uuid(),
+                  order_id=string_helper.generate_uuid(),
+                  side=Side(random.randint(0, 1)),
+                  price=Decimal(random.randint(1, 20)),
+                  qty=Decimal(random.randint(1, 10)),
+                  symbol=random.choice(symbols),
+                  timestamp=i) for i in range(count)]
+
+
+def copy_order(order: Order) -> Order:
+    return Order(cl_ord_id=order.cl_ord_id, order_id=order.order_id, side=order.side, price=order.price, qty=order.qty,
+                 symbol=order.symbol, timestamp=order.timestamp)
+
+
+def test_books_are_matched_on_their_own_threads_in_order():
+    symbols = [f"SYM{i}" for i in range(12)]
+    orders = create_orders(symbols, 2000)
+    symbol_of_order = {order.order_id: order.symbol for order in orders}
+
+    expected = RecordingSubscriber(symbol_of_order)
+    engine = MatchingEngine()
+    engine.subscribe(expected)
+    for order in orders:
+        engine.submit_order(copy_order(order))
+
+    actual = RecordingSubscriber(symbol_of_order)
+    threaded = ThreadedMatchingEngine(thread_count=4)
+    threaded.subscribe(actual)
+    with threaded:
+        for order in orders:
+            threaded.submit_order(copy_order(order))
+        threaded.cancel_orders_in_range(symbols[0], Side.Buy)
+        engine.cancel_orders_in_range(symbols[0], Side.Buy)
+        assert threaded.drain(timeout=30)
+        with threaded.locked_orderbook(symbols[0]) as orderbook:
+            assert orderbook.buy_level_count == 0
+        with threaded.locked_orderbook("missing") as orderbook:
+            assert orderbook is None
+        assert threaded.snapshot(symbols[0]).bids == ()
+        assert threaded.snapshot("missing") is None
+
+    assert actual.events == expected.events
+    main_thread = threading.get_ident()
+    for threads in actual.threads.values():
+        assert len(threads) == 1
+        assert main_thread not in threads
+    assert len(set().union(*actual.threads.values())) > 1
+
+
+def test_subscribe_after_start_is_rejected():
+    with ThreadedMatchingEngine(thread_count=1) as threaded:
+        with pytest.raises(RuntimeError):
+            threaded.subscribe(RecordingSubscriber(dict()))
+    assert isinstance(is_gil_enabled(), bool)
+
+
+class FailingSubscriber(RecordingSubscriber):
+    def on_order_update(self, report: ExecutionReport):
+        if report.order_id == "bad":
+            raise ValueError("subscriber failure")
+        super().on_order_update(report)
+
+
+def test_failing_command_does_not_stop_its_book_thread():
+    subscriber = FailingSubscriber(dict())
+    threaded = ThreadedMatchingEngine(thread_count=1)
+    threaded.subscribe(subscriber)
+    with threaded:
+        threaded.submit_order(Order("bad", "bad", Side.Buy, Decimal(1), Decimal(1), "A"))
+        threaded.submit_order(Order("good", "good", Side.Buy, Decimal(1), Decimal(2), "A"))
+        assert threaded.drain(timeout=30)
+        assert [(name, type(e)) for name, _, e in threaded.errors] == [("submit_order", ValueError)]
+        assert [event[1].order_id for event in subscriber.events["A"]] == ["good"]
@@ -0,0 +1,65 @@
+from decimal import Decimal
+import os
+import random
+import sys
+import time
+from typing import List
+from helper import string_helper
+from matching_engine_core.matching_engine import MatchingEngine
+from matching_engine_core.models.order import Order
+from matching_engine_core.models.side import Side
+from matching_engine_core.threaded_engine import ThreadedMatchingEngine, is_gil_enabled
+
+# Multi symbol throughput of the in process engine against the threaded engine with an increasing number of book threads.
+# With the gil the book threads take turns and the hand off only adds overhead, on a free threaded build (python3.13t)
+# the books are matched in parallel. Run this script with both interpreters to compare them.
+
+SYMBOL_COUNT = 64
+ORDER_COUNT = 200000
+PRICE_RANGE = 100
+QTY_MIN = 90
+QTY_MAX = 100
+MAX_THREAD_COUNT = 16
+
+
+def initialize_orders(count: int, symbol_count: int) -> List[Order]:
+    symbols = [f"SYM{i}" for i in range(symbol_count)]
+    orders: List[Order] = []
+    for i in range(count):
+        orders.append(Order(cl_ord_id=string_helper.generate_uuid(),
+                            order_id=string_helper.generate_uuid(),
+                            side=Side(random.randint(0, 1)),
+                            qty=Decimal(random.randint(QTY_MIN, QTY_MAX)),
+                            price=Decimal(random.randint(1, PRICE_RANGE)),
+                            symbol=random.choice(symbols)))
+    return orders
+
+
+def in_process_test(orders: List[Order]) -> float:
+    engine = MatchingEngine()
+    start = time.time()
+    for order in orders:
+        engine.submit_order(order)
+    end = time.time()
+    return end - start
+
+
+def threaded_test(orders: List[Order], thread_count: int) -> float:
+    with ThreadedMatchingEngine(thread_count=thread_count) as engine:
+        start = time.time()
+        for order in orders:
+            engine.submit_order(order)
+        engine.drain()
+        end = time.time()
+    return end - start
+
+
+if __name__ == "__main__":
+    print(f"python {sys.version}, gil enabled: {is_gil_enabled()}, {os.cpu_count()} cpus, {SYMBOL_COUNT} symbols, {ORDER_COUNT} orders")
+    duration = in_process_test(initialize_orders(ORDER_COUNT, SYMBOL_COUNT))
+    print(f"In process engine took {duration} seconds, {ORDER_COUNT / duration:.0f} orders/s")
+    thread_count = 1
+    while thread_count <= MAX_THREAD_COUNT:
+        duration = threaded_test(initialize_orders(ORDER_COUNT, SYMBOL_COUNT), thread_count)
+        print(f"Threaded engine with {thread_count} book threads took {duration} seconds, {ORDER_COUNT / duration:.0f} orders/s")
+        thread_count *= 2